@@ -0,0 +1,5 @@
+"""
+基准测试：在无显示器的 Linux 上使用 Qt 的 offscreen 平台和本地 HTTP 桩服务器，
+对 100 到 20000 个插件的合成仓库测量拉取、读取缓存、界面构建、筛选、图标加载和发布的耗时与内存峰值。
+运行方式见 bench.run_bench。
+"""
@@ -0,0 +1,436 @@
+"""
+基准测试入口。对每个插件数量生成合成仓库，在独立的子进程中使用 Qt 的 offscreen 平台依次测量：
+
+    fetch        _fetch_new_plugin_list 从本地桩服务器拉取全部仓库
+    cache_load   读取缓存分段并合并插件列表
+    favorites    update_favorite_status 更新收藏状态
+    setup_ui     setupUi 把插件目录交给列表视图
+    icons        从交给列表视图到全部不同图标加载完成
+    search_index 构建搜索索引并交给界面，程序中由加载线程完成
+    filter       apply_filter 依次执行若干搜索词和收藏筛选
+    git_updater  Git_Updater 生成清单、提交并推送到本地的远程仓库
+
+每个步骤记录耗时（毫秒）和到该步骤结束时的进程内存峰值（MB），与 bench/baseline.json 比较，
+任一步骤超出容差时输出 REGRESSION 并以退出码 1 结束。
+运行前先测量一段固定的纯 Python 计算（校准），基准文件中的耗时以相对校准耗时的倍数 wall_ratio 保存，
+比较时乘以本机的校准耗时，因此提交到仓库的基准可以在不同速度的机器上使用。
+网络、磁盘和 Qt 的开销与 CPU 速度不成比例，差异较大的机器（或更换 Python、PyQt5 版本后）
+仍应使用 --update-baseline 在本地重新生成，本地生成的基准只用于本机比较，不必提交。
+
+用法：
+    python -m bench.run_bench [--sizes 100,1000,5000,20000] [--repeat 1] [--json]
+    python -m bench.run_bench --update-baseline
+"""
+import argparse
+import contextlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench.stub_server import StubServer
+from bench.synthetic import MAX_ICONS, make_routes, make_workdir
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+DEFAULT_SIZES = (100, 1000, 5000, 20000)
+STEPS = ("fetch", "cache_load", "favorites", "setup_ui", "icons", "search_index", "filter", "git_updater")
+FILTER_QUERIES = ("auto", "combo rotation", "helper 12", "trakcer", "xyzzy", "")
+WALL_TOLERANCE = 0.5  # 耗时允许超出基准的比例
+WALL_SLACK_MS = 25  # 耗时允许超出的固定量，避免很短的步骤因抖动失败
+RSS_TOLERANCE = 0.2  # 内存峰值允许超出基准的比例
+RSS_SLACK_MB = 10
+ICON_TIMEOUT = 120  # 等待图标加载的最长时间（秒）
+GIT_TIMEOUT = 180  # 等待 Git_Updater 的最长时间（秒）
+WORKER_TIMEOUT = 900  # 单次子进程的最长运行时间（秒）
+CALIBRATION_ROUNDS = 100
+
+EXIT_OK = 0
+EXIT_REGRESSION = 1
+
+
+def peak_rss_mb():
+    """
+    :return: 当前进程的内存峰值（MB），平台不支持时返回 None
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS 以字节为单位，Linux 以 KB 为单位
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def calibrate():
+    """
+    测量一段固定的纯 Python 计算（JSON 序列化和解析、排序、字符串处理），作为本机速度的参考。
+
+    :return: 多次运行中最短的耗时（毫秒）
+    """
+    data = [{"Name": f"Plugin {i}", "Tags": [str(i % 7), str(i % 11)], "Description": "x" * (i % 50)}
+            for i in range(2000)]
+    best = None
+    for _ in range(CALIBRATION_ROUNDS):
+        # 多次短时间运行取最小值，排除其他进程的干扰
+        started = time.perf_counter()
+        loaded = json.loads(json.dumps(data))
+        loaded.sort(key=lambda plugin: plugin["Description"] + plugin["Name"])
+        " ".join(plugin["Name"].casefold() for plugin in loaded).split()
+        elapsed = (time.perf_counter() - started) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return round(best, 2)
+
+
+class StepRecorder:
+    """
+    记录各步骤的耗时和内存峰值。
+    """
+
+    def __init__(self):
+        self.results = {}
+
+    @contextlib.contextmanager
+    def step(self, name):
+        """
+        测量 with 语句块的耗时，结束时记录内存峰值。
+
+        :param name: 步骤名称
+        """
+        started = time.perf_counter()
+        yield
+        self.record(name, (time.perf_counter() - started) * 1000)
+
+    def record(self, name, wall_ms):
+        """
+        :param name: 步骤名称
+        :param wall_ms: 耗时（毫秒）
+        """
+        self.results[name] = {"wall_ms": round(wall_ms, 2), "rss_mb": peak_rss_mb()}
+
+
+def _wait(app, done, timeout):
+    """
+    处理 Qt 事件直到 done() 为真。
+
+    :param app: QApplication 实例
+    :param done: 无参数的判断函数
+    :param timeout: 最长等待时间（秒）
+    :return: 是否在超时前完成
+    """
+    deadline = time.monotonic() + timeout
+    while not done():
+        if time.monotonic() > deadline:
+            return False
+        app.processEvents()
+        time.sleep(0.001)
+    return True
+
+
+def run_worker(size, output):
+    """
+    在子进程中运行全部步骤。程序目录由环境变量 PLUGIN_REPO_BASE_DIR 指定，必须在导入 ui 之前设置。
+
+    :param size: 插件数量，用于校验加载结果
+    :param output: 写入结果 JSON 的文件路径
+    """
+    from PyQt5 import QtWidgets
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+    from ui.paths import MYREPO_PATH, REPO_CACHE_DIR, REPO_INDEX_PATH, SETTING_PATH
+    from ui.plugin_catalog import PluginCatalog
+    from ui.plugin_service import PluginListService
+    from ui.repo_cache import RepoCache
+    from ui.search_index import SearchIndex
+    from ui.Ui_main import Git_Updater, Ui_MainWindow
+
+    recorder = StepRecorder()
+    errors = []
+    service = PluginListService(SETTING_PATH)
+    urls = service._read_repo_index(REPO_INDEX_PATH)
+
+    with recorder.step("fetch"):
+        repo_data = service._fetch_new_plugin_list(RepoCache(REPO_CACHE_DIR), urls, {})
+    if len(repo_data) != len(urls):
+        errors.append(f"fetch: {len(urls) - len(repo_data)} 个仓库拉取失败")
+    del repo_data
+
+    with recorder.step("cache_load"):
+        repo_data, stale_urls = service._get_cache_plugin_list(RepoCache(REPO_CACHE_DIR), urls)
+        plugin_list = service._merge_plugin_list(urls, repo_data)
+    if stale_urls or len(plugin_list) != size:
+        errors.append(f"cache_load: 读取到 {len(plugin_list)} 个插件，{len(stale_urls)} 个仓库缓存无效")
+
+    with recorder.step("favorites"):
+        plugin_list = service.update_favorite_status(plugin_list, MYREPO_PATH)
+    catalog = PluginCatalog(plugin_list)
+
+    window = QtWidgets.QWidget()
+    ui = Ui_MainWindow()
+    ui.setupUi(window, [])
+    ui.proxy_input.setText("")
+    app.processEvents()
+
+    icon_count = min(size, MAX_ICONS)
+    loaded_icons = set()
+    ui.icon_scheduler.icon_loaded.connect(lambda icon_key, image, hashes: loaded_icons.add(icon_key))
+    icons_started = time.perf_counter()
+    with recorder.step("setup_ui"):
+        ui.setupUi(window, catalog, rebuild=True)
+        app.processEvents()
+    if _wait(app, lambda: len(loaded_icons) >= icon_count, ICON_TIMEOUT):
+        recorder.record("icons", (time.perf_counter() - icons_started) * 1000)
+    else:
+        errors.append(f"icons: {ICON_TIMEOUT} 秒内只加载了 {len(loaded_icons)}/{icon_count} 个图标")
+
+    with recorder.step("search_index"):
+        ui.set_search_index(SearchIndex(catalog))
+
+    with recorder.step("filter"):
+        for query in FILTER_QUERIES:
+            ui.filter_input.setText(query)
+            ui.apply_filter()
+        ui.favorite_checkbox.setChecked(True)
+        ui.apply_filter()
+        ui.favorite_checkbox.setChecked(False)
+        ui.apply_filter()
+        app.processEvents()
+
+    results = []
+    updater = Git_Updater(catalog.view())
+    updater.update_finished.connect(results.append)
+    with recorder.step("git_updater"):
+        updater.start()
+        finished = _wait(app, lambda: results, GIT_TIMEOUT)
+    if not finished:
+        errors.append(f"git_updater: {GIT_TIMEOUT} 秒内未完成")
+    elif not results[0].ok or not results[0].pushed:
+        errors.append(f"git_updater: {results[0].error or '未推送'}")
+    updater.wait()
+
+    ui.shutdown()
+    window.close()
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump({"size": size, "plugins": len(catalog), "steps": recorder.results, "errors": errors}, f)
+
+
+def run_size(server, size, repeat, keep=False):
+    """
+    生成指定数量的合成仓库，在子进程中运行 repeat 次，每个步骤取最小的耗时和内存峰值。
+
+    :param server: 已启动的 StubServer 实例
+    :param size: 插件数量
+    :param repeat: 重复次数
+    :param keep: 是否保留临时的程序目录
+    :return: 结果字典
+    """
+    routes, urls = make_routes(size, server.base_url)
+    server.set_routes(routes)
+    merged = {"size": size, "steps": {}, "errors": []}
+    for _ in range(repeat):
+        workdir = tempfile.mkdtemp(prefix=f"plugin-bench-{size}-")
+        try:
+            make_workdir(workdir, urls, routes, ROOT_DIR)
+            output = os.path.join(workdir, "bench_result.json")
+            env = dict(os.environ, PLUGIN_REPO_BASE_DIR=workdir, QT_QPA_PLATFORM="offscreen",
+                       NO_PROXY="127.0.0.1,localhost", no_proxy="127.0.0.1,localhost")
+            completed = subprocess.run([sys.executable, "-m", "bench.run_bench", "--worker",
+                                        "--size", str(size), "--output", output],
+                                       cwd=ROOT_DIR, env=env, capture_output=True, text=True,
+                                       encoding="utf-8", errors="replace", timeout=WORKER_TIMEOUT)
+            if completed.returncode != 0 or not os.path.exists(output):
+                merged["errors"].append(f"子进程退出码 {completed.returncode}: {completed.stderr.strip()[-2000:]}")
+                continue
+            with open(output, "r", encoding="utf-8") as f:
+                result = json.load(f)
+        except subprocess.TimeoutExpired:
+            merged["errors"].append(f"子进程超过 {WORKER_TIMEOUT} 秒未完成")
+            continue
+        finally:
+            if keep:
+                print(f"保留程序目录 {workdir}", file=sys.stderr)
+            else:
+                shutil.rmtree(workdir, ignore_errors=True)
+                shutil.rmtree(f"{workdir}.remote.git", ignore_errors=True)
+        merged["errors"].extend(result["errors"])
+        for name, values in result["steps"].items():
+            best = merged["steps"].setdefault(name, dict(values))
+            for key, value in values.items():
+                if value is not None and (best.get(key) is None or value < best[key]):
+                    best[key] = value
+    return merged
+
+
+def base_wall_ms(base, calibration_ms):
+    """
+    :param base: 基准文件中一个步骤的数据
+    :param calibration_ms: 本机的校准耗时
+    :return: 换算到本机的基准耗时（毫秒）；没有 wall_ratio 的旧基准文件直接使用 wall_ms
+    """
+    if base.get("wall_ratio") is not None and calibration_ms:
+        return round(base["wall_ratio"] * calibration_ms, 2)
+    return base["wall_ms"]
+
+
+def compare(results, baseline, calibration_ms=None):
+    """
+    与基准比较，给每个步骤加上 base_wall_ms、base_rss_mb 和 status（ok、REGRESSION、new）。
+
+    :param results: run_size 的结果列表
+    :param baseline: 基准文件的内容，没有时为 None
+    :param calibration_ms: 本机的校准耗时，用于换算基准中的 wall_ratio
+    :return: 是否有步骤超出容差或出错
+    """
+    failed = False
+    base_results = (baseline or {}).get("results", {})
+    for result in results:
+        failed = failed or bool(result["errors"])
+        base_steps = base_results.get(str(result["size"]), {})
+        for name, step in result["steps"].items():
+            base = base_steps.get(name)
+            if base is None:
+                step["status"] = "new"
+                continue
+            step["base_wall_ms"] = base_wall_ms(base, calibration_ms)
+            step["base_rss_mb"] = base.get("rss_mb")
+            regressed = step["wall_ms"] > step["base_wall_ms"] * (1 + WALL_TOLERANCE) + WALL_SLACK_MS
+            if step["rss_mb"] is not None and base.get("rss_mb") is not None:
+                regressed = regressed or step["rss_mb"] > base["rss_mb"] * (1 + RSS_TOLERANCE) + RSS_SLACK_MB
+            step["status"] = "REGRESSION" if regressed else "ok"
+            failed = failed or regressed
+    return failed
+
+
+def _format_number(value, digits=1):
+    return "-" if value is None else f"{value:.{digits}f}"
+
+
+def print_table(results):
+    """
+    以表格形式输出结果和基准。
+    """
+    header = f"{'size':>6}  {'step':<12} {'wall_ms':>10} {'base':>10} {'rss_mb':>8} {'base':>8}  status"
+    print(header)
+    print("-" * len(header))
+    for result in results:
+        for name in STEPS:
+            step = result["steps"].get(name)
+            if step is None:
+                print(f"{result['size']:>6}  {name:<12} {'-':>10} {'-':>10} {'-':>8} {'-':>8}  missing")
+                continue
+            print(f"{result['size']:>6}  {name:<12} {_format_number(step['wall_ms']):>10} "
+                  f"{_format_number(step.get('base_wall_ms')):>10} {_format_number(step['rss_mb']):>8} "
+                  f"{_format_number(step.get('base_rss_mb')):>8}  {step.get('status', '')}")
+        for error in result["errors"]:
+            print(f"{result['size']:>6}  ERROR {error}")
+
+
+def load_baseline(path=BASELINE_PATH):
+    """
+    :param path: 基准文件路径
+    :return: 基准文件的内容，文件不存在时返回 None
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def save_baseline(results, calibration_ms, path=BASELINE_PATH):
+    """
+    把本次结果写入基准文件，保留其他插件数量的已有基准。
+    耗时同时保存为毫秒数（仅供参考）和相对校准耗时的倍数 wall_ratio（用于比较）。
+
+    :param results: run_size 的结果列表
+    :param calibration_ms: 本机的校准耗时
+    :param path: 基准文件路径
+    """
+    import platform
+    baseline = load_baseline(path) or {"results": {}}
+    baseline["machine"] = f"{platform.system()} {platform.machine()} Python {platform.python_version()}"
+    baseline["updated"] = time.strftime("%Y-%m-%d %H:%M:%S")
+    baseline["calibration_ms"] = calibration_ms
+    for steps in baseline["results"].values():
+        for step in steps.values():
+            # 保留的其他插件数量的基准换算到新的校准耗时，没有倍数的旧数据按同一台机器处理
+            if step.get("wall_ratio") is None:
+                step["wall_ratio"] = round(step["wall_ms"] / calibration_ms, 4)
+            step["wall_ms"] = round(step["wall_ratio"] * calibration_ms, 2)
+    for result in results:
+        baseline["results"][str(result["size"])] = {
+            name: {"wall_ms": step["wall_ms"], "wall_ratio": round(step["wall_ms"] / calibration_ms, 4),
+                   "rss_mb": step["rss_mb"]} for name, step in result["steps"].items()}
+    baseline["results"] = dict(sorted(baseline["results"].items(), key=lambda item: int(item[0])))
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(baseline, f, indent=4)
+        f.write("\n")
+
+
+def build_parser():
+    """
+    :return: 命令行参数解析器
+    """
+    parser = argparse.ArgumentParser(description="插件仓库基准测试")
+    parser.add_argument("--sizes", default=",".join(str(size) for size in DEFAULT_SIZES),
+                        help="逗号分隔的插件数量")
+    parser.add_argument("--repeat", type=int, default=1, help="每个插件数量的重复次数，取最小值")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="基准文件路径")
+    parser.add_argument("--update-baseline", action="store_true", help="把本次结果写入基准文件")
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出结果")
+    parser.add_argument("--keep", action="store_true", help="保留临时的程序目录")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--size", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--output", help=argparse.SUPPRESS)
+    return parser
+
+
+def main(argv=None):
+    """
+    :param argv: 命令行参数，默认为 sys.argv[1:]
+    :return: 退出码
+    """
+    args = build_parser().parse_args(argv)
+    if args.worker:
+        # 界面代码的日志输出到标准错误
+        with contextlib.redirect_stdout(sys.stderr):
+            run_worker(args.size, args.output)
+        return EXIT_OK
+
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+    calibration_ms = calibrate()
+    print(f"校准耗时 {calibration_ms:.2f} 毫秒", file=sys.stderr)
+    server = StubServer().start()
+    results = []
+    try:
+        for size in sizes:
+            print(f"运行 {size} 个插件...", file=sys.stderr)
+            results.append(run_size(server, size, max(1, args.repeat), keep=args.keep))
+    finally:
+        server.stop()
+
+    failed = compare(results, None if args.update_baseline else load_baseline(args.baseline), calibration_ms)
+    if args.json:
+        json.dump({"results": results, "calibration_ms": calibration_ms, "failed": failed}, sys.stdout,
+                  ensure_ascii=False)
+        sys.stdout.write("\n")
+    else:
+        print_table(results)
+    if args.update_baseline:
+        if any(result["errors"] for result in results):
+            print("有步骤出错，未更新基准文件", file=sys.stderr)
+            return EXIT_REGRESSION
+        save_baseline(results, calibration_ms, args.baseline)
+        print(f"已更新基准文件 {args.baseline}", file=sys.stderr)
+        return EXIT_OK
+    if failed:
+        print("REGRESSION: 有步骤超出基准或出错", file=sys.stderr)
+        return EXIT_REGRESSION
+    return EXIT_OK
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+"""
+基准测试使用的本地 HTTP 桩服务器，在后台线程中提供合成的仓库清单和图标。
+清单带有 ETag，支持条件请求（304）和 gzip 压缩，与常见的仓库托管服务一致。
+delays 中的路径在响应前等待指定的秒数，用于模拟缓慢的主机。
+"""
+import gzip
+import hashlib
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        body = server.routes.get(self.path)
+        server.hits += 1
+        delay = server.delays.get(self.path)
+        if delay:
+            time.sleep(delay)
+        if body is None:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        etag = f'"{hashlib.md5(body).hexdigest()}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        compress = self.path.endswith(".json") and "gzip" in self.headers.get("Accept-Encoding", "")
+        data = server.compressed(self.path, body) if compress else body
+        self.send_response(200)
+        self.send_header("ETag", etag)
+        if compress:
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class StubServer(ThreadingHTTPServer):
+    """
+    在随机端口上监听的桩服务器。routes 为请求路径到响应字节内容的字典。
+    """
+    daemon_threads = True
+
+    def __init__(self, host="127.0.0.1", port=0):
+        """
+        :param host: 监听地址
+        :param port: 监听端口，0 表示随机端口
+        """
+        super().__init__((host, port), _Handler)
+        self.routes = {}
+        self.delays = {}  # 请求路径到响应前等待的秒数
+        self.hits = 0
+        self._gzip_cache = {}
+        self._thread = None
+
+    @property
+    def base_url(self):
+        """
+        :return: 服务器的 URL 前缀，例如 http://127.0.0.1:12345
+        """
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def compressed(self, path, body):
+        """
+        :return: 响应内容的 gzip 压缩结果，同一路径只压缩一次
+        """
+        data = self._gzip_cache.get(path)
+        if data is None:
+            data = gzip.compress(body, compresslevel=6)
+            self._gzip_cache[path] = data
+        return data
+
+    def set_routes(self, routes):
+        """
+        替换全部响应内容。
+
+        :param routes: 请求路径到响应字节内容的字典
+        """
+        self.routes = dict(routes)
+        self._gzip_cache = {}
+
+    def start(self):
+        """
+        在后台线程中开始处理请求。
+        """
+        self._thread = threading.Thread(target=self.serve_forever, name="StubServer", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """
+        停止处理请求并关闭端口。
+        """
+        self.shutdown()
+        self.server_close()
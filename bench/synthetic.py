@@ -0,0 +1,154 @@
+"""
+生成基准测试使用的合成数据：指定数量的插件分布在多个仓库中，字段与真实的仓库清单一致，
+以及程序目录中的 settings.json、RepoIndex.txt、MyRepo.json 和一个带有远程仓库的 git 仓库。
+相同的参数总是生成相同的数据。
+"""
+import hashlib
+import io
+import json
+import os
+import random
+import shutil
+import subprocess
+
+PLUGINS_PER_REPO = 200
+MAX_REPOS = 100
+MAX_ICONS = 100  # 不同图标的数量上限，其余插件共用这些图标
+ICON_SIZE = 256
+FAVORITE_RATIO = 0.05
+WORDS = ("auto", "combo", "rotation", "helper", "tracker", "island", "craft", "fish", "duty", "quest",
+         "market", "party", "chat", "timer", "overlay", "camera", "gearset", "retainer", "map", "hunt")
+
+
+def repo_count(plugin_count):
+    """
+    :param plugin_count: 插件总数
+    :return: 仓库数量，每个仓库约 PLUGINS_PER_REPO 个插件
+    """
+    return max(1, min(MAX_REPOS, -(-plugin_count // PLUGINS_PER_REPO)))
+
+
+def make_plugin(rng, index, base_url, icon_count):
+    """
+    :param rng: random.Random 实例
+    :param index: 插件序号
+    :param base_url: 桩服务器的 URL 前缀
+    :param icon_count: 不同图标的数量
+    :return: 插件数据
+    """
+    words = rng.sample(WORDS, 3)
+    name = f"{words[0].title()} {words[1].title()} {index}"
+    version = f"{rng.randint(0, 9)}.{rng.randint(0, 20)}.{rng.randint(0, 99)}.{index % 100}"
+    plugin = {
+        "Author": f"Author {index % 997}",
+        "Name": name,
+        "InternalName": f"{words[0]}{words[1].title()}{index}",
+        "AssemblyVersion": version,
+        "Description": " ".join(rng.choice(WORDS) for _ in range(40)),
+        "Punchline": f"A {words[2]} {words[0]} plugin",
+        "ApplicableVersion": "any",
+        "RepoUrl": f"https://example.invalid/{words[0]}/{index}",
+        "Tags": rng.sample(WORDS, 4),
+        "DalamudApiLevel": rng.choice((9, 10, 11, 12, 12, 13, 13, 13)),
+        "DownloadCount": rng.randint(0, 500000),
+        "LastUpdate": 1700000000 + index * 37,
+        "DownloadLinkInstall": f"https://example.invalid/{index}/latest.zip",
+        "DownloadLinkUpdate": f"https://example.invalid/{index}/latest.zip",
+        "IconUrl": f"{base_url}/icon/{index % icon_count}.png",
+        "Changelog": "- " + " ".join(rng.choice(WORDS) for _ in range(12)),
+        "IsTestingExclusive": False,
+    }
+    if index % 4 == 0:
+        plugin["DownloadLinkTesting"] = f"https://example.invalid/{index}/testing.zip"
+        plugin["TestingAssemblyVersion"] = version + "-beta"
+        plugin["TestingDalamudApiLevel"] = 13
+    return plugin
+
+
+def make_icon(index):
+    """
+    :param index: 图标序号
+    :return: PNG 字节内容，不同序号的颜色不同
+    """
+    from PIL import Image
+    color = ((index * 37) % 256, (index * 91) % 256, (index * 53) % 256, 255)
+    buffer = io.BytesIO()
+    Image.new("RGBA", (ICON_SIZE, ICON_SIZE), color).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def make_routes(plugin_count, base_url, seed=0):
+    """
+    生成桩服务器的响应内容。
+
+    :param plugin_count: 插件总数
+    :param base_url: 桩服务器的 URL 前缀
+    :param seed: 随机数种子
+    :return: (请求路径到响应字节内容的字典, 仓库 URL 列表)
+    """
+    rng = random.Random(seed)
+    repos = repo_count(plugin_count)
+    icon_count = min(plugin_count, MAX_ICONS)
+    manifests = [[] for _ in range(repos)]
+    for index in range(plugin_count):
+        manifests[index % repos].append(make_plugin(rng, index, base_url, icon_count))
+    routes = {f"/repo/{i}.json": json.dumps(manifest, ensure_ascii=False).encode("utf-8")
+              for i, manifest in enumerate(manifests)}
+    for index in range(icon_count):
+        routes[f"/icon/{index}.png"] = make_icon(index)
+    return routes, [f"{base_url}/repo/{i}.json" for i in range(repos)]
+
+
+def _git(args, cwd):
+    subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True)
+
+
+def make_workdir(workdir, urls, routes, source_dir, seed=0):
+    """
+    在 workdir 中生成程序目录：设置、仓库索引、收藏和图片资源，并初始化带有本地远程仓库的 git 仓库。
+
+    :param workdir: 程序目录，运行时通过 PLUGIN_REPO_BASE_DIR 指定
+    :param urls: 仓库 URL 列表
+    :param routes: make_routes 生成的响应内容，用于确定收藏的插件
+    :param source_dir: 项目根目录，从中复制图片资源
+    :param seed: 随机数种子
+    """
+    os.makedirs(workdir, exist_ok=True)
+    shutil.copytree(os.path.join(source_dir, "img"), os.path.join(workdir, "img"), dirs_exist_ok=True)
+    settings = {
+        "proxy": {},
+        "fetch_workers": 8,
+        "fetch_deadline": 120,
+        "cache_ttl_hours": 24,
+        "icon_workers": 4,
+        "thumbnail_workers": 2,
+        "pixmap_cache_mb": 32,
+        "icon_store_mb": 64,
+        "catalog_backend": "json",
+        "manifest_targets": [{"path": "PluginMaster.json"}],
+        # git_updater 步骤包括推送到本地的远程仓库
+        "git_push": True,
+    }
+    with open(os.path.join(workdir, "settings.json"), "w", encoding="utf-8") as f:
+        json.dump(settings, f, indent=4)
+    with open(os.path.join(workdir, "RepoIndex.txt"), "w", encoding="utf-8") as f:
+        f.write("\n".join(urls) + "\n")
+
+    rng = random.Random(seed)
+    favorites = {}
+    for url in urls:
+        path = url[url.index("/repo/"):]
+        for plugin in json.loads(routes[path]):
+            if rng.random() < FAVORITE_RATIO:
+                favorites[hashlib.md5((url + plugin["Name"]).encode("utf-8")).hexdigest()] = True
+    with open(os.path.join(workdir, "MyRepo.json"), "w", encoding="utf-8") as f:
+        json.dump(favorites, f)
+
+    remote = f"{workdir}.remote.git"
+    _git(["init", "-q", "--bare", remote], workdir)
+    _git(["init", "-q"], workdir)
+    _git(["config", "user.email", "bench@example.invalid"], workdir)
+    _git(["config", "user.name", "bench"], workdir)
+    _git(["remote", "add", "origin", remote], workdir)
+    _git(["commit", "-q", "--allow-empty", "-m", "init"], workdir)
+    _git(["push", "-q", "-u", "origin", "HEAD"], workdir)
@@ -0,0 +1,227 @@
+"""
+此模块实现了不依赖界面的命令行入口，可以在没有显示器的服务器上由 cron 等定时任务调用。
+只导入插件列表服务，不导入 PyQt5、Pillow 和 tkinter。
+
+用法：
+    python cli.py refresh [--force]        刷新过期的仓库缓存
+    python cli.py build-master [--offline] 根据收藏生成 PluginMaster.json，内容不变时不写入
+    python cli.py publish [--offline]      生成 PluginMaster.json 并只提交该文件，git_push 为 true 时推送，内容不变时跳过
+    python cli.py stats                    只读取缓存，输出统计信息
+
+加上 --json 时标准输出只包含一个 JSON 对象，日志输出到标准错误。
+加上 --trace PATH（或设置环境变量 PLUGIN_REPO_TRACE）时把追踪区间写入 Chrome trace 文件，汇总表输出到标准错误。
+退出码：0 成功，1 失败，3 部分仓库拉取失败（已尽量使用缓存）。
+"""
+import argparse
+import contextlib
+import json
+import sys
+import time
+from collections import Counter
+
+from ui.paths import BASE_DIR, SETTING_PATH, MYREPO_PATH, PLUGIN_MASTER_PATH
+from ui.plugin_service import PluginListService, build_plugin_master
+from ui.publisher import publish
+from ui.settings_store import open_store, flush_all
+from ui.tracing import tracer, trace_path
+
+
+EXIT_OK = 0
+EXIT_ERROR = 1
+EXIT_PARTIAL = 3  # 部分仓库拉取失败或没有可用数据
+
+
+def _load_catalog(args, offline=False):
+    """
+    加载插件目录，缓存过期的仓库会重新拉取。
+
+    :param args: 命令行参数
+    :param offline: 是否只读取缓存
+    :return: (PluginListService 实例, PluginCatalog 实例)
+    """
+    service = PluginListService(SETTING_PATH, force_update=getattr(args, "force", False), offline=offline)
+    return service, service.load()
+
+
+def _repo_report(service, catalog, started):
+    """
+    :return: 各仓库状态的汇总字典
+    """
+    return {
+        "repos": len(service.urls),
+        "plugins": len(catalog),
+        "stale": len(service.stale_urls),
+        "failed": list(service.failed_urls),
+        "missing": list(service.missing_urls),
+        "elapsed": round(time.monotonic() - started, 3),
+    }
+
+
+def _exit_code(service, catalog):
+    """
+    :return: 根据加载结果得到的退出码
+    """
+    if service.error is not None or (service.urls and not len(catalog)):
+        return EXIT_ERROR
+    if service.failed_urls or service.missing_urls:
+        return EXIT_PARTIAL
+    return EXIT_OK
+
+
+def cmd_refresh(args):
+    """
+    刷新过期的仓库缓存，--force 时拉取全部仓库。
+    """
+    started = time.monotonic()
+    service, catalog = _load_catalog(args)
+    return _exit_code(service, catalog), _repo_report(service, catalog, started)
+
+
+def _publish(args, push):
+    """
+    加载插件目录，根据 MyRepo.json 中收藏的插件生成清单并按需发布。
+
+    :param args: 命令行参数
+    :param push: 是否提交（以及按 git_push 设置推送）
+    :return: (退出码, 汇总字典)
+    """
+    started = time.monotonic()
+    service, catalog = _load_catalog(args, offline=args.offline)
+    code = _exit_code(service, catalog)
+    report = _repo_report(service, catalog, started)
+    if code == EXIT_ERROR:
+        return code, report
+    processed_list, names = build_plugin_master(catalog, open_store(MYREPO_PATH).snapshot())
+    result = publish(processed_list, PLUGIN_MASTER_PATH, push=push, settings_fp=SETTING_PATH)
+    report.update({"path": PLUGIN_MASTER_PATH, "favorites": len(names)})
+    report.update(result.to_dict())
+    if not result.ok:
+        print(result.error, file=sys.stderr)
+        return EXIT_ERROR, report
+    return code, report
+
+
+def cmd_build_master(args):
+    """
+    根据 MyRepo.json 中收藏的插件生成 PluginMaster.json，内容不变时不写入。
+    """
+    return _publish(args, push=False)
+
+
+def cmd_publish(args):
+    """
+    生成 PluginMaster.json 后只提交该文件，settings.json 中 git_push 为 true 时推送到远程仓库；
+    已发布过相同内容时跳过，距上次发布超过 publish_interval_hours 时强制更新统计字段。
+    """
+    return _publish(args, push=True)
+
+
+def cmd_stats(args):
+    """
+    只读取缓存（包括过期的仓库），统计仓库、插件、收藏和 API 版本的数量，不访问网络。
+    有仓库没有缓存时退出码为 EXIT_PARTIAL，没有任何可用数据时为 EXIT_ERROR。
+    """
+    started = time.monotonic()
+    service, catalog = _load_catalog(args, offline=True)
+    report = _repo_report(service, catalog, started)
+    if service.error is not None:
+        return EXIT_ERROR, report
+    api_levels = Counter()
+    for plugin in catalog:
+        level = plugin.get("DalamudApiLevel")
+        if level is None and catalog.loader is not None:
+            # SQLite 目录只包含列表字段
+            level = (catalog.details(plugin["Hash"]) or {}).get("DalamudApiLevel")
+        api_levels[str(level)] += 1
+    report.update({
+        "fresh": len(service.urls) - len(service.stale_urls),
+        "favorites": len(catalog.favorite_hashes()),
+        "per_repo": {url: len(catalog.by_url(url)) for url in service.urls},
+        "api_levels": dict(sorted(api_levels.items())),
+    })
+    return _exit_code(service, catalog), report
+
+
+def _print_report(report):
+    """
+    以 "键: 值" 的形式逐行输出汇总字典。
+    """
+    for key, value in report.items():
+        if isinstance(value, dict):
+            print(f"{key}:")
+            for sub_key, sub_value in value.items():
+                print(f"  {sub_key}: {sub_value}")
+        elif isinstance(value, list):
+            print(f"{key}: {len(value)}")
+            for item in value:
+                print(f"  {item}")
+        else:
+            print(f"{key}: {value}")
+
+
+def build_parser():
+    """
+    :return: 命令行参数解析器
+    """
+    parser = argparse.ArgumentParser(description="Dalamud 插件仓库命令行工具")
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出结果，日志输出到标准错误")
+    parser.add_argument("--trace", metavar="PATH", help="把追踪区间写入 Chrome trace 文件")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    refresh = subparsers.add_parser("refresh", help="刷新过期的仓库缓存")
+    refresh.add_argument("--force", action="store_true", help="忽略缓存，拉取全部仓库")
+    refresh.set_defaults(func=cmd_refresh)
+
+    for name, func, help_text in (("build-master", cmd_build_master, "根据收藏生成 PluginMaster.json"),
+                                  ("publish", cmd_publish, "生成 PluginMaster.json 并提交，按设置推送")):
+        sub = subparsers.add_parser(name, help=help_text)
+        group = sub.add_mutually_exclusive_group()
+        group.add_argument("--force", action="store_true", help="生成前拉取全部仓库")
+        group.add_argument("--offline", action="store_true", help="只使用缓存，不访问网络")
+        sub.set_defaults(func=func)
+
+    stats = subparsers.add_parser("stats", help="只读取缓存，输出统计信息")
+    stats.set_defaults(func=cmd_stats)
+    return parser
+
+
+def main(argv=None):
+    """
+    :param argv: 命令行参数，默认为 sys.argv[1:]
+    :return: 退出码
+    """
+    args = build_parser().parse_args(argv)
+    report = {"command": args.command}
+    trace_file = args.trace or trace_path(BASE_DIR)
+    if trace_file:
+        tracer.enabled = True
+    try:
+        if args.json:
+            # 标准输出只保留 JSON 结果
+            with contextlib.redirect_stdout(sys.stderr):
+                code, result = args.func(args)
+        else:
+            code, result = args.func(args)
+    except Exception as e:
+        print(f"执行 {args.command} 时出错: {e}", file=sys.stderr)
+        code, result = EXIT_ERROR, {"error": str(e)}
+    finally:
+        flush_all()
+    if trace_file and tracer.records:
+        # 追踪的汇总表和错误信息都输出到标准错误
+        with contextlib.redirect_stdout(sys.stderr):
+            print(tracer.report())
+            if tracer.export_chrome(trace_file):
+                report["trace"] = trace_file
+    report.update(result)
+    report["exit_code"] = code
+    if args.json:
+        json.dump(report, sys.stdout, ensure_ascii=False)
+        sys.stdout.write("\n")
+    else:
+        _print_report(report)
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
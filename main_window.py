@@ -1,48 +1,178 @@
 """
 此模块负责调用 fetch_plugin_list 函数获取插件列表，并初始化主窗口。
+启动时记录各阶段耗时，使用 --startup-check 参数运行时在读取缓存后退出，
+窗口首次绘制超过目标时间（settings.json 中的 startup_target_ms）时退出码为 1。
+设置环境变量 PLUGIN_REPO_TRACE 时每次刷新后输出追踪汇总表，关闭窗口时写入 Chrome trace 文件。
+使用 --profile 参数或设置环境变量 PLUGIN_REPO_PROFILE 时在采样分析器下运行，并检测界面线程的卡顿，
+退出时在程序目录中写入可以生成火焰图的 .folded 文件。
 """
+# 计时器最先导入，记录解释器启动的耗时
+from ui.startup import startup_timer, DEFAULT_STARTUP_TARGET_MS
+startup_timer.mark("interpreter")
 import sys
-from PyQt5 import QtWidgets
-from ui.Ui_main import Ui_MainWindow, PluginListUpdater, SETTING_PATH
+from PyQt5 import QtWidgets, QtCore
+from ui.Ui_main import Ui_MainWindow, PluginListUpdater, SETTING_PATH, BASE_DIR
+from ui.settings_store import open_store
+from ui.tracing import tracer, trace_path
+from ui.profiler import SamplingProfiler, profiling_requested, DEFAULT_INTERVAL_MS, DEFAULT_STALL_THRESHOLD_MS
 import time
+startup_timer.mark("imports")
+
+STARTUP_CHECK_TIMEOUT_MS = 15000  # 启动检查等待首次绘制和读取缓存的最长时间
+
+
+def start_profiler(app):
+    """
+    启动采样分析器，界面线程的心跳由 QTimer 驱动，事件循环被阻塞时心跳停止。
+    采样间隔和卡顿阈值分别读取 settings.json 中的 profile_interval_ms 和 stall_threshold_ms。
+
+    :param app: QApplication 实例
+    :return: SamplingProfiler 实例
+    """
+    settings = open_store(SETTING_PATH)
+    stall_threshold_ms = settings.get("stall_threshold_ms", DEFAULT_STALL_THRESHOLD_MS)
+    profiler = SamplingProfiler(BASE_DIR, interval_ms=settings.get("profile_interval_ms", DEFAULT_INTERVAL_MS),
+                                stall_threshold_ms=stall_threshold_ms)
+    heartbeat = QtCore.QTimer(app)
+    heartbeat.setInterval(max(1, stall_threshold_ms // 4))
+    heartbeat.timeout.connect(profiler.beat)
+    heartbeat.start()
+    profiler.beat()
+    print(f"采样分析已启用，卡顿阈值 {stall_threshold_ms} 毫秒")
+    return profiler.start()
 
 
 class MainWindow(QtWidgets.QWidget):
     """
     主窗口类，负责初始化 UI 界面。
+    启动时先显示空的主窗口，缓存过期时先显示过期缓存并在后台刷新，
+    每个仓库完成时立即合并该仓库的插件，刷新完成后只合并发生变化的插件。
     """
-    def __init__(self):
+    def __init__(self, startup_check=False):
+        """
+        :param startup_check: 是否在首次绘制和读取缓存后输出启动耗时并退出
+        """
         super().__init__()
+        self.startup_check = startup_check
+        self.startup_reported = False
+        startup_timer.target_ms = open_store(SETTING_PATH).get("startup_target_ms", DEFAULT_STARTUP_TARGET_MS)
+        startup_timer.mark("settings")
         self.plugin_list = []
         self.ui = Ui_MainWindow()
+        # 首次绘制不依赖缓存和网络
+        self.ui.setupUi(self, [])
         self.show()
         self.start_time = time.time()
-        # 程序启动时读取缓存
-        self.plugin_updater = PluginListUpdater(settings_fp=SETTING_PATH, force_update=False)
+        # 程序启动时读取缓存，过期时先显示过期缓存
+        self.plugin_updater = PluginListUpdater(settings_fp=SETTING_PATH, force_update=False,
+                                                stale_while_revalidate=True, progressive=True,
+                                                build_search_index=True)
+        self.plugin_updater.stale_plugin_list_loaded.connect(self.on_stale_plugin_list_loaded)
+        self.plugin_updater.repo_index_loaded.connect(self.ui.set_repo_order)
+        self.plugin_updater.repo_loaded.connect(self.ui.apply_repo_plugins)
+        self.plugin_updater.repo_loaded.connect(lambda *args: self.mark_startup("cache"))
         self.plugin_updater.plugin_list_updated.connect(self.on_plugin_list_updated)
+        self.plugin_updater.search_index_built.connect(self.ui.set_search_index)
         self.plugin_updater.start()
+        if startup_check:
+            QtCore.QTimer.singleShot(STARTUP_CHECK_TIMEOUT_MS, self.finish_startup_check)
+
+    def paintEvent(self, event):
+        """
+        第一次绘制时记录窗口出现的时刻。
+        """
+        super().paintEvent(event)
+        self.mark_startup("first_paint")
+
+    def mark_startup(self, phase):
+        """
+        记录启动阶段，首次绘制和读取缓存都完成后输出启动耗时。
+
+        :param phase: 阶段名称
+        """
+        if phase in startup_timer.marks:
+            return
+        startup_timer.mark(phase)
+        if "first_paint" in startup_timer.marks and "cache" in startup_timer.marks:
+            # 不在绘制事件中关闭窗口
+            QtCore.QTimer.singleShot(0, self.finish_startup_check)
+
+    def finish_startup_check(self):
+        """
+        输出启动耗时；启动检查模式下随后关闭窗口，未达到目标时退出码为 1。
+        """
+        if self.startup_reported:
+            return
+        self.startup_reported = True
+        startup_timer.print_report()
+        if self.startup_check:
+            self.close()
+            QtWidgets.QApplication.instance().exit(0 if startup_timer.within_target() else 1)
+
+    def on_stale_plugin_list_loaded(self, stale_plugin_list):
+        """
+        显示过期的缓存插件列表，并标记为过期。
+
+        :param stale_plugin_list: 过期缓存中的插件列表
+        """
+        self.plugin_list = stale_plugin_list
+        self.ui.apply_plugin_diff(stale_plugin_list)
+        self.ui.set_stale(True)
+        self.mark_startup("cache")
 
     def on_plugin_list_updated(self, new_plugin_list):
         """
-        处理插件列表更新完成后的操作。
+        处理插件列表更新完成后的操作，已有插件项时只合并差异。
 
         :param new_plugin_list: 更新后的插件列表
         """
         self.plugin_list = new_plugin_list
-        # 调用 Ui_MainWindow 的 setupUi 方法更新界面
-        self.ui.setupUi(self, new_plugin_list)
+        self.ui.apply_plugin_diff(new_plugin_list)
+        self.ui.set_stale(False)
+        self.mark_startup("cache")
+        if tracer.enabled:
+            print(tracer.summary_table(tracer.refresh_id))
+
+    def closeEvent(self, event):
+        """
+        关闭窗口时停止图标加载并保存图标存储，启用追踪时写入追踪文件。
+        """
+        self.ui.shutdown()
+        self.write_trace()
+        super().closeEvent(event)
+
+    def write_trace(self):
+        """
+        启用追踪时把全部区间写入 Chrome trace 文件，并输出每次刷新的汇总表。
+        """
+        path = trace_path(BASE_DIR)
+        if path is None or not tracer.records:
+            return
+        print(tracer.report())
+        if tracer.export_chrome(path):
+            print(f"追踪已写入 {path}")
 
     def manual_update(self):
         """
         处理手动更新操作，强制从互联网拉取更新。
         """
-        self.plugin_updater = PluginListUpdater(settings_fp=SETTING_PATH, force_update=True)
+        self.plugin_updater = PluginListUpdater(settings_fp=SETTING_PATH, force_update=True, progressive=True)
+        self.plugin_updater.repo_index_loaded.connect(self.ui.set_repo_order)
+        self.plugin_updater.repo_loaded.connect(self.ui.apply_repo_plugins)
         self.plugin_updater.plugin_list_updated.connect(self.on_plugin_list_updated)
         self.plugin_updater.start()
 
 
 if __name__ == "__main__":
+    import multiprocessing
+    # 打包后缩略图子进程以本程序启动，必须在创建窗口之前交给 multiprocessing 处理
+    multiprocessing.freeze_support()
     app = QtWidgets.QApplication(sys.argv)
+    profiler = start_profiler(app) if profiling_requested() else None
     # 将 plugin_list 传递给 MainWindow 构造函数
-    window = MainWindow()
-    sys.exit(app.exec_())
\ No newline at end of file
+    window = MainWindow(startup_check="--startup-check" in sys.argv)
+    exit_code = app.exec_()
+    if profiler is not None:
+        for path in profiler.stop():
+            print(f"采样结果已写入 {path}")
+    sys.exit(exit_code)
\ No newline at end of file
@@ -0,0 +1,65 @@
+import pytest
+
+from ui.catalog_db import CatalogDB
+
+
+PLUGINS = [
+    {"Hash": "a", "URL": "u1", "Name": "Combo Helper", "InternalName": "ComboHelper", "Author": "Alice",
+     "Description": "rotation helper", "DalamudApiLevel": 12, "LastUpdate": 100, "Tags": ["pvp"]},
+    {"Hash": "b", "URL": "u1", "Name": "Tracker", "InternalName": "Tracker", "Author": "Bob",
+     "Description": "tracks combo timers", "DalamudApiLevel": 13, "LastUpdate": 300},
+    {"Hash": "c", "URL": "u2", "Name": "Auto Loot", "InternalName": "AutoLoot", "Author": "Carol",
+     "Description": "loot", "DalamudApiLevel": 13, "LastUpdate": 200},
+]
+FETCHED_AT = {"u1": "2026-01-01 00:00:00", "u2": "2026-01-02 00:00:00"}
+
+
+@pytest.fixture
+def db(tmp_path):
+    database = CatalogDB(str(tmp_path / "catalog.sqlite"))
+    database.save_catalog(["u1", "u2"], PLUGINS, FETCHED_AT, {"b": True, "c": False})
+    yield database
+    database.close()
+
+
+def test_is_current(db):
+    assert db.is_current(["u1", "u2"], FETCHED_AT)
+    assert not db.is_current(["u2", "u1"], FETCHED_AT)
+    assert not db.is_current(["u1", "u2"], dict(FETCHED_AT, u2="later"))
+
+
+def test_load_catalog_has_list_fields_and_favorites(db):
+    catalog = db.load_catalog()
+    assert [plugin["Hash"] for plugin in catalog] == ["a", "b", "c"]
+    assert "Author" not in catalog.get("a")
+    assert catalog.favorite_hashes() == {"b"}
+    details = catalog.details("b")
+    assert details["Author"] == "Bob" and details["is_favorite"] is True
+
+
+def test_query(db):
+    assert db.query("combo") == ["a", "b"]
+    assert db.query("combo helper") == ["a"]
+    assert db.query("au") == ["c"]
+    assert db.query("", order_by="last_update") == ["b", "c", "a"]
+    assert db.query("", api_level=13) == ["b", "c"]
+    assert db.query("", favorites_only=True) == ["b"]
+    assert db.query("xyzzy") == []
+
+
+def test_set_favorite(db):
+    db.set_favorite("a", True)
+    assert db.query("", favorites_only=True) == ["a", "b"]
+
+
+def test_sync_favorites_follows_myrepo(db):
+    assert not db.sync_favorites({"b": True, "c": False})
+    assert db.sync_favorites({"a": True, "b": False})
+    assert db.load_catalog().favorite_hashes() == {"a"}
+    assert db.query("", favorites_only=True) == ["a"]
+
+
+def test_meta_round_trip(db):
+    assert db.get_meta("missing", 1) == 1
+    db.set_meta("key", {"value": [1, 2]})
+    assert db.get_meta("key") == {"value": [1, 2]}
@@ -0,0 +1,104 @@
+import functools
+import json
+
+import pytest
+
+import cli
+from bench.stub_server import StubServer
+from ui.manifest_stream import plugin_hash
+from ui.plugin_service import PluginListService
+from ui.repo_cache import RepoCache
+from ui.tracing import TRACE_ENV
+
+
+MANIFEST = [{"Name": "Alpha", "InternalName": "Alpha", "DalamudApiLevel": 12},
+            {"Name": "Beta", "InternalName": "Beta", "DalamudApiLevel": 11}]
+
+
+@pytest.fixture
+def server(monkeypatch):
+    monkeypatch.setenv("NO_PROXY", "127.0.0.1,localhost")
+    monkeypatch.setenv("no_proxy", "127.0.0.1,localhost")
+    server = StubServer().start()
+    server.set_routes({"/a.json": json.dumps(MANIFEST).encode("utf-8")})
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def home(tmp_path, monkeypatch):
+    # 所有文件都放在临时目录中，不读写程序目录下的设置和缓存
+    monkeypatch.delenv(TRACE_ENV, raising=False)
+    settings_fp = tmp_path / "settings.json"
+    settings_fp.write_text(json.dumps({"fetch_deadline": 10}), encoding="utf-8")
+    monkeypatch.setattr(cli, "BASE_DIR", str(tmp_path))
+    monkeypatch.setattr(cli, "SETTING_PATH", str(settings_fp))
+    monkeypatch.setattr(cli, "MYREPO_PATH", str(tmp_path / "MyRepo.json"))
+    monkeypatch.setattr(cli, "PLUGIN_MASTER_PATH", str(tmp_path / "PluginMaster.json"))
+    monkeypatch.setattr(cli, "PluginListService", functools.partial(
+        PluginListService, repo_index_fp=str(tmp_path / "RepoIndex.txt"), my_plugin_fp=str(tmp_path / "MyRepo.json"),
+        cache_dir=str(tmp_path / "cache"), legacy_cache_fp=str(tmp_path / "cache_plugin.json")))
+    RepoCache.clear_parsed()
+    yield tmp_path
+    RepoCache.clear_parsed()
+
+
+def write_index(home, *urls):
+    (home / "RepoIndex.txt").write_text("## 仓库\n" + "\n".join(urls) + "\n", encoding="utf-8")
+
+
+def run_json(capsys, *argv):
+    code = cli.main(["--json", *argv])
+    out = capsys.readouterr().out
+    # 标准输出只有一行 JSON
+    assert out.count("\n") == 1
+    report = json.loads(out)
+    assert report["exit_code"] == code
+    return code, report
+
+
+def test_refresh_and_stats(home, server, capsys):
+    write_index(home, f"{server.base_url}/a.json")
+    code, report = run_json(capsys, "refresh")
+    assert code == cli.EXIT_OK
+    assert report["command"] == "refresh" and report["plugins"] == 2 and report["failed"] == []
+
+    hits = server.hits
+    code, report = run_json(capsys, "stats")
+    assert code == cli.EXIT_OK and server.hits == hits
+    assert report["fresh"] == 1 and report["api_levels"] == {"11": 1, "12": 1}
+
+
+def test_missing_repo_is_a_partial_failure(home, server, capsys):
+    write_index(home, f"{server.base_url}/a.json", f"{server.base_url}/missing.json")
+    code, report = run_json(capsys, "refresh")
+    assert code == cli.EXIT_PARTIAL
+    assert report["plugins"] == 2
+    assert report["missing"] == [f"{server.base_url}/missing.json"]
+    # 拉取失败的日志输出到标准错误
+    assert capsys.readouterr().out == ""
+
+
+def test_errors_exit_with_one(home, capsys):
+    write_index(home, "http://127.0.0.1:9/a.json")
+    # 没有缓存时离线统计没有任何可用数据
+    code, report = run_json(capsys, "stats")
+    assert code == cli.EXIT_ERROR and report["plugins"] == 0
+
+    (home / "settings.json").unlink()
+    code, report = run_json(capsys, "stats")
+    assert code == cli.EXIT_ERROR
+
+
+def test_build_master_writes_the_favorites(home, server, capsys):
+    url = f"{server.base_url}/a.json"
+    write_index(home, url)
+    (home / "MyRepo.json").write_text(json.dumps({plugin_hash(url, "Beta"): True}), encoding="utf-8")
+    assert cli.main(["refresh"]) == cli.EXIT_OK
+    assert "exit_code: 0" in capsys.readouterr().out
+
+    code, report = run_json(capsys, "build-master", "--offline")
+    assert code == cli.EXIT_OK and report["favorites"] == 1
+    manifest = json.loads((home / "PluginMaster.json").read_text(encoding="utf-8"))
+    assert [plugin["Name"] for plugin in manifest] == ["Beta"]
+    assert "Hash" not in manifest[0]
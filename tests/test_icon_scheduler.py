@@ -0,0 +1,106 @@
+import threading
+import time
+
+import pytest
+from PyQt5 import QtCore, QtGui
+
+from ui.icon_scheduler import PRIORITY_VISIBLE, IconScheduler
+from ui.icon_store import IconStore
+
+
+def wait_for(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+@pytest.fixture
+def scheduler(tmp_path):
+    scheduler = IconScheduler(IconStore(str(tmp_path / "icons")), max_workers=1)
+    scheduler.loads = []
+    scheduler.results = []
+    scheduler.gate = threading.Event()
+
+    def load_icon(icon_key, icon_url):
+        # 代替下载和缩放，放行之前工作线程停在这里
+        scheduler.loads.append(icon_key)
+        scheduler.gate.wait(10)
+        if icon_url == "error":
+            raise ValueError("bad icon")
+        image = QtGui.QImage(4, 4, QtGui.QImage.Format_ARGB32)
+        image.fill(0)
+        return image
+
+    scheduler._load_icon = load_icon
+    # 工作线程中直接调用，不依赖事件循环
+    scheduler.icon_loaded.connect(
+        lambda icon_key, image, plugin_hashes: scheduler.results.append((icon_key, image.isNull(), sorted(plugin_hashes))),
+        QtCore.Qt.DirectConnection)
+    yield scheduler
+    scheduler.gate.set()
+    scheduler.shutdown()
+
+
+def test_requests_for_the_same_icon_are_coalesced(scheduler):
+    scheduler.request("k1", "url1", "p1")
+    assert wait_for(lambda: scheduler.loads == ["k1"])
+    # 下载中登记的插件在完成时一并收到结果
+    scheduler.request("k1", "url1", "p2")
+    scheduler.request("k2", "url2", "p3")
+    scheduler.request("k2", "url2", "p4")
+    scheduler.gate.set()
+    assert wait_for(lambda: len(scheduler.results) == 2)
+    assert scheduler.loads == ["k1", "k2"]
+    assert scheduler.results == [("k1", False, ["p1", "p2"]), ("k2", False, ["p3", "p4"])]
+
+
+def test_visible_icons_are_loaded_first(scheduler):
+    scheduler.request("busy", "url0", "p0")
+    assert wait_for(lambda: scheduler.loads == ["busy"])
+    scheduler.request("k1", "url1", "p1")
+    scheduler.request("k2", "url2", "p2")
+    scheduler.request("k3", "url3", "p3", priority=PRIORITY_VISIBLE)
+    scheduler.promote(["k2"])
+    scheduler.gate.set()
+    assert wait_for(lambda: len(scheduler.results) == 4)
+    assert scheduler.loads == ["busy", "k3", "k2", "k1"]
+
+
+def test_cancel_all_invalidates_earlier_tickets(scheduler):
+    first = scheduler.request("k1", "url1", "p1")
+    assert wait_for(lambda: scheduler.loads == ["k1"])
+    scheduler.request("k2", "url2", "p2")
+    second = scheduler.cancel_all()
+    assert second == first + 1
+    # 新票据登记在下载中的图标上，只有它收到结果；队列中的 k2 被丢弃
+    assert scheduler.request("k1", "url1", "p3") == second
+    scheduler.gate.set()
+    assert wait_for(lambda: scheduler.results)
+    time.sleep(0.1)
+    assert scheduler.results == [("k1", False, ["p3"])]
+    assert scheduler.loads == ["k1"]
+
+
+def test_cancelled_icons_are_not_loaded(scheduler):
+    scheduler.request("busy", "url0", "p0")
+    assert wait_for(lambda: scheduler.loads == ["busy"])
+    scheduler.request("k1", "url1", "p1")
+    scheduler.request("k1", "url1", "p2")
+    scheduler.request("k2", "url2", "p3")
+    scheduler.cancel(["p1", "p2"])
+    scheduler.gate.set()
+    assert wait_for(lambda: len(scheduler.results) == 2)
+    assert scheduler.loads == ["busy", "k2"]
+
+
+def test_worker_error_emits_an_empty_image(scheduler, capsys):
+    scheduler.gate.set()
+    scheduler.request("k1", "error", "p1")
+    assert wait_for(lambda: scheduler.results)
+    assert scheduler.results == [("k1", True, ["p1"])]
+    # 工作线程继续处理之后的请求
+    scheduler.request("k2", "url2", "p2")
+    assert wait_for(lambda: len(scheduler.results) == 2)
+    assert scheduler.results[1] == ("k2", False, ["p2"])
+    assert "bad icon" in capsys.readouterr().out
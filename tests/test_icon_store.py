@@ -0,0 +1,112 @@
+import os
+import time
+
+from ui.icon_store import BLOB_DIR, INDEX_FILE, IconStore
+
+
+def blob(index, size=100):
+    return bytes([index % 256]) * size
+
+
+def blob_files(store_dir):
+    return sorted(os.listdir(os.path.join(store_dir, BLOB_DIR)))
+
+
+def test_identical_content_is_stored_once(tmp_path):
+    store = IconStore(str(tmp_path / "store"))
+    store.put("a", 64, blob(1))
+    store.put("b", 64, blob(1))
+    assert store.get("a", 64) == store.get("b", 64) == blob(1)
+    assert store.get("a", 32) is None
+    assert len(blob_files(store.store_dir)) == 1
+    assert store.total_bytes == 100
+
+
+def test_put_evicts_least_recently_used(tmp_path):
+    store = IconStore(str(tmp_path / "store"), max_bytes=250)
+    store.put("a", 64, blob(1))
+    store.put("b", 64, blob(2))
+    time.sleep(0.01)
+    store.get("a", 64)
+    store.put("c", 64, blob(3))
+    # b 最久未访问，超出上限时被清理
+    assert store.get("b", 64) is None
+    assert store.get("a", 64) == blob(1) and store.get("c", 64) == blob(3)
+    assert store.total_bytes == 200
+    assert len(blob_files(store.store_dir)) == 2
+
+
+def test_gc_enforces_budget_and_age(tmp_path):
+    store_dir = str(tmp_path / "store")
+    store = IconStore(store_dir)
+    for index in range(5):
+        store.put(f"k{index}", 64, blob(index))
+        time.sleep(0.001)
+    store._blobs[store._entries["k0_64"]]["last_access"] = time.time() - 40 * 24 * 3600
+
+    # 降低上限后清理：过期的 k0 和最久未访问的 k1 被清理
+    store.max_bytes = 300
+    assert store.gc() == 2
+    assert store.get("k0", 64) is None and store.get("k1", 64) is None
+    assert [store.get(f"k{index}", 64) for index in range(2, 5)] == [blob(index) for index in range(2, 5)]
+    assert len(blob_files(store_dir)) == 3
+
+    # 索引已保存，重新打开后结果一致
+    reopened = IconStore(store_dir, max_bytes=300)
+    assert reopened.get("k1", 64) is None and reopened.get("k4", 64) == blob(4)
+    assert reopened.total_bytes == 300
+
+
+def test_gc_removes_stray_files_and_handles_a_missing_blob_dir(tmp_path):
+    store_dir = str(tmp_path / "store")
+    store = IconStore(store_dir)
+    store.put("a", 64, blob(1))
+    with open(os.path.join(store_dir, BLOB_DIR, "orphan.png"), "wb") as f:
+        f.write(b"x")
+    with open(os.path.join(store_dir, BLOB_DIR, "partial.png.1.tmp"), "wb") as f:
+        f.write(b"x")
+    assert store.gc() == 2
+    assert len(blob_files(store_dir)) == 1
+
+    for name in blob_files(store_dir):
+        os.remove(os.path.join(store_dir, BLOB_DIR, name))
+    os.rmdir(os.path.join(store_dir, BLOB_DIR))
+    store.gc()
+    assert os.path.exists(os.path.join(store_dir, INDEX_FILE))
+
+
+def test_pack_generations(tmp_path):
+    store_dir = str(tmp_path / "store")
+    store = IconStore(store_dir)
+    store.put("a", 64, blob(1))
+    store.put("b", 64, blob(2))
+    store.pack()
+    assert sorted(name for name in os.listdir(store_dir) if name.endswith(".pack")) == ["icons-1.pack"]
+    assert blob_files(store_dir) == []
+    assert store.get("a", 64) == blob(1)
+
+    store.put("c", 64, blob(3))
+    store.pack()
+    assert sorted(name for name in os.listdir(store_dir) if name.endswith(".pack")) == ["icons-2.pack"]
+    store.close()
+
+    reopened = IconStore(store_dir)
+    assert [reopened.get(key, 64) for key in "abc"] == [blob(1), blob(2), blob(3)]
+    reopened.close()
+
+
+def test_crash_before_the_index_is_saved_keeps_the_old_pack(tmp_path):
+    store_dir = str(tmp_path / "store")
+    store = IconStore(store_dir)
+    store.put("a", 64, blob(1))
+    store.pack()
+    store.close()
+    # 合并中途崩溃留下的新文件，索引仍指向 icons-1.pack
+    with open(os.path.join(store_dir, "icons-2.pack"), "wb") as f:
+        f.write(b"garbage")
+
+    store = IconStore(store_dir)
+    assert store.get("a", 64) == blob(1)
+    store.gc()
+    assert sorted(name for name in os.listdir(store_dir) if name.endswith(".pack")) == ["icons-1.pack"]
+    store.close()
@@ -0,0 +1,106 @@
+import gzip
+import json
+import os
+
+import pytest
+
+from ui.manifest_builder import ManifestTarget, build_manifests, load_targets
+
+
+def make_plugin(name, api_level, download_count=0, testing=False):
+    plugin = {
+        "Name": name,
+        "InternalName": name,
+        "DalamudApiLevel": api_level,
+        "DownloadLinkInstall": f"https://example.invalid/{name}.zip",
+        "DownloadLinkUpdate": f"https://example.invalid/{name}.zip",
+        "DownloadCount": download_count,
+    }
+    if testing:
+        plugin["DownloadLinkTesting"] = f"https://example.invalid/{name}-testing.zip"
+    return plugin
+
+
+def read_json(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_settings(tmp_path, targets):
+    path = tmp_path / "settings.json"
+    path.write_text(json.dumps({"manifest_targets": targets}), encoding="utf-8")
+    return str(path)
+
+
+def test_default_target_matches_json_dump(tmp_path):
+    plugins = [make_plugin("Alpha", 12), make_plugin("Beta", 11)]
+    target = ManifestTarget(str(tmp_path / "PluginMaster.json"))
+    result = build_manifests(plugins, [target])
+    assert result.written == [target.path]
+    with open(target.path, encoding="utf-8") as f:
+        assert f.read() == json.dumps(plugins, indent=4, ensure_ascii=False)
+
+
+def test_unchanged_targets_are_skipped(tmp_path):
+    plugins = [make_plugin("Alpha", 12)]
+    target = ManifestTarget(str(tmp_path / "PluginMaster.min.json"), minify=True, gzip=True)
+    first = build_manifests(plugins, [target])
+    assert first.written == [target.path, target.path + ".gz"]
+    assert json.loads(gzip.decompress((tmp_path / "PluginMaster.min.json.gz").read_bytes())) == plugins
+
+    # 只有统计字段变化时不重新写入
+    second = build_manifests([make_plugin("Alpha", 12, download_count=5)], [target], first.digests)
+    assert second.written == [] and second.unchanged == [target.path]
+
+    os.remove(target.path + ".gz")
+    third = build_manifests(plugins, [target], first.digests)
+    assert third.written == [target.path, target.path + ".gz"]
+
+
+def test_split_and_channels(tmp_path):
+    plugins = [make_plugin("Alpha", 12, testing=True), make_plugin("Beta", 11)]
+    split = ManifestTarget(str(tmp_path / "api{api_level}" / "PluginMaster.json"), channel="stable")
+    testing = ManifestTarget(str(tmp_path / "testing.json"), channel="testing")
+    build_manifests(plugins, [split, testing])
+    api12 = read_json(tmp_path / "api12" / "PluginMaster.json")
+    assert [plugin["Name"] for plugin in api12] == ["Alpha"]
+    assert "DownloadLinkTesting" not in api12[0]
+    assert [plugin["Name"] for plugin in read_json(tmp_path / "api11" / "PluginMaster.json")] == ["Beta"]
+    testing_list = read_json(tmp_path / "testing.json")
+    assert [plugin["DownloadLinkInstall"] for plugin in testing_list] == ["https://example.invalid/Alpha-testing.zip"]
+
+
+def test_stale_split_outputs_are_removed(tmp_path):
+    split = ManifestTarget(str(tmp_path / "api{api_level}.json"), gzip=True)
+    other = str(tmp_path / "notes.json")
+    with open(other, "w", encoding="utf-8") as f:
+        f.write("[]")
+    first = build_manifests([make_plugin("Alpha", 12), make_plugin("Beta", 11)], [split])
+    previous = dict(first.digests, **{other: "x"})
+
+    second = build_manifests([make_plugin("Alpha", 12)], [split], previous)
+    api11 = str(tmp_path / "api11.json")
+    assert sorted(second.removed) == [api11, api11 + ".gz"]
+    assert not os.path.exists(api11) and not os.path.exists(api11 + ".gz")
+    assert os.path.exists(tmp_path / "api12.json")
+    # 不属于拆分目标的文件不删除
+    assert os.path.exists(other)
+    assert set(second.digests) == {str(tmp_path / "api12.json")}
+
+
+def test_duplicate_target_paths_are_rejected(tmp_path):
+    settings_fp = write_settings(tmp_path, [{"path": "PluginMaster.json"},
+                                            {"path": "./PluginMaster.json", "minify": True}])
+    with pytest.raises(ValueError):
+        load_targets(settings_fp, str(tmp_path))
+
+    os.makedirs(tmp_path / "b")
+    settings_fp = write_settings(tmp_path / "b", [{"path": "api{api_level}.json"},
+                                                  {"path": "api12.json", "api_level": 12}])
+    with pytest.raises(ValueError):
+        load_targets(settings_fp, str(tmp_path))
+
+    os.makedirs(tmp_path / "c")
+    settings_fp = write_settings(tmp_path / "c", [{"path": "api{api_level}.json"},
+                                                  {"path": "api{api_level}.min.json", "minify": True}])
+    assert len(load_targets(settings_fp, str(tmp_path))) == 2
@@ -0,0 +1,73 @@
+import json
+
+import pytest
+
+from ui.manifest_stream import ArrayScanner, ManifestStream, parse_manifest, plugin_hash
+
+
+URL = "https://example.invalid/repo.json"
+PLUGINS = [
+    {"Name": "Alpha", "Description": "brackets ] } [ { and \"quotes\", commas"},
+    {"Name": "Beta 中文", "Tags": ["a", "b"], "Nested": {"List": [1, {"x": "\\"}]}},
+    {"Name": "Gamma", "Punchline": "emoji \U0001F600 and escaped \\\" quote"},
+]
+
+
+def feed_in_chunks(data, size):
+    stream = ManifestStream(URL)
+    for start in range(0, len(data), size):
+        stream.feed(data[start:start + size])
+    return stream.close()
+
+
+def expected(plugins):
+    return [dict(plugin, Hash=plugin_hash(URL, plugin["Name"])) for plugin in plugins]
+
+
+def test_parse_matches_json_loads():
+    data = json.dumps(PLUGINS, indent=4, ensure_ascii=False).encode("utf-8")
+    assert parse_manifest(URL, data) == expected(PLUGINS)
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64])
+def test_any_chunk_boundary(size):
+    # 每个字节单独传入时会拆开多字节字符、转义符和引号
+    data = json.dumps(PLUGINS, ensure_ascii=False).encode("utf-8")
+    assert feed_in_chunks(data, size) == expected(PLUGINS)
+
+
+def test_bom_and_trailing_content():
+    data = b"\xef\xbb\xbf  \n" + json.dumps(PLUGINS).encode("utf-8") + b"\n  "
+    assert parse_manifest(URL, data) == expected(PLUGINS)
+
+
+def test_empty_array():
+    assert parse_manifest(URL, b"[]") == []
+    assert parse_manifest(URL, b" [ \n ] ") == []
+
+
+def test_bad_entries_are_skipped():
+    data = b'[{"Name": "Alpha"}, {"Name": }, {"Description": "no name"}, 5, {"Name": "Alpha"}, {"Name": "Beta"}]'
+    stream = ManifestStream(URL)
+    stream.feed(data)
+    assert [plugin["Name"] for plugin in stream.close()] == ["Alpha", "Beta"]
+    assert stream.skipped == 3
+
+
+def test_not_an_array():
+    with pytest.raises(ValueError):
+        parse_manifest(URL, b'{"Name": "Alpha"}')
+
+
+def test_truncated_document():
+    data = json.dumps(PLUGINS).encode("utf-8")
+    with pytest.raises(ValueError):
+        parse_manifest(URL, data[:-10])
+
+
+def test_scanner_returns_elements_as_they_complete():
+    scanner = ArrayScanner()
+    assert scanner.feed('[{"a": 1}, {"b"') == ['{"a": 1}']
+    assert scanner.feed(': [2]}') == []
+    assert scanner.feed(', 3]') == [' {"b": [2]}', " 3"]
+    assert scanner.done
@@ -0,0 +1,60 @@
+from ui.plugin_catalog import PluginCatalog
+
+
+def make_catalog():
+    plugins = [
+        {"Hash": "a", "Name": "A", "InternalName": "Same", "URL": "u1"},
+        {"Hash": "b", "Name": "B", "InternalName": "Other", "URL": "u1", "is_favorite": True},
+        {"Hash": "c", "Name": "C", "InternalName": "Same", "URL": "u2"},
+        {"Hash": "a", "Name": "Duplicate"},
+    ]
+    return plugins, PluginCatalog(plugins)
+
+
+def test_indexes_and_rows():
+    _, catalog = make_catalog()
+    assert len(catalog) == 3
+    assert [plugin["Name"] for plugin in catalog] == ["A", "B", "C"]
+    assert catalog.row("c") == 2 and catalog.row("missing") is None
+    assert catalog.rows({"a", "c", "missing"}) == {0, 2}
+    assert set(catalog.hashes()) == {"a", "b", "c"}
+    assert [plugin["Hash"] for plugin in catalog.by_internal_name("Same")] == ["a", "c"]
+    assert [plugin["Hash"] for plugin in catalog.by_url("u1")] == ["a", "b"]
+    assert catalog.favorite_hashes() == {"b"}
+
+
+def test_set_favorite_copies_the_plugin():
+    plugins, catalog = make_catalog()
+    view = catalog.view()
+    original = catalog.get("a")
+
+    assert catalog.set_favorite("a", True)
+    assert catalog.version == 1
+    assert catalog.is_favorite("a")
+    assert catalog.get("a")["is_favorite"] is True
+    assert catalog[0] is catalog.get("a")
+    assert [plugin["Hash"] for plugin in catalog.favorites()] == ["a", "b"]
+
+    # 原有的插件数据和快照都不变
+    assert "is_favorite" not in original
+    assert "is_favorite" not in plugins[0]
+    assert not view.is_favorite("a")
+    assert view.get("a") is original
+    assert view[0] is original
+    assert catalog.view() is not view
+
+
+def test_set_favorite_unknown_plugin():
+    _, catalog = make_catalog()
+    assert not catalog.set_favorite("missing", True)
+    assert catalog.version == 0
+
+
+def test_view_is_reused_until_favorites_change():
+    _, catalog = make_catalog()
+    view = catalog.view()
+    assert catalog.view() is view
+    catalog.set_favorite("b", False)
+    assert catalog.view() is not view
+    assert catalog.view().favorite_hashes() == frozenset()
+    assert view.is_favorite("b")
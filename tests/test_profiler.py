@@ -0,0 +1,88 @@
+import os
+import threading
+import time
+
+import pytest
+
+from ui.profiler import PROFILE_ENV, SamplingProfiler, profiling_requested
+
+
+def read_lines(path):
+    with open(path, encoding="utf-8") as f:
+        return f.read().splitlines()
+
+
+def test_profiling_requested(monkeypatch):
+    monkeypatch.delenv(PROFILE_ENV, raising=False)
+    assert not profiling_requested(["main.py"])
+    assert profiling_requested(["main.py", "--profile"])
+    monkeypatch.setenv(PROFILE_ENV, "0")
+    assert not profiling_requested([])
+    monkeypatch.setenv(PROFILE_ENV, "1")
+    assert profiling_requested([])
+
+
+def blocked_in_a_named_function(event):
+    event.wait(10)
+
+
+def test_samples_are_written_as_folded_stacks(tmp_path):
+    event = threading.Event()
+    thread = threading.Thread(target=blocked_in_a_named_function, args=(event,), name="Busy;Worker")
+    thread.start()
+    profiler = SamplingProfiler(str(tmp_path / "out"), interval_ms=5).start()
+    deadline = time.monotonic() + 10
+    while profiler.sample_count < 5 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    files = profiler.stop()
+    event.set()
+    thread.join()
+
+    assert [os.path.basename(path).split("-")[0] for path in files] == ["profile", "stalls", "stalls"]
+    stacks = {}
+    for line in read_lines(files[0]):
+        stack, count = line.rsplit(" ", 1)
+        stacks[stack] = int(count)
+    # 分号是帧分隔符，线程名中的分号被替换
+    busy = [stack for stack in stacks if stack.startswith("Busy:Worker;")]
+    assert busy and any("blocked_in_a_named_function (test_profiler.py:" in stack for stack in busy)
+    assert not any(stack.startswith("SamplingProfiler;") for stack in stacks)
+    # 第一次心跳之前不检测卡顿
+    assert read_lines(files[1]) == [] and profiler.stalls == []
+
+
+def test_stall_is_recorded_until_the_next_beat(tmp_path, capsys):
+    profiler = SamplingProfiler(str(tmp_path), interval_ms=10, stall_threshold_ms=100)
+    profiler.beat()
+    beat = profiler._last_beat
+    profiler._check_stall(beat + 0.05, "MainThread;run")
+    assert profiler._stall is None
+
+    profiler._check_stall(beat + 0.15, "MainThread;run;load")
+    profiler._check_stall(beat + 0.16, "MainThread;run;save")
+    profiler._last_beat = beat + 0.3
+    profiler._check_stall(beat + 0.31, "MainThread;run")
+    assert profiler.stalls == [(beat, pytest.approx(0.3), "MainThread;run;load")]
+    assert profiler.stall_samples == {"MainThread;run;load": 10, "MainThread;run;save": 10}
+    assert "界面卡顿 300 毫秒: load" in capsys.readouterr().out
+
+    profiler._t0 = beat - 1
+    files = profiler.write()
+    assert read_lines(files[1]) == ["MainThread;run;load 10", "MainThread;run;save 10"]
+    report = read_lines(files[2])
+    assert "1 次卡顿" in report[0]
+    assert report[2:] == ["1.000 s: 300 ms", "    MainThread", "    run", "    load"]
+
+
+def test_unfinished_stall_is_closed_on_stop(tmp_path):
+    profiler = SamplingProfiler(str(tmp_path), interval_ms=5, stall_threshold_ms=20,
+                                main_thread=threading.current_thread())
+    profiler.start()
+    profiler.beat()
+    # 不再发送心跳，模拟界面线程被阻塞
+    time.sleep(0.3)
+    profiler.stop()
+    assert len(profiler.stalls) == 1
+    start, duration, stack = profiler.stalls[0]
+    assert duration >= 0.02
+    assert "test_unfinished_stall_is_closed_on_stop" in stack
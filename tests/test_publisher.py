@@ -0,0 +1,100 @@
+import json
+import subprocess
+
+import pytest
+
+from ui.publisher import canonical_digest, diff_manifest, publish, publish_due
+from ui.settings_store import JsonStore, open_store
+
+
+def git(args, cwd):
+    return subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True, text=True).stdout
+
+
+@pytest.fixture
+def repo(tmp_path):
+    remote = tmp_path / "remote.git"
+    work = tmp_path / "work"
+    git(["init", "-q", "--bare", str(remote)], tmp_path)
+    git(["init", "-q", str(work)], tmp_path)
+    git(["config", "user.email", "test@example.invalid"], work)
+    git(["config", "user.name", "test"], work)
+    git(["remote", "add", "origin", str(remote)], work)
+    (work / "README").write_text("x", encoding="utf-8")
+    git(["add", "README"], work)
+    git(["commit", "-q", "-m", "init"], work)
+    git(["push", "-q", "-u", "origin", "HEAD"], work)
+    return work
+
+
+def write_settings(repo, **settings):
+    path = str(repo / "settings.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(settings, f)
+    return path
+
+
+def make_plugins(download_count=0):
+    return [{"Name": "Alpha", "InternalName": "Alpha", "AssemblyVersion": "1.0", "DownloadCount": download_count}]
+
+
+def commit_count(repo):
+    return int(git(["rev-list", "--count", "HEAD"], repo))
+
+
+def test_canonical_digest_ignores_order_and_download_count():
+    plugins = make_plugins()
+    reordered = [dict(reversed(list(plugins[0].items())))]
+    assert canonical_digest(plugins) == canonical_digest(reordered) == canonical_digest(make_plugins(9))
+
+
+def test_diff_manifest():
+    old = make_plugins() + [{"Name": "Beta", "InternalName": "Beta"}]
+    new = [dict(make_plugins(5)[0], AssemblyVersion="1.1"), {"Name": "Gamma", "InternalName": "Gamma"}]
+    assert diff_manifest(old, new) == (["Gamma"], ["Beta"], {"Alpha": ["AssemblyVersion"]})
+
+
+def test_commit_without_push_by_default(repo):
+    settings_fp = write_settings(repo)
+    path = str(repo / "PluginMaster.json")
+    result = publish(make_plugins(), path, settings_fp=settings_fp)
+    assert result.ok and result.committed and not result.pushed
+    assert commit_count(repo) == 2
+    assert git(["status", "--porcelain", "--", "PluginMaster.json"], repo) == ""
+    # 未启用推送时远程仓库不变
+    assert git(["rev-parse", "HEAD"], repo) != git(["rev-parse", "@{u}"], repo)
+    assert open_store(settings_fp).get("git_plugin_digest") == result.digest
+
+    again = publish(make_plugins(3), path, settings_fp=settings_fp)
+    assert again.skipped and commit_count(repo) == 2
+
+
+def test_push_when_enabled(repo):
+    settings_fp = write_settings(repo, git_push=True)
+    result = publish(make_plugins(), str(repo / "PluginMaster.json"), settings_fp=settings_fp)
+    assert result.ok and result.committed and result.pushed
+    assert git(["rev-parse", "HEAD"], repo) == git(["rev-parse", "@{u}"], repo)
+
+
+def test_forced_publish_updates_download_count(repo):
+    settings_fp = write_settings(repo, publish_interval_hours=24)
+    path = str(repo / "PluginMaster.json")
+    publish(make_plugins(), path, settings_fp=settings_fp)
+    assert publish(make_plugins(7), path, settings_fp=settings_fp).skipped
+
+    open_store(settings_fp).set("git_plugin_time", "2000-01-01 00:00:00")
+    result = publish(make_plugins(7), path, settings_fp=settings_fp)
+    assert result.ok and result.forced and result.committed
+    with open(path, encoding="utf-8") as f:
+        assert json.load(f)[0]["DownloadCount"] == 7
+    assert commit_count(repo) == 3
+    assert not publish_due(open_store(settings_fp))
+
+
+def test_publish_due(tmp_path):
+    store = JsonStore(str(tmp_path / "settings.json"))
+    assert publish_due(store)
+    store.set("git_plugin_time", "2000-01-01 00:00:00")
+    assert publish_due(store)
+    store.set("publish_interval_hours", 0)
+    assert not publish_due(store)
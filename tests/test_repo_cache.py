@@ -0,0 +1,181 @@
+import gzip
+import hashlib
+import json
+
+import pytest
+
+from ui.repo_cache import RepoCache, body_decompressor, decode_body
+
+
+URL = "https://example.invalid/repo.json"
+MANIFEST = [{"Name": "Combo", "InternalName": "Combo", "RepoUrl": "https://example.invalid/combo"}]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    RepoCache.clear_parsed()
+    yield RepoCache(str(tmp_path / "cache"), ttl_hours=1)
+    RepoCache.clear_parsed()
+
+
+def gzip_body(data=MANIFEST):
+    return gzip.compress(json.dumps(data).encode("utf-8"))
+
+
+def test_decode_body():
+    raw = json.dumps(MANIFEST).encode("utf-8")
+    assert decode_body(raw, "") == raw
+    assert decode_body(gzip.compress(raw), "GZIP") == raw
+    with pytest.raises(ValueError):
+        decode_body(raw, "compress")
+    with pytest.raises(ValueError):
+        decode_body(b"not gzip", "gzip")
+
+
+def test_body_decompressor_is_incremental():
+    raw = json.dumps(MANIFEST).encode("utf-8")
+    body = gzip.compress(raw)
+    decompress = body_decompressor("gzip")
+    assert b"".join(decompress(body[i:i + 7]) for i in range(0, len(body), 7)) == raw
+    with pytest.raises(ValueError):
+        body_decompressor("compress")
+
+
+def test_validators_need_a_stored_body(cache):
+    assert cache.validators(URL) == {}
+    cache.save(URL, {"url": URL, "etag": '"v1"', "last_modified": "Mon, 01 Jan 2024 00:00:00 GMT",
+                     "encoding": "gzip"}, gzip_body(), MANIFEST)
+    assert cache.validators(URL) == {"If-None-Match": '"v1"',
+                                     "If-Modified-Since": "Mon, 01 Jan 2024 00:00:00 GMT"}
+
+
+def test_not_modified_reuses_the_stored_body(cache):
+    cache.save(URL, {"url": URL, "etag": '"v1"', "encoding": "gzip"}, gzip_body(), MANIFEST)
+    RepoCache.clear_parsed()
+    # 新进程中从磁盘上的压缩原始响应解析
+    data = cache.load_data(URL)
+    assert [plugin["Name"] for plugin in data] == ["Combo"]
+    assert cache.load_data(URL) is data
+
+
+def test_touch_keeps_validators_and_body(cache):
+    cache.save(URL, {"url": URL, "etag": '"v1"', "encoding": "gzip"}, gzip_body(), MANIFEST)
+    meta = cache.load_meta(URL)
+    cache.touch(URL)
+    touched = cache.load_meta(URL)
+    assert touched["etag"] == '"v1"' and touched["encoding"] == "gzip"
+    assert touched["fetched_at"] >= meta["fetched_at"]
+    assert cache.is_fresh(URL)
+
+
+OTHER_URL = "https://example.invalid/other.json"
+
+
+def test_each_url_has_its_own_segment(cache):
+    cache.save(URL, {"url": URL, "encoding": "gzip"}, gzip_body(), MANIFEST)
+    other = [{"Name": "Other"}]
+    cache.save(OTHER_URL, {"url": OTHER_URL, "encoding": ""}, json.dumps(other).encode("utf-8"), other)
+    RepoCache.clear_parsed()
+    assert [plugin["Name"] for plugin in cache.load_data(URL)] == ["Combo"]
+    assert [plugin["Name"] for plugin in cache.load_data(OTHER_URL)] == ["Other"]
+    assert cache.load_meta(OTHER_URL)["url"] == OTHER_URL
+    assert cache.load_data("https://example.invalid/missing.json") is None
+
+
+def test_expired_segment_is_not_fresh(cache):
+    cache.save(URL, {"url": URL, "encoding": "gzip"}, gzip_body(), MANIFEST)
+    meta = cache.load_meta(URL)
+    meta["fetched_at"] = "2000-01-01 00:00:00"
+    cache._write_meta(URL, meta)
+    assert not cache.is_fresh(URL)
+    assert not cache.is_fresh(OTHER_URL)
+
+
+def test_save_replaces_files_atomically(cache, tmp_path, monkeypatch):
+    cache.save(URL, {"url": URL, "etag": '"v1"', "encoding": "gzip"}, gzip_body(), MANIFEST)
+    real_replace = __import__("os").replace
+
+    def failing_replace(src, dst):
+        if dst.endswith(".meta.json"):
+            raise OSError("disk full")
+        return real_replace(src, dst)
+
+    monkeypatch.setattr("ui.repo_cache.os.replace", failing_replace)
+    cache.save(URL, {"url": URL, "etag": '"v2"', "encoding": "gzip"}, gzip_body([{"Name": "New"}]), [])
+    monkeypatch.undo()
+    # 元数据仍是上次的内容，不留下临时文件
+    assert cache.load_meta(URL)["etag"] == '"v1"'
+    assert not [name for name in __import__("os").listdir(tmp_path / "cache") if name.endswith(".tmp")]
+
+
+def test_clear_parsed(cache):
+    cache.save(URL, {"url": URL, "encoding": "gzip"}, gzip_body(), MANIFEST)
+    assert cache.load_data(URL) is MANIFEST
+    RepoCache.clear_parsed()
+    assert cache.load_data(URL) is not MANIFEST
+
+
+def test_missing_segment_is_silent(cache, capsys):
+    assert cache.load_data(OTHER_URL) is None
+    assert capsys.readouterr().out == ""
+
+
+def test_parsed_entries_are_kept_until_the_segment_is_rewritten(cache, tmp_path, monkeypatch):
+    cache.save(URL, {"url": URL, "encoding": "gzip"}, gzip_body(), MANIFEST)
+    reads = []
+    monkeypatch.setattr("ui.repo_cache.parse_manifest", lambda url, data: reads.append(url) or [])
+    # 之后的刷新（另一个 RepoCache 实例）收到 304 时不再读取和解码
+    assert RepoCache(str(tmp_path / "cache")).load_data(URL) is MANIFEST
+    assert reads == []
+
+    # 其他进程重写分段后重新解析：保留本进程旧的解析结果，只替换磁盘上的文件
+    monkeypatch.undo()
+    parsed = dict(RepoCache._parsed)
+    other = [{"Name": "Other"}]
+    cache.save(URL, {"url": URL, "encoding": "gzip"}, gzip_body(other), other)
+    RepoCache._parsed.update(parsed)
+    assert [plugin["Name"] for plugin in cache.load_data(URL)] == ["Other"]
+
+
+def test_failed_save_drops_the_parsed_entry(cache, monkeypatch):
+    cache.save(URL, {"url": URL, "encoding": "gzip"}, gzip_body(), MANIFEST)
+
+    def failing_write(path, content):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(cache, "_write_atomic", failing_write)
+    cache.save(URL, {"url": URL, "encoding": "gzip"}, gzip_body([{"Name": "New"}]), [{"Name": "New"}])
+    monkeypatch.undo()
+    # 磁盘上仍是上次的内容，解析结果与之一致
+    assert [plugin["Name"] for plugin in cache.load_data(URL)] == ["Combo"]
+
+
+def test_import_legacy_cache(cache, tmp_path):
+    legacy = [
+        dict(MANIFEST[0], URL=URL, Hash="old", is_favorite=True),
+        {"Name": "Other", "URL": OTHER_URL, "Hash": "old2", "is_favorite": False},
+        {"Name": "No url"},
+    ]
+    legacy_fp = tmp_path / "cache_plugin.json"
+    legacy_fp.write_text(json.dumps(legacy), encoding="utf-8")
+    assert cache.import_legacy(str(legacy_fp)) == 2
+    assert not legacy_fp.exists() and (tmp_path / "cache_plugin.json.migrated").exists()
+
+    # 导入的分段已过期且没有校验信息，但可以先行显示
+    assert not cache.is_fresh(URL)
+    assert cache.validators(URL) == {}
+    data = cache.load_data(URL)
+    assert [plugin["Name"] for plugin in data] == ["Combo"]
+    assert "is_favorite" not in data[0] and "URL" not in data[0]
+    assert data[0]["Hash"] == hashlib.md5((URL + "Combo").encode("utf-8")).hexdigest()
+    # 只导入一次
+    assert cache.import_legacy(str(legacy_fp)) == 0
+
+
+def test_import_legacy_keeps_existing_segments(cache, tmp_path):
+    cache.save(URL, {"url": URL, "encoding": "gzip"}, gzip_body(), MANIFEST)
+    legacy_fp = tmp_path / "cache_plugin.json"
+    legacy_fp.write_text(json.dumps([{"Name": "Old", "URL": URL}]), encoding="utf-8")
+    assert cache.import_legacy(str(legacy_fp)) == 0
+    RepoCache.clear_parsed()
+    assert [plugin["Name"] for plugin in cache.load_data(URL)] == ["Combo"]
@@ -0,0 +1,126 @@
+import json
+import time
+
+import pytest
+
+from bench.stub_server import StubServer
+from ui.manifest_stream import plugin_hash
+from ui.repo_cache import RepoCache
+from ui.repo_fetcher import RepoFetcher
+
+
+MANIFEST = [{"Name": "Alpha", "InternalName": "Alpha"}, {"Name": "Beta", "InternalName": "Beta"}]
+
+
+@pytest.fixture
+def server(monkeypatch):
+    # 不经过环境中配置的代理
+    monkeypatch.setenv("NO_PROXY", "127.0.0.1,localhost")
+    monkeypatch.setenv("no_proxy", "127.0.0.1,localhost")
+    server = StubServer().start()
+    server.set_routes({
+        "/a.json": json.dumps(MANIFEST).encode("utf-8"),
+        "/b.json": json.dumps(MANIFEST[:1]).encode("utf-8"),
+        "/slow.json": b"[]",
+        "/bad.json": b"not json",
+    })
+    yield server
+    server.stop()
+
+
+def test_results_follow_the_url_order(server):
+    urls = [f"{server.base_url}/b.json", f"{server.base_url}/missing.json", f"{server.base_url}/a.json",
+            f"{server.base_url}/bad.json"]
+    completed = []
+    fetcher = RepoFetcher(max_workers=4)
+    try:
+        results = fetcher.fetch_all(urls, on_result=lambda result: completed.append(result.url))
+    finally:
+        fetcher.close()
+    assert [result.url for result in results] == urls
+    assert sorted(completed) == sorted(urls)
+    assert [result.ok for result in results] == [True, False, True, False]
+    assert [plugin["Name"] for plugin in results[2].data] == ["Alpha", "Beta"]
+    assert results[2].data[0]["Hash"] == plugin_hash(urls[2], "Alpha")
+    assert not results[2].not_modified
+
+
+def test_one_session_per_host(server):
+    port = server.server_address[1]
+    urls = [f"{server.base_url}/a.json", f"{server.base_url}/b.json", f"http://localhost:{port}/a.json"]
+    fetcher = RepoFetcher(max_workers=3)
+    results = fetcher.fetch_all(urls)
+    assert all(result.ok for result in results)
+    assert sorted(fetcher._sessions) == sorted([f"127.0.0.1:{port}", f"localhost:{port}"])
+    fetcher.close()
+    assert fetcher._sessions == {}
+
+
+def test_slow_host_is_abandoned_at_the_deadline(server):
+    server.delays["/slow.json"] = 3
+    urls = [f"{server.base_url}/slow.json", f"{server.base_url}/a.json"]
+    fetcher = RepoFetcher(max_workers=2, deadline=0.5)
+    started = time.monotonic()
+    results = fetcher.fetch_all(urls)
+    assert time.monotonic() - started < 2.5
+    assert results[0].error == "deadline" and not results[0].ok
+    assert results[1].ok
+
+    # 被放弃的请求仍在进行，结束之前不关闭 Session
+    fetcher.close()
+    assert fetcher._sessions
+    deadline = time.monotonic() + 10
+    while fetcher._sessions and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert fetcher._sessions == {}
+    assert not fetcher._abandoned
+
+
+@pytest.fixture
+def cache(tmp_path):
+    RepoCache.clear_parsed()
+    yield RepoCache(str(tmp_path / "cache"))
+    RepoCache.clear_parsed()
+
+
+def test_not_modified_reuses_the_cached_entries(server, cache):
+    url = f"{server.base_url}/a.json"
+    fetcher = RepoFetcher(cache=cache)
+    first = fetcher.fetch_one(url)
+    assert first.ok and not first.not_modified
+    meta = cache.load_meta(url)
+    assert meta["etag"] and meta["encoding"] == "gzip"
+    # 缓存的是压缩后的原始字节
+    with open(cache._body_path(url), "rb") as f:
+        assert f.read()[:2] == b"\x1f\x8b"
+
+    second = fetcher.fetch_one(url)
+    fetcher.close()
+    assert second.not_modified
+    assert second.data is first.data
+
+
+def test_changed_manifest_is_downloaded_again(server, cache):
+    url = f"{server.base_url}/a.json"
+    fetcher = RepoFetcher(cache=cache)
+    fetcher.fetch_one(url)
+    server.set_routes(dict(server.routes, **{"/a.json": json.dumps(MANIFEST[1:]).encode("utf-8")}))
+    result = fetcher.fetch_one(url)
+    fetcher.close()
+    assert result.ok and not result.not_modified
+    assert [plugin["Name"] for plugin in result.data] == ["Beta"]
+    assert [plugin["Name"] for plugin in cache.load_data(url)] == ["Beta"]
+
+
+def test_not_modified_without_local_data_falls_back_to_a_full_request(server, cache, monkeypatch):
+    url = f"{server.base_url}/a.json"
+    fetcher = RepoFetcher(cache=cache)
+    fetcher.fetch_one(url)
+    hits = server.hits
+    # 服务器返回 304，但本地数据无法读取
+    monkeypatch.setattr(cache, "load_data", lambda url: None)
+    result = fetcher.fetch_one(url)
+    fetcher.close()
+    assert result.ok and not result.not_modified
+    assert [plugin["Name"] for plugin in result.data] == ["Alpha", "Beta"]
+    assert server.hits == hits + 2
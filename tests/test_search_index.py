@@ -0,0 +1,108 @@
+import random
+
+from bench.synthetic import make_plugin
+from ui.search_index import SearchIndex, normalize, plugin_fields
+
+
+def make_plugins(count, seed=0):
+    rng = random.Random(seed)
+    plugins = []
+    for index in range(count):
+        plugin = make_plugin(rng, index, "http://127.0.0.1", 10)
+        plugin["Hash"] = f"h{index}"
+        plugins.append(plugin)
+    return plugins
+
+
+def brute_force(plugins, query):
+    tokens = normalize(query).split()
+    return {plugin["Hash"] for plugin in plugins
+            if all(any(token in field for field in plugin_fields(plugin)) for token in tokens)}
+
+
+QUERIES = ["combo", "combo rot", "auto h", "a", "he", "helper 12", "12", "author 5", "ROT"]
+
+
+def test_search_matches_every_token_in_any_field():
+    plugins = make_plugins(300)
+    index = SearchIndex(plugins)
+    for query in QUERIES:
+        assert index.search(query) == brute_force(plugins, query), query
+
+
+def test_empty_query_matches_everything():
+    index = SearchIndex(make_plugins(10))
+    assert index.search("") is None
+    assert index.search("   ") is None
+
+
+def test_fullwidth_and_case_are_normalized():
+    plugin = {"Hash": "x", "Name": "Combo Helper", "Tags": ["PvP"]}
+    index = SearchIndex([plugin])
+    assert index.search("ＣＯＭＢＯ") == {"x"}
+    assert index.search("pvp") == {"x"}
+
+
+def test_fuzzy_match_on_name_when_nothing_matches():
+    plugins = [{"Hash": "a", "Name": "Tracker"}, {"Hash": "b", "Name": "Combo"}]
+    index = SearchIndex(plugins)
+    assert index.search("trackr") == {"a"}
+    assert index.search("xyzzy") == set()
+
+
+def test_incremental_updates_match_fresh_build():
+    plugins = make_plugins(400, seed=1)
+    index = SearchIndex(plugins[:300])
+    for plugin in plugins[300:]:
+        index.add(plugin)
+    for plugin in plugins[:50]:
+        index.remove(plugin["Hash"])
+    changed = []
+    for plugin in plugins[50:80]:
+        plugin = dict(plugin, Name="Zeta " + plugin["Name"])
+        changed.append(plugin)
+        index.add(plugin)
+    live = changed + plugins[80:]
+
+    fresh = SearchIndex(live)
+    assert len(index) == len(fresh) == len(live)
+    assert sorted(zip(index._suffixes, index._suffix_words)) == list(zip(fresh._suffixes, fresh._suffix_words))
+    for query in QUERIES + ["zeta", "zeta 5"]:
+        assert index.search(query) == fresh.search(query) == brute_force(live, query), query
+
+
+def test_apply_diff_and_sync():
+    plugins = make_plugins(50)
+    index = SearchIndex(plugins)
+    new_list = [dict(plugins[0], Name="Renamed Plugin")] + plugins[2:] + [{"Hash": "new", "Name": "Brand New"}]
+    index.apply_diff(new_list, added={"new"}, removed={"h1"}, changed={"h0"})
+    assert "h1" not in index
+    assert index.search("renamed") == {"h0"}
+    assert index.search("brand") == {"new"}
+
+    # 同一批对象不需要更新
+    assert index.sync(new_list) == 0
+    assert index.sync(new_list[1:]) == 1
+    assert "h0" not in index
+
+
+def test_token_cache_is_invalidated_by_updates():
+    index = SearchIndex([{"Hash": "a", "Name": "Alpha"}])
+    assert index.search("alp") == {"a"}
+    index.add({"Hash": "b", "Name": "Alpine"})
+    assert index.search("alp") == {"a", "b"}
+    index.remove("a")
+    assert index.search("alp") == {"b"}
+
+
+def test_rank_prefers_name_prefix_then_order():
+    plugins = [
+        {"Hash": "a", "Name": "Helper Tools", "Description": "combo"},
+        {"Hash": "b", "Name": "Combo Helper"},
+        {"Hash": "c", "Name": "Combo Rotation"},
+    ]
+    index = SearchIndex(plugins)
+    matched = index.search("combo")
+    assert index.rank(matched, "combo", limit=3) == ["b", "c", "a"]
+    rows = {"a": 0, "b": 2, "c": 1}
+    assert index.rank(matched, "combo", limit=2, order=rows.get) == ["c", "b"]
@@ -0,0 +1,84 @@
+import json
+import os
+
+from ui.settings_store import JsonStore
+
+
+def read_json(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_json(path, data):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+
+
+def test_changes_are_written_on_flush(tmp_path):
+    path = str(tmp_path / "settings.json")
+    store = JsonStore(path, flush_delay=60)
+    assert not store.exists
+    store.set("a", 1)
+    store.update({"b": [1, 2]})
+    assert store.get("a") == 1
+    assert not os.path.exists(path)
+    assert store.flush()
+    assert read_json(path) == {"a": 1, "b": [1, 2]}
+    assert store.exists
+    assert not os.path.exists(path + ".tmp")
+
+
+def test_close_writes_pending_changes(tmp_path):
+    path = str(tmp_path / "settings.json")
+    store = JsonStore(path, flush_delay=60)
+    store.set("a", 1)
+    store.close()
+    assert read_json(path) == {"a": 1}
+    # 关闭后的修改立即写入
+    store.set("b", 2)
+    assert read_json(path) == {"a": 1, "b": 2}
+
+
+def test_flush_merges_only_changed_keys(tmp_path):
+    path = str(tmp_path / "MyRepo.json")
+    write_json(path, {"a": True, "b": True})
+    gui = JsonStore(path, flush_delay=60)
+    cli = JsonStore(path, flush_delay=60)
+    cli.set("c", True)
+    cli.flush()
+    gui.set("a", False)
+    gui.flush()
+    assert read_json(path) == {"a": False, "b": True, "c": True}
+    # 写入时同时读到了其他进程的修改
+    assert gui.get("c") is True
+
+
+def test_replace_deletes_removed_keys_only(tmp_path):
+    path = str(tmp_path / "MyRepo.json")
+    write_json(path, {"a": True, "b": True})
+    store = JsonStore(path, flush_delay=60)
+    write_json(path, {"a": True, "b": True, "other": 1})
+    store.replace({"a": True})
+    store.flush()
+    assert read_json(path) == {"a": True, "other": 1}
+
+
+def test_corrupt_file_is_backed_up_and_not_overwritten(tmp_path, capsys):
+    path = tmp_path / "settings.json"
+    path.write_text("{not json", encoding="utf-8")
+    store = JsonStore(str(path), flush_delay=60)
+    assert store.corrupt
+    backups = [name for name in os.listdir(tmp_path) if name.startswith("settings.json.corrupt-")]
+    assert len(backups) == 1
+    assert (tmp_path / backups[0]).read_text(encoding="utf-8") == "{not json"
+
+    store.set("a", 1)
+    assert not store.flush()
+    assert path.read_text(encoding="utf-8") == "{not json"
+
+    # 文件修复后写入保留的修改
+    write_json(str(path), {"b": 2})
+    assert store.flush()
+    assert not store.corrupt
+    assert read_json(str(path)) == {"a": 1, "b": 2}
+    assert "无法解析" in capsys.readouterr().out
@@ -0,0 +1,59 @@
+import sys
+import time
+
+import pytest
+
+import ui.startup
+from ui.startup import StartupTimer, process_start_time
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(ui.startup.time, "time", lambda: clock[0])
+    return clock
+
+
+@pytest.mark.skipif(sys.platform not in ("linux", "win32"), reason="只在 Linux 和 Windows 上读取进程启动时间")
+def test_process_start_time():
+    started = process_start_time()
+    assert started is not None and started <= time.time() + 1
+
+
+def test_phases_are_measured_from_the_process_start(clock, monkeypatch):
+    monkeypatch.setattr(ui.startup, "process_start_time", lambda: 999.9)
+    timer = StartupTimer(target_ms=500)
+    clock[0] = 1000.05
+    timer.mark("interpreter")
+    clock[0] = 1000.25
+    timer.mark("imports")
+    clock[0] = 1000.4
+    timer.mark("first_paint")
+    timer.mark("imports")
+    clock[0] = 1000.9
+    timer.mark("cache")
+
+    report = timer.report()
+    assert list(report["phases"]) == ["interpreter", "imports", "first_paint", "cache"]
+    assert report["phases"]["imports"] == {"at_ms": 350.0, "took_ms": 200.0}
+    assert report["phases"]["cache"] == {"at_ms": 1000.0, "took_ms": 500.0}
+    assert report["process_start_known"]
+    assert report["time_to_window_ms"] == 500.0 and report["within_target"]
+
+
+def test_timer_falls_back_to_its_creation_time(clock, monkeypatch, capsys):
+    monkeypatch.setattr(ui.startup, "process_start_time", lambda: None)
+    timer = StartupTimer(target_ms=100)
+    assert timer.time_to_window_ms() is None and not timer.within_target()
+    clock[0] = 1000.02
+    timer.mark("interpreter")
+    clock[0] = 1000.2
+    timer.mark("first_paint")
+    assert timer.origin() == 1000.0
+    assert timer.time_to_window_ms() == pytest.approx(200)
+    assert not timer.within_target()
+
+    timer.print_report()
+    out = capsys.readouterr().out
+    assert "无法获取进程启动时间" in out
+    assert "窗口首次绘制: 200.0 ms，超过目标 100 ms" in out
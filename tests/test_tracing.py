@@ -0,0 +1,79 @@
+import json
+import os
+import threading
+
+import pytest
+
+from ui.tracing import TRACE_ENV, Tracer, trace_path
+
+
+def test_disabled_tracer_returns_the_shared_null_span():
+    tracer = Tracer()
+    first = tracer.span("repo.fetch", url="x")
+    assert first is tracer.span("ui.build")
+    with first as span:
+        span.set(bytes=1)
+    tracer.add("icon.queue_wait", 0.0, 1.0)
+    assert tracer.begin_refresh() is None
+    assert tracer.records == [] and tracer.refreshes == []
+
+
+def test_span_records_args_and_errors():
+    tracer = Tracer(enabled=True)
+    with tracer.span("repo.fetch", url="x") as span:
+        span.set(bytes=10)
+    with pytest.raises(KeyError):
+        with tracer.span("cache.load"):
+            raise KeyError("x")
+    (name, start, duration, tid, refresh_id, args), failed = tracer.records
+    assert name == "repo.fetch" and duration >= 0 and refresh_id == 0
+    assert tid == threading.get_ident()
+    assert args == {"url": "x", "bytes": 10}
+    assert failed[0] == "cache.load" and failed[5] == {"error": "KeyError"}
+
+
+def test_summary_is_grouped_by_refresh():
+    tracer = Tracer(enabled=True)
+    tracer.add("repo.fetch", 0.0, 0.001)
+    assert tracer.begin_refresh("刷新") == 1
+    for index in range(1, 5):
+        tracer.add("repo.fetch", 0.0, index / 1000)
+    tracer.add("ui.build", 0.0, 0.02)
+    rows = tracer.summary(1)
+    assert [row[0] for row in rows] == ["ui.build", "repo.fetch"]
+    assert rows[1][:2] == ("repo.fetch", 4)
+    assert rows[1][2] == pytest.approx(10) and rows[1][5] == pytest.approx(4)
+    assert [row[:2] for row in tracer.summary()] == [("ui.build", 1), ("repo.fetch", 5)]
+    report = tracer.report()
+    assert report.index("[启动]") < report.index("[刷新 #1]")
+
+
+def test_chrome_trace_export(tmp_path):
+    tracer = Tracer(enabled=True)
+    tracer.begin_refresh()
+    with tracer.span("icon.download", url="https://example.invalid/a.png"):
+        pass
+    path = str(tmp_path / "trace.json")
+    assert tracer.export_chrome(path)
+    with open(path, encoding="utf-8") as f:
+        trace = json.load(f)
+    events = {event["ph"]: event for event in trace["traceEvents"]}
+    assert events["M"]["args"]["name"] == threading.current_thread().name
+    assert events["i"]["name"] == "refresh #1"
+    complete = events["X"]
+    assert complete["name"] == "icon.download" and complete["cat"] == "icon"
+    assert complete["pid"] == os.getpid() and complete["dur"] >= 0
+    assert complete["args"] == {"url": "https://example.invalid/a.png", "refresh": 1}
+
+    assert not tracer.export_chrome(str(tmp_path / "missing" / "trace.json"))
+
+
+def test_trace_path(tmp_path, monkeypatch):
+    monkeypatch.delenv(TRACE_ENV, raising=False)
+    assert trace_path(str(tmp_path)) is None
+    monkeypatch.setenv(TRACE_ENV, "0")
+    assert trace_path(str(tmp_path)) is None
+    monkeypatch.setenv(TRACE_ENV, "1")
+    assert trace_path(str(tmp_path)) == os.path.join(str(tmp_path), "trace.json")
+    monkeypatch.setenv(TRACE_ENV, str(tmp_path / "out.json"))
+    assert trace_path("unused") == str(tmp_path / "out.json")
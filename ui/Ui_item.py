@@ -1,37 +1,134 @@
 from PyQt5 import QtWidgets, QtCore, QtGui
-import json
-import os
-import hashlib
+import html
+from collections import OrderedDict
 from datetime import datetime  # 将导入移到文件开头
-import sys
+from ui.pixmap_cache import shared_pixmap
+from ui.plugin_catalog import PluginCatalog
+from ui.settings_store import open_store
+# 配置文件路径仍使用原逻辑
+from ui.paths import MYREPO_PATH, SETTING_PATH, LIKE_PATH as like_path, NOTLIKE_PATH as notlike_path
+
+DETAILS_CACHE_SIZE = 64  # 最多缓存多少个插件的详情 HTML
+
+# 插件 Hash 到 (生成时的插件数据副本, 详情 HTML)，插件内容变化后重新生成
+_details_html_cache = OrderedDict()
+
+
+def _append_json_html(parts, data, indent=0):
+    """
+    将 JSON 数据转换为带有不同颜色的 HTML 片段，追加到 parts 中，键和值都会转义。
+
+    :param parts: 保存 HTML 片段的列表
+    :param data: JSON 数据
+    :param indent: 缩进级别
+    """
+    space = "  " * indent
+    if isinstance(data, dict):
+        parts.append("<div>")
+        for key, value in data.items():
+            parts.append(f"{space}<span style='color: blue;'>{html.escape(str(key))}:</span> ")
+            _append_json_html(parts, value, indent + 1)
+            parts.append("<br>")
+        parts.append("</div>")
+    elif isinstance(data, list):
+        parts.append("<div>")
+        for item in data:
+            parts.append(f"{space}- ")
+            _append_json_html(parts, item, indent + 1)
+            parts.append("<br>")
+        parts.append("</div>")
+    else:
+        parts.append(f"<span style='color: green;'>{html.escape(str(data))}</span>")
+
+
+def render_details_html(plugin_hash, plugin_json):
+    """
+    获取插件详情的 HTML，按 Hash 缓存，插件内容与生成时不同时重新生成。
+
+    :param plugin_hash: 插件的哈希值
+    :param plugin_json: 插件数据
+    :return: HTML 字符串
+    """
+    cached = _details_html_cache.get(plugin_hash)
+    if cached is not None and cached[0] == plugin_json:
+        _details_html_cache.move_to_end(plugin_hash)
+        return cached[1]
+    parts = []
+    _append_json_html(parts, plugin_json)
+    details_html = "".join(parts)
+    _details_html_cache[plugin_hash] = (dict(plugin_json), details_html)
+    _details_html_cache.move_to_end(plugin_hash)
+    while len(_details_html_cache) > DETAILS_CACHE_SIZE:
+        _details_html_cache.popitem(last=False)
+    return details_html
+
+
+def toggle_plugin_favorite(catalog, plugin_hash):
+    """
+    切换插件的收藏状态，同时修改 MyRepo.json 文件，更新 settings.json 中的时间戳。
+
+    :param catalog: PluginCatalog 实例
+    :param plugin_hash: 插件的哈希值
+    :return: 切换后的收藏状态，未找到插件时返回 None
+    """
+    if plugin_hash not in catalog:
+        print(f"未找到 Hash 值为 {plugin_hash} 的插件")
+        return None
 
+    # 切换收藏状态
+    is_favorite = not catalog.is_favorite(plugin_hash)
+    catalog.set_favorite(plugin_hash, is_favorite)
 
+    # 修改只写入内存，稍后由后台线程写入 MyRepo.json
+    open_store(MYREPO_PATH).set(str(plugin_hash), is_favorite)
 
-# 配置文件路径仍使用原逻辑
-if getattr(sys, 'frozen', False):
-    BASE_DIR = os.path.dirname(sys.executable)
-else:
-    BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-MYREPO_PATH = os.path.join(BASE_DIR, "MyRepo.json")
-SETTING_PATH = os.path.join(BASE_DIR, "settings.json")
-like_path = os.path.join(BASE_DIR, "img", "like.png")
-notlike_path = os.path.join(BASE_DIR, "img", "notlike.png")
+    # 更新 settings.json 中的 my_plugin_time 字段
+    update_settings_timestamp()
+
+    return is_favorite
+
+
+def read_favorite_dict():
+    """读取 MyRepo.json 文件内容（内存中的副本）"""
+    return open_store(MYREPO_PATH).snapshot()
+
+
+def write_favorite_dict(favorite_dict):
+    """替换 MyRepo.json 文件内容，稍后写入磁盘"""
+    open_store(MYREPO_PATH).replace(favorite_dict)
+
+
+def update_settings_timestamp():
+    """更新 settings.json 中的 my_plugin_time 字段，稍后写入磁盘"""
+    settings = open_store(SETTING_PATH)
+    if not settings.exists:
+        print(f"{SETTING_PATH} 文件未找到")
+        return
+    settings.set("my_plugin_time", datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
 
 
 class Ui_Form(QtCore.QObject):
     icon_loaded = QtCore.pyqtSignal(QtGui.QPixmap)
+    details_toggled = QtCore.pyqtSignal(bool)  # 详情区显示状态切换
+    favorite_toggled = QtCore.pyqtSignal(str, bool)  # 收藏状态切换，参数为 Hash 和新状态
 
-    def __init__(self, parent=None, plugin_list=None):
+    def __init__(self, parent=None, catalog=None):
         super().__init__(parent)
         self.icon_loaded.connect(self.update_icon)
-        self.plugin_list = plugin_list if plugin_list else []
+        self.catalog = catalog if catalog is not None else PluginCatalog()
         self.Form = None
+        self.widget_details = None  # 详情区，第一次展开时创建，收起时释放
+        self.json_label = None
+        self.plugin_hash = None
+        self.plugin_json = None
 
     def setupUi(self, Form, name, info, pixmap, plugin_hash, plugin_json=None):
         Form.setObjectName("Form")
         Form.resize(600, 80)
 
         self.Form = Form
+        self.plugin_hash = plugin_hash
+        self.plugin_json = plugin_json
 
         # 创建垂直布局
         self.verticalLayout = QtWidgets.QVBoxLayout(Form)
@@ -82,9 +179,7 @@ class Ui_Form(QtCore.QObject):
         self.favorite_label.setFixedSize(32, 32)
         # 初始化收藏状态
         self.is_favorite = self.get_plugin_favorite_status(plugin_hash)
-        self.favorite_label.setPixmap(
-            QtGui.QPixmap(like_path if self.is_favorite else notlike_path).scaled(32, 32, QtCore.Qt.KeepAspectRatio)
-        )
+        self.favorite_label.setPixmap(shared_pixmap(like_path if self.is_favorite else notlike_path, 32))
         favorite_layout.addWidget(self.favorite_label)
 
         # 将收藏 widget 添加到最右边
@@ -92,34 +187,6 @@ class Ui_Form(QtCore.QObject):
 
         self.verticalLayout.addWidget(self.widget_item)
 
-        # 创建 widget_details
-        self.widget_details = QtWidgets.QWidget(Form)
-        self.widget_details.setStyleSheet("background-color: white;")
-        self.widget_details.setMinimumSize(600, 300)
-        self.widget_details.setVisible(False)
-
-        # 创建滚动区域
-        scroll_area = QtWidgets.QScrollArea(self.widget_details)
-        scroll_area.setWidgetResizable(True)
-
-        # 创建用于显示 JSON 内容的标签
-        self.json_label = QtWidgets.QLabel(scroll_area)
-        self.json_label.setWordWrap(True)
-        self.json_label.setAlignment(QtCore.Qt.AlignTop | QtCore.Qt.AlignLeft)
-        if plugin_json:
-            # 格式化 JSON 内容，使用不同颜色显示键和值
-            formatted_html = self._format_json_to_html(plugin_json)
-            self.json_label.setText(formatted_html)
-
-        # 将标签设置为滚动区域的 widget
-        scroll_area.setWidget(self.json_label)
-
-        # 将滚动区域添加到 widget_details 的布局中
-        details_layout = QtWidgets.QVBoxLayout(self.widget_details)
-        details_layout.addWidget(scroll_area)
-
-        self.verticalLayout.addWidget(self.widget_details)
-
         self.retranslateUi(Form)
         QtCore.QMetaObject.connectSlotsByName(Form)
 
@@ -136,10 +203,7 @@ class Ui_Form(QtCore.QObject):
         :param plugin_hash: 插件的哈希值
         :return: 插件的收藏状态
         """
-        for plugin in self.plugin_list:
-            if plugin.get("Hash") == plugin_hash:
-                return plugin.get("is_favorite", False)
-        return False
+        return self.catalog.is_favorite(plugin_hash)
 
     def eventFilter(self, obj, event):
         if obj == self.widget_item:
@@ -161,30 +225,58 @@ class Ui_Form(QtCore.QObject):
         :param indent: 缩进级别
         :return: 格式化后的 HTML 字符串
         """
-        html = ""
-        space = "  " * indent
-        if isinstance(data, dict):
-            html += "<div>"
-            for key, value in data.items():
-                html += f"{space}<span style='color: blue;'>{key}:</span> "
-                html += self._format_json_to_html(value, indent + 1)
-                html += "<br>"
-            html += "</div>"
-        elif isinstance(data, list):
-            html += "<div>"
-            for item in data:
-                html += f"{space}- "
-                html += self._format_json_to_html(item, indent + 1)
-                html += "<br>"
-            html += "</div>"
-        else:
-            html += f"<span style='color: green;'>{data}</span>"
-        return html
+        parts = []
+        _append_json_html(parts, data, indent)
+        return "".join(parts)
+
+    def _create_details(self):
+        """
+        创建详情区，显示插件的完整数据。
+        """
+        self.widget_details = QtWidgets.QWidget(self.Form)
+        self.widget_details.setStyleSheet("background-color: white;")
+        self.widget_details.setMinimumSize(600, 300)
+
+        # 创建滚动区域
+        scroll_area = QtWidgets.QScrollArea(self.widget_details)
+        scroll_area.setWidgetResizable(True)
+
+        # 创建用于显示 JSON 内容的标签
+        self.json_label = QtWidgets.QLabel(scroll_area)
+        self.json_label.setWordWrap(True)
+        self.json_label.setAlignment(QtCore.Qt.AlignTop | QtCore.Qt.AlignLeft)
+        if self.plugin_json:
+            # 格式化 JSON 内容，使用不同颜色显示键和值
+            self.json_label.setText(render_details_html(self.plugin_hash, self.plugin_json))
+
+        # 将标签设置为滚动区域的 widget
+        scroll_area.setWidget(self.json_label)
+
+        # 将滚动区域添加到 widget_details 的布局中
+        details_layout = QtWidgets.QVBoxLayout(self.widget_details)
+        details_layout.addWidget(scroll_area)
+
+        self.verticalLayout.addWidget(self.widget_details)
+
+    def _release_details(self):
+        """
+        释放详情区。
+        """
+        if self.widget_details is None:
+            return
+        self.verticalLayout.removeWidget(self.widget_details)
+        self.widget_details.deleteLater()
+        self.widget_details = None
+        self.json_label = None
 
     def toggle_widget_details(self, name):
-        # 切换 widget_details 的显示状态
-        self.widget_details.setVisible(not self.widget_details.isVisible())
-        print(f"widget_item 被点击，名称为 {name}，widget_details 显示状态已切换")
+        # 切换 widget_details 的显示状态，第一次展开时才创建，收起时释放
+        visible = self.widget_details is None
+        if visible:
+            self._create_details()
+        else:
+            self._release_details()
+        self.details_toggled.emit(visible)
 
     def toggle_favorite(self, plugin_hash):
         """
@@ -192,69 +284,14 @@ class Ui_Form(QtCore.QObject):
 
         :param plugin_hash: 插件的哈希值
         """
-        print("当前程序目录:", BASE_DIR)
-        print("MyRepo.json 路径:", MYREPO_PATH)
-        for plugin in self.plugin_list:
-            if plugin["Hash"] == plugin_hash:
-                # 切换收藏状态
-                plugin["is_favorite"] = not plugin["is_favorite"]
-                self.is_favorite = plugin["is_favorite"]
-                print(self.is_favorite)
-                # 更新图标显示
-                icon_path = like_path if self.is_favorite else notlike_path
-                self.favorite_label.setPixmap(
-                    QtGui.QPixmap(icon_path).scaled(32, 32, QtCore.Qt.KeepAspectRatio)
-                )
-
-                # 读取并更新 MyRepo.json 文件
-                favorite_dict = self._read_favorite_dict()
-                favorite_dict[str(plugin_hash)] = self.is_favorite
-                self._write_favorite_dict(favorite_dict)
-
-                # 更新 settings.json 中的 my_plugin_time 字段
-                self._update_settings_timestamp()
-
-                return
-        print(f"未找到 Hash 值为 {plugin_hash} 的插件")
-
-    def _read_favorite_dict(self):
-        """读取 MyRepo.json 文件内容"""
-        favorite_dict = {}
-        if os.path.exists(MYREPO_PATH):
-            try:
-                with open(MYREPO_PATH, "r", encoding="utf-8") as f:
-                    favorite_dict = json.load(f)
-            except FileNotFoundError:
-                print(f"{MYREPO_PATH} 文件未找到")
-            except json.JSONDecodeError as e:
-                print(f"解析 {MYREPO_PATH} 时出错: {e}")
-        return favorite_dict
-
-    def _write_favorite_dict(self, favorite_dict):
-        """写入 MyRepo.json 文件"""
-        try:
-            with open(MYREPO_PATH, "w", encoding="utf-8") as f:
-                json.dump(favorite_dict, f, ensure_ascii=False, indent=4)
-        except Exception as e:
-            print(f"写入 {MYREPO_PATH} 时出错: {e}")
-
-    def _update_settings_timestamp(self):
-        """更新 settings.json 中的 my_plugin_time 字段"""
-        if os.path.exists(SETTING_PATH):
-            print("settings.json 存在")
-            try:
-                current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                with open(SETTING_PATH, "r", encoding="utf-8") as f:
-                    settings = json.load(f)
-                settings["my_plugin_time"] = current_time
-                with open(SETTING_PATH, "w", encoding="utf-8") as f:
-                    json.dump(settings, f, ensure_ascii=False, indent=4)
-            except FileNotFoundError:
-                print(f"{SETTING_PATH} 文件未找到")
-            except json.JSONDecodeError as e:
-                print(f"解析 {SETTING_PATH} 时出错: {e}")
-            except Exception as e:
-                print(f"更新 {SETTING_PATH} 时出错: {e}")
+        is_favorite = toggle_plugin_favorite(self.catalog, plugin_hash)
+        if is_favorite is None:
+            return
+        self.is_favorite = is_favorite
+        # 更新图标显示
+        icon_path = like_path if self.is_favorite else notlike_path
+        self.favorite_label.setPixmap(shared_pixmap(icon_path, 32))
+        self.favorite_toggled.emit(plugin_hash, self.is_favorite)
 
     def retranslateUi(self, Form):
         _translate = QtCore.QCoreApplication.translate
@@ -274,7 +311,7 @@ class Ui_Form(QtCore.QObject):
 
         :return: 包含所有收藏插件的列表
         """
-        return [plugin for plugin in self.plugin_list if plugin.get("is_favorite", False)]
+        return self.catalog.favorites()
     
     def set_visible(self, visible):
         """
@@ -283,4 +320,4 @@ class Ui_Form(QtCore.QObject):
         :param visible: 布尔值，True 表示可见，False 表示不可见
         """
         self.Form.setVisible(visible)
-        self.widget_details.setVisible(False)
\ No newline at end of file
+        self._release_details()
\ No newline at end of file
@@ -3,373 +3,146 @@
 """
 import os
 import hashlib
-import json
-import requests
-from datetime import datetime, timedelta
+import sqlite3
 from PyQt5 import QtWidgets, QtCore, QtGui  # 已有导入
 from PyQt5.QtCore import QObject, QThread, pyqtSignal  # 新增 QObject 导入
-from ui.Ui_item import Ui_Form
-from PIL import Image  # 导入 Pillow 库
-import sys
+from ui.Ui_item import Ui_Form, toggle_plugin_favorite
+from ui.plugin_model import PluginListModel, PluginItemDelegate, HashRole, PluginRole
+from ui.plugin_diff import diff_plugin_lists
+from ui.icon_scheduler import (IconScheduler, DEFAULT_ICON_WORKERS, DEFAULT_THUMBNAIL_WORKERS,
+                               PRIORITY_VISIBLE, PRIORITY_OFFSCREEN)
+from ui.pixmap_cache import PixmapCache, shared_pixmap, DEFAULT_PIXMAP_CACHE_MB
+from ui.icon_store import IconStore, DEFAULT_STORE_MB, DEFAULT_MAX_AGE_DAYS
+from ui.search_index import SearchIndex
+from ui.plugin_catalog import PluginCatalog
+from ui.settings_store import open_store, flush_all
+from ui.plugin_service import PluginListService, get_catalog_db, build_plugin_master
+from ui.publisher import publish
+from ui.tracing import tracer
+# 配置文件路径仍使用原逻辑（非资源文件），与命令行共用
+from ui.paths import (BASE_DIR, ICON_PATH, SPINNER_PATH, CACHE_DIR, ICON_STORE_DIR, SETTING_PATH, MYREPO_PATH,
+                      REPO_CACHE_DIR, REPO_INDEX_PATH, PLUGIN_MASTER_PATH, CATALOG_DB_PATH)
+
+FILTER_DELAY_MS = 150  # 输入停止多久后开始筛选
+RANK_LIMIT = 1000  # 匹配行数不超过该值时滚动到最相关的插件
 
-# 配置文件路径仍使用原逻辑（非资源文件）
-if getattr(sys, 'frozen', False):
-    BASE_DIR = os.path.dirname(sys.executable)
-else:
-    BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-ICON_PATH = os.path.join(BASE_DIR, "img", "icon.png")
-SPINNER_PATH = os.path.join(BASE_DIR, "img", "spin.gif")
-CACHE_DIR = os.path.join(BASE_DIR, "icon_cache")
-os.makedirs(CACHE_DIR, exist_ok=True)
 
-
-SETTING_PATH = os.path.join(BASE_DIR, "settings.json")
-MYREPO_PATH = os.path.join(BASE_DIR, "MyRepo.json")
-CACHE_PLUGIN_PATH = os.path.join(BASE_DIR, "cache_plugin.json")
-REPO_INDEX_PATH = os.path.join(BASE_DIR, "RepoIndex.txt")
-PLUGIN_MASTER_PATH = os.path.join(BASE_DIR, "PluginMaster.json")
-
-
-class IconLoader(QtCore.QThread):
+class PluginListUpdater(QThread):
     """
-    图标加载线程类，负责从网络或缓存加载图标，同时移除 PNG 图像的 iCCP 信息。
+    用于在单独线程中获取和更新插件列表的类，继承自 QThread。
+    加载逻辑由 PluginListService 实现，本类只把各阶段的结果以信号发送给界面。
+    结果以 PluginCatalog 的形式发送，界面和 Git 线程共享同一个目录。
+    渐进模式下每个仓库完成时立即发送该仓库的插件，全部完成后仍发送 plugin_list_updated。
+    需要时在本线程中为第一个发送的目录构建搜索索引，之后由界面按差异增量更新。
     """
-    icon_loaded = QtCore.pyqtSignal(QtGui.QPixmap, object)
+    plugin_list_updated = pyqtSignal(object)  # 参数为 PluginCatalog，刷新完成时发送
+    stale_plugin_list_loaded = pyqtSignal(object)  # 后台刷新前先发送的过期缓存目录
+    repo_index_loaded = pyqtSignal(list)  # 渐进模式下开始拉取前发送仓库 URL 列表，即各仓库的显示顺序
+    repo_loaded = pyqtSignal(str, object, float)  # 渐进模式下每个仓库完成时发送：URL、插件列表和耗时（秒）
+    search_index_built = pyqtSignal(object)  # 参数为 SearchIndex，在发送目录之后构建完成时发送
 
-    def __init__(self, icon_url, cache_file, ui, default_pixmap, proxy):
-        super().__init__()
-        self.icon_url = icon_url
-        self.cache_file = cache_file
-        self.ui = ui
-        self.default_pixmap = default_pixmap
-        self.proxy = proxy
-        # print(f"IconLoader initialized with URL: {self.icon_url}, Cache file: {self.cache_file}")
-
-    def remove_iccp_profile(self, image_path):
+    def __init__(self, settings_fp=SETTING_PATH, force_update=False, stale_while_revalidate=False,
+                 progressive=False, build_search_index=False):
         """
-        更彻底地移除 PNG 图像中的 iCCP 信息。
-
-        :param image_path: 图像文件的路径
+        :param settings_fp: 设置文件路径
+        :param force_update: 是否忽略缓存强制拉取全部仓库
+        :param stale_while_revalidate: 缓存过期时是否先发送过期缓存，再在后台刷新
+        :param progressive: 是否在每个仓库完成时发送 repo_loaded
+        :param build_search_index: 是否在本线程中构建搜索索引并发送 search_index_built
         """
-        try:
-            img = Image.open(image_path)
-            # 转换图像模式为 RGB，避免保存时保留元数据
-            if img.mode in ('RGBA', 'LA'):
-                background = Image.new('RGB', img.size, (255, 255, 255))
-                background.paste(img, mask=img.split()[-1])
-                img = background
-            elif img.mode != 'RGB':
-                img = img.convert('RGB')
-
-            # 保存处理后的图像，明确指定参数以移除元数据
-            img.save(image_path, "PNG", optimize=True, quality=95, icc_profile=b'')
-            # print(f"Successfully removed iCCP profile from {image_path}")
-        except Exception as e:
-            # print(f"处理图像 {image_path} 时出错: {e}")
-            pass
+        super().__init__()
+        self.service = PluginListService(settings_fp, force_update=force_update,
+                                         stale_while_revalidate=stale_while_revalidate, progressive=progressive)
+        self.build_search_index = build_search_index
 
     def run(self):
         """
-        线程执行的主要逻辑，优先从缓存加载图标，若缓存不存在则从网络或本地加载，
-        保存图标时移除 iCCP 信息。
+        线程执行的主要逻辑，加载插件列表，完成后发送信号。
         """
-        if os.path.exists(self.cache_file):
-            # print(f"Loading icon from cache: {self.cache_file}")
-            pixmap = QtGui.QPixmap(self.cache_file)
-            if not pixmap.isNull():
-                # print(f"Successfully loaded icon from cache: {self.cache_file}")
-                self.icon_loaded.emit(pixmap, self.ui)
-                return
-            else:
-                # print(f"Failed to load icon from cache: {self.cache_file}")
-                pass
-
-        # 检查是否为本地文件路径
-        if os.path.exists(self.icon_url):
-            # print(f"Loading local icon: {self.icon_url}")
-            self._load_and_save_icon(self.icon_url)
-            return
+        catalog = self.service.load(on_stale=self._on_stale,
+                                    on_repo_index=self.repo_index_loaded.emit,
+                                    on_repo=self.repo_loaded.emit)
+        self.plugin_list_updated.emit(catalog)
+        self._build_search_index(catalog)
 
-        try:
-            # print(f"Downloading icon from {self.icon_url}")
-            response = requests.get(self.icon_url, proxies=self.proxy, timeout=5)
-            response.raise_for_status()
-            with open(self.cache_file, 'wb') as f:
-                f.write(response.content)
-            # print(f"Successfully downloaded icon to {self.cache_file}")
-            self._load_and_save_icon(self.cache_file)
-        except requests.RequestException as e:
-            # print(f"请求图片 {self.icon_url} 时出错: {e}")
-            self.icon_loaded.emit(self.default_pixmap, self.ui)
-
-    def _load_and_save_icon(self, image_path):
-        """
-        加载图标并保存到缓存，同时移除 iCCP 信息。
-
-        :param image_path: 图像文件的路径
-        """
-        pixmap = QtGui.QPixmap(image_path)
-        if not pixmap.isNull():
-            # 保存到缓存
-            pixmap.save(self.cache_file)
-            if self.cache_file.lower().endswith('.png'):
-                self.remove_iccp_profile(self.cache_file)
-            # print(f"Successfully loaded and saved icon: {image_path}")
-            self.icon_loaded.emit(pixmap, self.ui)
-        else:
-            # print(f"无法加载图片: {image_path}，可能是不支持的格式")
-            self.icon_loaded.emit(self.default_pixmap, self.ui)
+    def _on_stale(self, catalog):
+        self.stale_plugin_list_loaded.emit(catalog)
+        # 过期缓存可能显示较长时间，先为它构建索引
+        self._build_search_index(catalog)
 
-
-class PluginListUpdater(QThread):
-    """
-    用于在单独线程中获取和更新插件列表的类，继承自 QThread。
-    带有缓存机制，程序启动时优先读取缓存，缓存过期或强制更新时从互联网拉取更新，
-    并更新插件的收藏状态。
-    """
-    plugin_list_updated = pyqtSignal(list)
-
-    def __init__(self, settings_fp=SETTING_PATH, force_update=False):
-        super().__init__()
-        self.settings_fp = settings_fp
-        self.force_update = force_update
-
-    def _get_cache_plugin_list(self, cache_plugin_fp, cache_plugin_time):
-        """
-        尝试从缓存文件中获取插件列表，若缓存未过期则返回缓存数据。
-
-        :param cache_plugin_fp: 缓存插件文件的路径
-        :param cache_plugin_time: 缓存有效时间，格式为 "%Y-%m-%d %H:%M:%S"
-        :return: 缓存的插件列表或空列表
-        """
-        try:
-            cache_time = datetime.strptime(cache_plugin_time, "%Y-%m-%d %H:%M:%S")
-            if os.path.exists(cache_plugin_fp):
-                now = datetime.now()
-                if now - cache_time < timedelta(hours=24):
-                    with open(cache_plugin_fp, "r", encoding="utf-8") as f:
-                        return json.load(f)
-        except FileNotFoundError:
-            pass
-        except ValueError:
-            print("缓存时间格式错误，应使用 '%Y-%m-%d %H:%M:%S' 格式。")
-        return []
-
-    def _fetch_new_plugin_list(self, repo_index_fp, proxies):
-        """
-        从指定的仓库索引文件中读取 URL，请求这些 URL 并处理返回的数据，生成新的插件列表。
-
-        :param repo_index_fp: 存储仓库索引的文件路径
-        :param proxies: 代理配置，字典类型
-        :return: 新的插件列表
-        """
-        try:
-            with open(repo_index_fp, "r") as f:
-                repo_index = f.readlines()
-        except FileNotFoundError:
-            print(f"文件 {repo_index_fp} 未找到。")
-            return []
-
-        plugin_list = []
-        hash_set = set()
-        for index, i in enumerate(repo_index):
-            url = i.strip()
-            if url.startswith("##"):
-                continue
-            try:
-                response = requests.get(url, proxies=proxies, timeout=10).text
-                data = json.loads(response)
-                print(index)
-                for j in data:
-                    j["URL"] = url
-                    # 使用 hashlib.md5 生成确定的哈希值
-                    combined_str = (url + j["Name"]).encode('utf-8')
-                    plugin_hash = hashlib.md5(combined_str).hexdigest()
-                    if plugin_hash in hash_set:
-                        continue
-                    hash_set.add(plugin_hash)
-                    j["Hash"] = plugin_hash
-                    j["is_favorite"] = False
-                    plugin_list.append(j)
-            except requests.RequestException as e:
-                print(f"请求 {url} 时出错: {e}")
-            except json.JSONDecodeError as e:
-                print(f"解析 {url} 的响应数据时出错: {e}")
-        return plugin_list
-
-    def _update_cache_and_settings(self, cache_plugin_fp, plugin_list):
-        """
-        将新获取的插件列表写入缓存文件，并更新设置文件中的缓存时间。
-
-        :param cache_plugin_fp: 缓存插件文件的路径
-        :param plugin_list: 新的插件列表
+    def _build_search_index(self, catalog):
         """
-        try:
-            with open(cache_plugin_fp, "w", encoding="utf-8") as f:
-                json.dump(plugin_list, f, ensure_ascii=False, indent=4)
-            with open(self.settings_fp, "r", encoding="utf-8") as f:
-                settings = json.load(f)
-            settings["cache_plugin_time"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            with open(self.settings_fp, "w", encoding="utf-8") as f:
-                json.dump(settings, f, ensure_ascii=False, indent=4)
-        except Exception as e:
-            print(f"写入缓存文件 {cache_plugin_fp} 时出错: {e}")
-
-    def update_favorite_status(self, plugin_list, my_plugin_fp=MYREPO_PATH):
-        """
-        读取 MyRepo.json 文件，如果文件不存在则创建，更新 plugin_list 里的 "is_favorite" 字段。
-
-        :param plugin_list: 插件列表
-        :param my_plugin_fp: MyRepo.json 文件的路径，默认为 "MyRepo.json"
-        :return: 更新后的插件列表
-        """
-        print("当前程序目录:", BASE_DIR)
-        print("MyRepo.json 路径:", my_plugin_fp)
-        favorite_dict = {}
-        try:
-            with open(my_plugin_fp, "r", encoding="utf-8") as f:
-                favorite_dict = json.load(f)
-        except FileNotFoundError:
-            favorite_dict = {str(plugin["Hash"]): False for plugin in plugin_list}
-            try:
-                with open(my_plugin_fp, "w", encoding="utf-8") as f:
-                    json.dump(favorite_dict, f, ensure_ascii=False, indent=4)
-            except Exception as e:
-                print(f"创建 {my_plugin_fp} 时出错: {e}")
-        except Exception as e:
-            print(f"读取 {my_plugin_fp} 时出错: {e}")
-
-        for plugin in plugin_list:
-            plugin_hash = str(plugin["Hash"])
-            if plugin_hash in favorite_dict:
-                plugin["is_favorite"] = favorite_dict[plugin_hash]
-        return plugin_list
+        为目录构建搜索索引并发送，只构建一次。SQLite 插件目录由数据库完成筛选，不构建。
 
-    def run(self):
-        """
-        线程执行的主要逻辑，从设置文件中读取配置，
-        缓存过期或强制更新时从互联网拉取更新，完成后发送信号。
+        :param catalog: 插件目录
         """
-        try:
-            with open(self.settings_fp, "r", encoding="utf-8") as f:
-                settings = json.load(f)
-                proxies = settings.get("proxy", {})
-                repo_index_fp = REPO_INDEX_PATH
-                cache_plugin_fp = CACHE_PLUGIN_PATH
-                my_plugin_fp = MYREPO_PATH
-                cache_plugin_time = settings.get("cache_plugin_time", "2023-01-01 00:00:00")
-        except FileNotFoundError:
-            print(f"未找到设置文件 {self.settings_fp}")
-            self.plugin_list_updated.emit([])
+        if not self.build_search_index or catalog.loader is not None:
             return
-
-        cache_plugin_list = []
-        if not self.force_update:
-            cache_plugin_list = self._get_cache_plugin_list(cache_plugin_fp, cache_plugin_time)
-
-        if cache_plugin_list:
-            plugin_list = cache_plugin_list
-        else:
-            plugin_list = self._fetch_new_plugin_list(repo_index_fp, proxies)
-            self._update_cache_and_settings(cache_plugin_fp, plugin_list)
-
-        plugin_list = self.update_favorite_status(plugin_list, my_plugin_fp)
-        self.plugin_list_updated.emit(plugin_list)
+        self.build_search_index = False
+        with tracer.span("ui.search_index_build", plugins=len(catalog)):
+            index = SearchIndex(catalog)
+        self.search_index_built.emit(index)
 
 
 class Git_Updater(QThread):
     """
-    基于线程实现的 Git 更新类，负责读取 MyRepo.json 文件，
-    去除自定义键值对，保存到 PluginMaster.json，最后推送到 GitHub。
+    基于线程实现的 Git 更新类，负责读取 MyRepo.json 文件，去除自定义键值对，
+    一次生成 manifest_targets 配置的全部清单，只写入、提交内容有变化的清单，设置了 git_push 时推送到 GitHub。
     """
-    update_finished = pyqtSignal(int, list)  # 信号，参数为更新数量和更新列表
+    update_finished = pyqtSignal(object)  # 信号，参数为 PublishResult
 
-    def __init__(self, plugin_list, my_repo_fp=MYREPO_PATH, git_repo_fp=PLUGIN_MASTER_PATH):
+    def __init__(self, catalog, my_repo_fp=MYREPO_PATH, git_repo_fp=PLUGIN_MASTER_PATH):
+        """
+        :param catalog: 插件目录的只读快照
+        :param my_repo_fp: MyRepo.json 文件路径
+        :param git_repo_fp: PluginMaster.json 文件路径
+        """
         super().__init__()
-        self.plugin_list = plugin_list
+        self.catalog = catalog
         self.my_repo_fp = my_repo_fp
         self.git_repo_fp = git_repo_fp
-        self.update_count = 0
-        self.update_list = []
 
     def _read_my_repo(self):
         """
-        读取 MyRepo.json 文件，如果文件不存在则创建空列表。
-        """
-        if not os.path.exists(self.my_repo_fp):
-            return []
-        try:
-            with open(self.my_repo_fp, 'r', encoding='utf-8') as file:
-                return json.load(file)
-        except Exception as e:
-            print(f"读取 {self.my_repo_fp} 时出错: {e}")
-            return []
-
-    def _process_repo_list(self, my_repo_list):
-        """
-        处理仓库列表，去除自定义键值对，更新计数和更新列表。
-        """
-        processed_list = []
-        for hash_code,bool in my_repo_list.items():
-            if bool:
-                for item in self.plugin_list:
-                    if item["Hash"] == hash_code:
-                        self.update_count += 1
-                        self.update_list.append(item["Name"])
-                        # 假设要去除的键为 "URL", "Hash", "is_favorite"
-                        data = item.copy()
-                        data.pop("URL", None)
-                        data.pop("Hash", None)
-                        data.pop("is_favorite", None)
-                        processed_list.append(data)
-        return processed_list
-
-    def _save_to_plugin_master(self, processed_list):
-        """
-        将处理后的数据保存到 PluginMaster.json 文件。
-        """
-        try:
-            with open(self.git_repo_fp, 'w', encoding='utf-8') as file:
-                json.dump(processed_list, file, indent=4, ensure_ascii=False)
-        except Exception as e:
-            print(f"写入 {self.git_repo_fp} 时出错: {e}")
-
-    def _commit_and_push(self):
-        """
-        执行 git 提交和推送操作。
+        读取 MyRepo.json 的内容，包括尚未写入磁盘的收藏修改。
         """
-        # 执行 git 提交和推送操作
-        os.system("git add .")
-        os.system('git commit -m "update Repo"')
-        os.system("git push")
-
+        return open_store(self.my_repo_fp).snapshot()
 
     def run(self):
         """
-        线程执行的主要逻辑，依次读取文件、处理数据、保存文件、提交推送，
+        线程执行的主要逻辑，依次读取收藏、生成清单、按需保存、提交和推送，
         最后发送更新完成信号。
         """
-        my_repo_list = self._read_my_repo()
-        processed_list = self._process_repo_list(my_repo_list)
-        self._save_to_plugin_master(processed_list)
-        self.update_finished.emit(self.update_count, self.update_list)
+        processed_list = build_plugin_master(self.catalog, self._read_my_repo())[0]
+        self.update_finished.emit(publish(processed_list, self.git_repo_fp))
 
 class Ui_MainWindow(QObject):  # 继承自 QObject
     def __init__(self):
         super().__init__()  # 调用父类构造函数
-        self.plugin_list = []
-        self.ui_items = []
-        self.icon_loaders = []
+        self.plugin_list = PluginCatalog()  # 当前显示的插件目录
+        self.icon_scheduler = None  # 共享的图标下载调度器
+        self.icon_store = None  # 按内容寻址的缩略图存储
+        self.pack_icon_store = False  # 退出时是否把缩略图合并为单个文件
+        self.pixmap_cache = None  # 已缩放图标的内存缓存，按图标键共享
+        self._failed_icons = {}  # 加载失败的图标键到等待该图标的插件 Hash 集合，刷新或修改代理后重试
         self.proxy_input = None
-        self.scroll_area = None
-        self.scroll_content = None
-        self.scroll_layout = None
+        self.list_view = None  # 插件列表视图，只绘制可见的行
+        self.model = None  # 插件列表模型
+        self.delegate = None  # 插件行委托
+        self.expanded_forms = {}  # 展开的插件行，Hash 到 Ui_Form 实例
         self.spinner_label = None  # 新增旋转图标标签
         self.spinner_movie = None  # 新增旋转图标动画
         self.plugin_updater = None  # 新增插件更新线程实例
         self.MainWindow = None
         self.filter_input = None  # 新增筛选输入框
+        self.filter_timer = None  # 输入防抖定时器
+        self.search_index = None  # 当前插件列表的搜索索引，由加载线程构建，之后按差异增量更新
+        self._search_index_synced = False  # 搜索索引是否与当前插件列表一致，整体替换列表后需要重新同步
+        self.catalog_db = None  # 启用 SQLite 插件目录时由数据库完成筛选
+        self.repo_order = []  # 渐进刷新时各仓库的显示顺序
+        self._hidden_rows = set()  # 当前隐藏的行号，插件列表合并后为 None，需从视图重新读取
         self.favorite_checkbox = None  # 新增收藏复选框
+        self.is_stale = False  # 当前显示的列表是否来自过期缓存
 
     def _setup_proxy_layout(self):
         """
@@ -386,6 +159,7 @@ class Ui_MainWindow(QObject):  # 继承自 QObject
         input_width = font_metrics.horizontalAdvance("127.0.0.1:7897") + 20
         self.proxy_input.setFixedWidth(input_width)
         proxy_layout.addWidget(self.proxy_input)
+        self.proxy_input.editingFinished.connect(self._retry_failed_icons)
 
         # 第一个按钮
         button1 = QtWidgets.QPushButton("更新插件列表")
@@ -413,8 +187,13 @@ class Ui_MainWindow(QObject):  # 继承自 QObject
 
         # 添加筛选输入框
         self.filter_input = QtWidgets.QLineEdit()
-        self.filter_input.setPlaceholderText("按名称筛选")
-        # 绑定回车键事件到 apply_filter 方法
+        self.filter_input.setPlaceholderText("搜索名称、作者、简介或标签")
+        # 输入时停顿一段时间后筛选，回车立即筛选
+        self.filter_timer = QtCore.QTimer()
+        self.filter_timer.setSingleShot(True)
+        self.filter_timer.setInterval(FILTER_DELAY_MS)
+        self.filter_timer.timeout.connect(self.apply_filter)
+        self.filter_input.textChanged.connect(self.filter_timer.start)
         self.filter_input.returnPressed.connect(self.apply_filter)
         proxy_layout.addWidget(self.filter_input)
 
@@ -426,110 +205,397 @@ class Ui_MainWindow(QObject):  # 继承自 QObject
 
         return proxy_layout
 
-    def _setup_scroll_area(self):
-        """
-        创建滚动区域。
-        """
-        scroll_area = QtWidgets.QScrollArea()
-        scroll_area.setWidgetResizable(True)
-        scroll_content = QtWidgets.QWidget()
-        scroll_content.setMinimumWidth(700)
-        scroll_layout = QtWidgets.QVBoxLayout(scroll_content)
-        scroll_area.setWidget(scroll_content)
-        return scroll_area, scroll_content, scroll_layout
+    def _setup_list_view(self):
+        """
+        创建插件列表视图、模型和委托。
+        """
+        list_view = QtWidgets.QListView()
+        list_view.setMinimumWidth(700)
+        list_view.setMouseTracking(True)
+        list_view.setSelectionMode(QtWidgets.QAbstractItemView.NoSelection)
+        list_view.setVerticalScrollMode(QtWidgets.QAbstractItemView.ScrollPerPixel)
+        list_view.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        list_view.setResizeMode(QtWidgets.QListView.Adjust)
+
+        model = PluginListModel(shared_pixmap(ICON_PATH, 64), self.pixmap_cache, list_view)
+        model.icon_evicted.connect(self._reload_evicted_icon)
+        model.modelReset.connect(self._on_model_reset)
+        delegate = PluginItemDelegate(list_view)
+        delegate.favorite_clicked.connect(self.toggle_favorite)
+        delegate.item_clicked.connect(self.toggle_plugin_details)
+        list_view.setModel(model)
+        list_view.setItemDelegate(delegate)
+        # 滚动后优先加载进入视口的图标
+        list_view.verticalScrollBar().valueChanged.connect(self._prioritize_visible_icons)
+        return list_view, model, delegate
+
+    def _setup_icon_scheduler(self):
+        """
+        创建图标存储和图标下载调度器，下载并发数量读取 settings.json 中的 icon_workers，
+        生成缩略图的子进程数量读取 thumbnail_workers，存储的磁盘上限（MB）、
+        保留天数和是否合并为单个文件分别读取 icon_store_mb、icon_store_max_age_days 和 icon_store_pack。
+        """
+        settings = open_store(SETTING_PATH)
+        self.icon_store = IconStore(ICON_STORE_DIR,
+                                    max_bytes=int(settings.get("icon_store_mb", DEFAULT_STORE_MB) * 1024 * 1024),
+                                    max_age_days=settings.get("icon_store_max_age_days", DEFAULT_MAX_AGE_DAYS))
+        self.pack_icon_store = settings.get("icon_store_pack", False)
+        scheduler = IconScheduler(self.icon_store,
+                                  max_workers=settings.get("icon_workers", DEFAULT_ICON_WORKERS),
+                                  proxy=self.get_proxy_from_input(),
+                                  thumbnail_workers=settings.get("thumbnail_workers", DEFAULT_THUMBNAIL_WORKERS),
+                                  legacy_cache_dir=CACHE_DIR)
+        scheduler.icon_loaded.connect(self.on_icon_loaded)
+        return scheduler
+
+    def _setup_pixmap_cache(self):
+        """
+        创建图标内存缓存，容量读取 settings.json 中的 pixmap_cache_mb（MB）。
+        """
+        cache_mb = open_store(SETTING_PATH).get("pixmap_cache_mb", DEFAULT_PIXMAP_CACHE_MB)
+        return PixmapCache(max_bytes=int(cache_mb * 1024 * 1024))
 
     def setupUi(self, MainWindow, plugin_list = [], rebuild=False):
         """
-        初始化或重新构建主窗口的 UI 界面。
+        初始化主窗口的 UI 界面，或在重新构建时替换插件列表。
 
         :param MainWindow: 主窗口实例
-        :param plugin_list: 插件列表
+        :param plugin_list: 插件目录或插件列表
         :param rebuild: 是否重新构建 UI，默认为 False
         """
-        import time
+        if not isinstance(plugin_list, PluginCatalog):
+            plugin_list = PluginCatalog(plugin_list)
         self.MainWindow = MainWindow
 
         if not rebuild:
-            MainWindow.setWindowTitle("Item List Window")
-            MainWindow.setGeometry(100, 100, 800, 600)
+            with tracer.span("ui.build_widgets"):
+                MainWindow.setWindowTitle("Item List Window")
+                MainWindow.setGeometry(100, 100, 800, 600)
+
+                layout = QtWidgets.QVBoxLayout(MainWindow)
+
+                proxy_layout = self._setup_proxy_layout()
+                layout.addLayout(proxy_layout)
+
+                self.pixmap_cache = self._setup_pixmap_cache()
+                self.list_view, self.model, self.delegate = self._setup_list_view()
+                layout.addWidget(self.list_view)
+                self.icon_scheduler = self._setup_icon_scheduler()
+                self.catalog_db = get_catalog_db()
+
+        with tracer.span("ui.set_plugin_list", plugins=len(plugin_list)):
+            # 整体重建时取消上一份列表尚未完成的图标加载
+            self.icon_scheduler.cancel_all()
+            self.expanded_forms.clear()
+            self.plugin_list = plugin_list
+            self._search_index_synced = False
+            self._hidden_rows = set()
+            self.model.set_plugin_list(plugin_list)
 
-            layout = QtWidgets.QVBoxLayout(MainWindow)
+        # 显示主窗口
+        with tracer.span("ui.show"):
+            MainWindow.show()
 
-            proxy_layout = self._setup_proxy_layout()
-            layout.addLayout(proxy_layout)
+        # 启动图标加载，有筛选条件时只加载筛选后可见的插件
+        if self.filter_input.text() or self.favorite_checkbox.isChecked():
+            self.apply_filter()
+        else:
+            self.load_icons()
+
+    def apply_plugin_diff(self, new_plugin_list):
+        """
+        按 Hash 将新插件列表合并到当前界面：保留未变化的插件行，删除已移除的插件行，
+        原地刷新内容变化的插件行并插入新增的插件行。滚动位置、展开的详情和筛选条件保持不变，
+        只为新增或图标地址变化的插件加载图标。
+
+        :param new_plugin_list: 新的插件目录或插件列表
+        """
+        if not isinstance(new_plugin_list, PluginCatalog):
+            new_plugin_list = PluginCatalog(new_plugin_list)
+        if not self.plugin_list:
+            self.setupUi(self.MainWindow, new_plugin_list, rebuild=True)
+            return
 
-            self.scroll_area, self.scroll_content, self.scroll_layout = self._setup_scroll_area()
-            layout.addWidget(self.scroll_area)
+        old_plugin_list = self.plugin_list
+        with tracer.span("ui.diff", plugins=len(new_plugin_list)) as span:
+            added, removed, changed = diff_plugin_lists(old_plugin_list, new_plugin_list)
+            span.set(added=len(added), removed=len(removed), changed=len(changed))
+        same_order = [plugin["Hash"] for plugin in old_plugin_list] == [plugin["Hash"] for plugin in new_plugin_list]
+        if not (added or removed or changed) and same_order:
+            # 内容和顺序都没有变化，只替换目录
+            self.plugin_list = new_plugin_list
+            self._update_search_index(new_plugin_list, set(), set(), set())
+            for form in self.expanded_forms.values():
+                form.catalog = new_plugin_list
+            return
+        icon_changed = {plugin_hash for plugin_hash in changed
+                        if self.get_icon_url(old_plugin_list.get(plugin_hash)) !=
+                        self.get_icon_url(new_plugin_list.get(plugin_hash))}
+        anchor = self._scroll_anchor()
+
+        # 内容变化的展开行先收起，合并后按新数据重新展开
+        reopen = changed & self.expanded_forms.keys()
+        for plugin_hash in reopen:
+            self._collapse_plugin(plugin_hash)
+        for plugin_hash in removed:
+            self.expanded_forms.pop(plugin_hash, None)
+
+        self.icon_scheduler.cancel(removed | icon_changed)
+        self.plugin_list = new_plugin_list
+        self._update_search_index(new_plugin_list, added, removed, changed)
+        with tracer.span("ui.apply_diff", added=len(added), removed=len(removed), changed=len(changed)):
+            self.model.apply_plugin_diff(new_plugin_list, removed, changed, icon_changed)
+        # 行号已变化，隐藏的行需从视图重新读取
+        self._hidden_rows = None
+        for form in self.expanded_forms.values():
+            form.catalog = new_plugin_list
 
-            if isinstance(MainWindow, QtWidgets.QWidget):
-                MainWindow.showEvent = self.handle_show_event
+        if self.filter_input.text() or self.favorite_checkbox.isChecked():
+            self.apply_filter()
+        hidden_rows = self._get_hidden_rows()
+        for plugin_hash in reopen:
+            index = self.model.index_of(plugin_hash)
+            if index.isValid() and index.row() not in hidden_rows:
+                self.toggle_plugin_details(index)
+        self._restore_scroll_anchor(anchor)
 
-        if rebuild:
-            # 清空现有插件项和间隔项
-            for i in reversed(range(self.scroll_layout.count())):
-                item = self.scroll_layout.itemAt(i)
-                if item.widget():
-                    item.widget().deleteLater()
-                elif isinstance(item, QtWidgets.QSpacerItem):
-                    self.scroll_layout.removeItem(item)
+        updated = added | icon_changed
+        self.load_icons([plugin for row, plugin in enumerate(new_plugin_list)
+                         if plugin["Hash"] in updated and row not in hidden_rows])
 
-        self.plugin_list = plugin_list
-        self.ui_items = []
+    def _update_search_index(self, plugin_list, added, removed, changed):
+        """
+        按插件列表的差异增量更新搜索索引，索引尚未与列表同步时留到下次使用前同步。
 
-        self.start_time = time.time()
-        for index, plugin in enumerate(plugin_list, start=1):
-            item_widget = QtWidgets.QWidget()
-            name = plugin.get("Name", "未知插件")
-            info = plugin.get("Description", "暂无插件信息")
-            icon = plugin.get("IconUrl")
-            if not icon or not icon.startswith(('http://', 'https://')):
-                icon = ICON_PATH
+        :param plugin_list: 新的插件目录
+        :param added: 新增的 Hash 集合
+        :param removed: 删除的 Hash 集合
+        :param changed: 内容变化的 Hash 集合
+        """
+        if self.search_index is not None and self._search_index_synced:
+            with tracer.span("ui.search_index_diff", added=len(added), removed=len(removed), changed=len(changed)):
+                self.search_index.apply_diff(plugin_list, added, removed, changed)
 
-            default_pixmap = QtGui.QPixmap(ICON_PATH)
+    def set_search_index(self, index):
+        """
+        采用加载线程构建的搜索索引。构建期间插件列表可能已经合并了其他差异，采用前先同步；
+        已有与插件列表一致的索引时不替换。
 
-            ui = Ui_Form(plugin_list=plugin_list)
-            ui.setupUi(item_widget, name, info, default_pixmap, plugin["Hash"], plugin)
-            self.ui_items.append((ui, icon, default_pixmap))
+        :param index: SearchIndex 实例
+        """
+        if self.search_index is not None and self._search_index_synced:
+            return
+        with tracer.span("ui.search_index_sync", plugins=len(self.plugin_list)):
+            index.sync(self.plugin_list)
+        self.search_index = index
+        self._search_index_synced = True
+        if self.filter_input.text():
+            self.apply_filter()
 
-            self.scroll_layout.addWidget(item_widget)
+    def _scroll_anchor(self):
+        """
+        记录视口顶部的插件行，用于合并后恢复滚动位置。
 
-            # 每添加 10 个插件项，处理一次事件队列
-            if index % 10 == 0:
-                QtWidgets.QApplication.processEvents()
+        :return: (插件 Hash, 该行顶部相对视口的偏移)，视口中没有插件时返回 None
+        """
+        index = self.list_view.indexAt(QtCore.QPoint(0, 0))
+        if not index.isValid():
+            return None
+        return index.data(HashRole), self.list_view.visualRect(index).top()
 
-        # scroll_layout的最后加上一个Spacers，如果列表的item数量不够，item始终保持在顶部
-        spacer = QtWidgets.QSpacerItem(0, 40, QtWidgets.QSizePolicy.Fixed, QtWidgets.QSizePolicy.Expanding)
-        self.scroll_layout.addItem(spacer)
+    def _restore_scroll_anchor(self, anchor):
+        """
+        滚动列表，使记录的插件行回到合并前在视口中的位置。该行已被删除或隐藏时不调整。
 
-        # 显示主窗口
-        MainWindow.show()
-        self.end_time = time.time()
-        print(f"插件列表加载耗时: {self.end_time - self.start_time} 秒")
+        :param anchor: _scroll_anchor 的返回值
+        """
+        if anchor is None:
+            return
+        plugin_hash, offset = anchor
+        index = self.model.index_of(plugin_hash)
+        if not index.isValid() or self.list_view.isRowHidden(index.row()):
+            return
+        # 先完成行的布局，visualRect 才是合并后的位置
+        self.list_view.doItemsLayout()
+        scroll_bar = self.list_view.verticalScrollBar()
+        scroll_bar.setValue(scroll_bar.value() + self.list_view.visualRect(index).top() - offset)
 
-        # 启动图标加载
-        self.load_icons()
+    def set_repo_order(self, urls):
+        """
+        记录渐进刷新时各仓库的显示顺序。
 
-    def load_icons(self):
+        :param urls: 仓库 URL 列表
         """
-        加载所有插件图标的方法。
+        self.repo_order = list(urls)
+
+    def apply_repo_plugins(self, url, plugins, elapsed):
         """
-        for ui, icon, default_pixmap in self.ui_items:
-            cache_file = self.get_cache_file(icon)
-            proxy = self.get_proxy_from_input()
-            loader = IconLoader(icon, cache_file, ui, default_pixmap, proxy)
-            loader.icon_loaded.connect(self.update_icon)
-            # print(f"Connecting icon_loaded signal for {icon}")
-            loader.start()
-            self.icon_loaders.append(loader)
+        合并渐进刷新中一个仓库的插件：替换该仓库原有的插件，并按仓库顺序放到对应位置，
+        其余插件保持不变。
 
-    def handle_show_event(self, event):
+        :param url: 仓库 URL
+        :param plugins: 该仓库的插件列表
+        :param elapsed: 该仓库的拉取耗时（秒）
         """
-        处理窗口显示事件，窗口显示后开始加载图标。
+        with tracer.span("ui.repo_merge", url=url, plugins=len(plugins), fetch_s=round(elapsed, 3)):
+            order = {repo_url: position for position, repo_url in enumerate(self.repo_order)}
+            merged = [plugin for plugin in self.plugin_list if plugin.get("URL") != url] + list(plugins)
+            merged.sort(key=lambda plugin: order.get(plugin.get("URL"), len(order)))
+            self.apply_plugin_diff(PluginCatalog(merged, loader=self.plugin_list.loader))
 
-        :param event: 显示事件
+    def toggle_plugin_details(self, index):
         """
-        self.load_icons()
-        event.accept()
+        展开或收起插件行的详情。展开时为该行创建 Ui_Form，收起后释放。
+
+        :param index: 插件行的索引
+        """
+        plugin_hash = index.data(HashRole)
+        if plugin_hash in self.expanded_forms:
+            self._collapse_plugin(plugin_hash)
+            return
+
+        plugin = index.data(PluginRole)
+        name = plugin.get("Name", "未知插件")
+        # 目录可能只包含列表字段，详情使用完整数据
+        details = self.plugin_list.details(plugin_hash) or plugin
+        form_widget = QtWidgets.QWidget()
+        ui = Ui_Form(catalog=self.plugin_list)
+        ui.setupUi(form_widget, name, plugin.get("Description", "暂无插件信息"),
+                   index.data(QtCore.Qt.DecorationRole), plugin_hash, details)
+        ui.toggle_widget_details(name)
+        ui.details_toggled.connect(
+            lambda visible, h=plugin_hash: None if visible else QtCore.QTimer.singleShot(
+                0, lambda: self._collapse_plugin(h)))
+        ui.favorite_toggled.connect(self._on_favorite_toggled)
+        self.expanded_forms[plugin_hash] = ui
+
+        self.model.set_expanded(plugin_hash, True)
+        self.list_view.setIndexWidget(index, form_widget)
+        self.delegate.sizeHintChanged.emit(index)
+
+    def _collapse_plugin(self, plugin_hash):
+        """
+        收起插件行，释放其 Ui_Form。
+
+        :param plugin_hash: 插件的哈希值
+        """
+        if self.expanded_forms.pop(plugin_hash, None) is None:
+            return
+        self.model.set_expanded(plugin_hash, False)
+        index = self.model.index_of(plugin_hash)
+        if index.isValid():
+            # setIndexWidget 会释放原有的 widget
+            self.list_view.setIndexWidget(index, None)
+            self.delegate.sizeHintChanged.emit(index)
+
+    def toggle_favorite(self, index):
+        """
+        切换列表中插件的收藏状态。
+
+        :param index: 插件行的索引
+        """
+        plugin_hash = index.data(HashRole)
+        is_favorite = toggle_plugin_favorite(self.plugin_list, plugin_hash)
+        if is_favorite is not None:
+            self._on_favorite_toggled(plugin_hash, is_favorite)
+
+    def _on_favorite_toggled(self, plugin_hash, is_favorite):
+        """
+        收藏状态切换后重绘该行，只显示收藏时重新筛选。
+
+        :param plugin_hash: 插件的哈希值
+        :param is_favorite: 新的收藏状态
+        """
+        self.model.refresh_favorite(plugin_hash)
+        if self.catalog_db is not None:
+            self.catalog_db.set_favorite(plugin_hash, is_favorite)
+        if self.favorite_checkbox.isChecked():
+            self.apply_filter()
+
+    def set_stale(self, stale):
+        """
+        标记当前显示的列表是否来自过期缓存，过期时显示旋转图标和标题提示。
+
+        :param stale: 是否过期
+        """
+        self.is_stale = stale
+        if stale:
+            self.MainWindow.setWindowTitle("Item List Window（缓存已过期，正在后台更新…）")
+            self.spinner_movie.start()
+            self.spinner_label.show()
+        else:
+            self.MainWindow.setWindowTitle("Item List Window")
+            self.spinner_movie.stop()
+            self.spinner_label.hide()
+
+    def load_icons(self, plugin_list=None):
+        """
+        把插件图标提交给图标调度器，视口内的插件优先加载。
+
+        内存缓存中已有的图标直接使用，不再解码；加载失败的图标在刷新或修改代理之前不再请求。
+
+        :param plugin_list: 需要加载图标的插件，默认为全部插件
+        """
+        self.icon_scheduler.set_proxy(self.get_proxy_from_input())
+        with tracer.span("ui.load_icons"):
+            visible = {plugin["Hash"] for plugin in self._visible_plugins()}
+            for plugin in (self.plugin_list if plugin_list is None else plugin_list):
+                icon = self.get_icon_url(plugin)
+                icon_key = self.get_icon_key(icon)
+                if icon_key in self.pixmap_cache:
+                    self.model.set_icon(plugin["Hash"], icon_key)
+                    continue
+                failed = self._failed_icons.get(icon_key)
+                if failed is not None:
+                    failed.add(plugin["Hash"])
+                    continue
+                priority = PRIORITY_VISIBLE if plugin["Hash"] in visible else PRIORITY_OFFSCREEN
+                self.icon_scheduler.request(icon_key, icon, plugin["Hash"], priority)
+
+    def _reload_evicted_icon(self, plugin_hash):
+        """
+        图标被内存缓存淘汰后重新加载，此时该行正在绘制，按可见优先级请求。
+
+        :param plugin_hash: 插件的哈希值
+        """
+        index = self.model.index_of(plugin_hash)
+        if not index.isValid():
+            return
+        icon = self.get_icon_url(index.data(PluginRole))
+        self.icon_scheduler.request(self.get_icon_key(icon), icon, plugin_hash, PRIORITY_VISIBLE)
+
+    def _visible_plugins(self):
+        """
+        获取当前视口内的插件。
+
+        :return: 插件列表
+        """
+        viewport = self.list_view.viewport().rect()
+        first = self.list_view.indexAt(viewport.topLeft())
+        last = self.list_view.indexAt(viewport.bottomLeft())
+        first_row = first.row() if first.isValid() else 0
+        last_row = last.row() if last.isValid() else self.model.rowCount() - 1
+        return self.model.plugin_list[first_row:last_row + 1]
+
+    def _prioritize_visible_icons(self):
+        """
+        滚动后把视口内尚未加载的图标提升到队列前面。
+        """
+        self.icon_scheduler.promote([self.get_icon_key(self.get_icon_url(plugin))
+                                     for plugin in self._visible_plugins()
+                                     if plugin["Hash"] not in self.model.icon_keys])
+
+    def get_icon_url(self, plugin):
+        """
+        获取插件的图标地址，不是网络地址时使用默认图标。
+
+        :param plugin: 插件数据
+        :return: 图标的 URL 或本地路径
+        """
+        icon = plugin.get("IconUrl")
+        if not icon or not icon.startswith(('http://', 'https://')):
+            icon = ICON_PATH
+        return icon
 
     def get_proxy_from_input(self):
         """
@@ -543,74 +609,108 @@ class Ui_MainWindow(QObject):  # 继承自 QObject
             }
         return None
 
-    def get_cache_file(self, url):
+    def get_icon_key(self, url):
         """
-        根据 URL 生成缓存文件名。
+        根据 URL 生成图标键，同时用作缩略图文件名和内存缓存的键。
 
         :param url: 图标的 URL
-        :return: 缓存文件的路径
+        :return: 图标键
         """
         if url is None:
             url = ""
-        url_hash = hashlib.md5(url.encode('utf-8')).hexdigest()
-        return os.path.join(CACHE_DIR, f"{url_hash}.png")
+        return hashlib.md5(url.encode('utf-8')).hexdigest()
+
+    def on_icon_loaded(self, icon_key, image, plugin_hashes):
+        """
+        图标调度器加载完成后，在界面线程中把 QImage 转换为 QPixmap，放入内存缓存，
+        并更新所有等待该图标的插件行。同一图标只转换一次。
+        加载失败时不放入内存缓存，这些行继续显示默认图标，记录下来在刷新或修改代理后重试。
 
-    def update_icon(self, pixmap, ui):
+        :param icon_key: 图标键
+        :param image: 已缩放的图标，失败时为空图像
+        :param plugin_hashes: 等待该图标的插件哈希值列表
         """
-        更新 UI 上的图标。
+        if image.isNull():
+            self._failed_icons.setdefault(icon_key, set()).update(plugin_hashes)
+            return
+        pixmap = QtGui.QPixmap.fromImage(image)
+        self.pixmap_cache.put(icon_key, pixmap)
+        for plugin_hash in plugin_hashes:
+            self.update_icon(icon_key, pixmap, plugin_hash)
 
+    def _retry_failed_icons(self):
+        """
+        重新请求加载失败的图标，在刷新插件列表或修改代理后调用。
+        """
+        failed, self._failed_icons = self._failed_icons, {}
+        plugins = (self.plugin_list.get(plugin_hash) for hashes in failed.values() for plugin_hash in hashes)
+        plugins = [plugin for plugin in plugins if plugin is not None]
+        if plugins and self.icon_scheduler is not None:
+            self.load_icons(plugins)
+
+    def update_icon(self, icon_key, pixmap, plugin_hash):
+        """
+        更新插件行上的图标。
+
+        :param icon_key: 图标键
         :param pixmap: 要显示的图标
-        :param ui: Ui_Form 实例
+        :param plugin_hash: 插件的哈希值
         """
-        # print("Updating icon...")
-        try:
-            ui.update_icon(pixmap)
-            # print("Icon updated successfully.")
-        except Exception as e:
-            print(f"Error updating icon: {e}")
+        self.model.set_icon(plugin_hash, icon_key)
+        form = self.expanded_forms.get(plugin_hash)
+        if form is not None:
+            form.update_icon(pixmap)
+
+    def shutdown(self):
+        """
+        停止图标调度器，不等待正在进行的下载，然后清理并保存图标存储，
+        并把尚未写入的设置和收藏写入磁盘。可以重复调用。
+        """
+        if self.icon_scheduler is not None:
+            self.icon_scheduler.shutdown()
+            self.icon_scheduler = None
+        if self.icon_store is not None:
+            self.icon_store.close(pack=self.pack_icon_store)
+            self.icon_store = None
+        flush_all()
 
     def __del__(self):
-        # 停止所有图标加载线程
-        for loader in self.icon_loaders:
-            loader.quit()
-            loader.wait()
+        # 解释器退出时只停止图标调度器，图标存储由 shutdown 在关闭窗口时保存
+        if self.icon_scheduler is not None:
+            self.icon_scheduler.shutdown()
 
     def update_plugin_list(self):
         """
-        更新插件列表，包括更新代理设置、删除缓存文件和重新加载插件列表。
+        更新插件列表，包括更新代理设置和强制重新拉取插件列表。
         """
         proxy_text = self.proxy_input.text()
         if proxy_text:
             proxy_config = {
                 "https": proxy_text
             }
-            try:
-                with open(SETTING_PATH, 'r', encoding='utf-8') as f:
-                    settings = json.load(f)
-                settings['proxy'] = proxy_config
-                with open(SETTING_PATH, 'w', encoding='utf-8') as f:
-                    json.dump(settings, f, ensure_ascii=False, indent=4)
-            except FileNotFoundError:
+            settings = open_store(SETTING_PATH)
+            if settings.exists:
+                settings.set('proxy', proxy_config)
+            else:
                 print("未找到 settings.json 文件")
-            except Exception as e:
-                print(f"更新 settings.json 出错: {e}")
 
-        cache_plugin_fp = os.path.join(os.path.dirname(SETTING_PATH), 'cache_plugin.json')
-        if os.path.exists(cache_plugin_fp):
-            os.remove(cache_plugin_fp)
+        # 之前加载失败的图标（超时、代理错误等）随刷新重试
+        self._retry_failed_icons()
 
         # 显示旋转图标并开始动画
         self.spinner_movie.start()
         self.spinner_label.show()
 
-        # 创建并启动插件更新线程
-        self.plugin_updater = PluginListUpdater(SETTING_PATH)
+        # 创建并启动插件更新线程，强制拉取全部仓库
+        self.plugin_updater = PluginListUpdater(SETTING_PATH, force_update=True, progressive=True)
+        self.plugin_updater.repo_index_loaded.connect(self.set_repo_order)
+        self.plugin_updater.repo_loaded.connect(self.apply_repo_plugins)
         self.plugin_updater.plugin_list_updated.connect(self.on_plugin_list_updated)
         self.plugin_updater.start()
 
     def on_plugin_list_updated(self, new_plugin_list):
         """
-        处理插件列表更新完成后的操作。
+        处理插件列表更新完成后的操作，按 Hash 合并差异。
 
         :param new_plugin_list: 更新后的插件列表
         """
@@ -618,15 +718,13 @@ class Ui_MainWindow(QObject):  # 继承自 QObject
         self.spinner_movie.stop()
         self.spinner_label.hide()
 
-        self.plugin_list = new_plugin_list
-        self.setupUi(self.MainWindow, new_plugin_list, rebuild=True)
+        self.apply_plugin_diff(new_plugin_list)
 
     def start_git_update(self):
         """
         启动 Git 更新线程。
         """
-        plugin_list = self.plugin_list
-        self.git_updater = Git_Updater(plugin_list)
+        self.git_updater = Git_Updater(self.plugin_list.view())
         self.git_updater.update_finished.connect(self.on_git_update_finished)
         self.git_updater.start()
 
@@ -634,32 +732,126 @@ class Ui_MainWindow(QObject):  # 继承自 QObject
         self.spinner_movie.start()
         self.spinner_label.show()
 
-    def on_git_update_finished(self, update_count, update_list):
+    def on_git_update_finished(self, result):
         """
         处理 Git 更新完成后的操作，显示消息框。
 
-        :param update_count: 更新的插件数量
-        :param update_list: 更新的插件列表
+        :param result: PublishResult 实例
         """
         # 隐藏旋转图标并停止动画
         self.spinner_movie.stop()
         self.spinner_label.hide()
 
-        QtWidgets.QMessageBox.information(
-            self.MainWindow,
-            "上传",
-            f"更新完成，共更新{update_count}个插件，更新列表：\n{update_list}"
-        )
+        if not result.ok:
+            QtWidgets.QMessageBox.warning(self.MainWindow, "上传", f"上传失败：\n{result.error}")
+            return
+        if result.skipped:
+            message = "插件列表没有变化，未提交。"
+        else:
+            update_list = "\n".join(result.update_list()) or "无"
+            message = f"更新完成，共更新{result.update_count}个插件，更新列表：\n{update_list}"
+            if result.committed and not result.pushed:
+                message += "\n\n已在本地提交，未推送（settings.json 中 git_push 未启用）。"
+        QtWidgets.QMessageBox.information(self.MainWindow, "上传", message)
+
+    def _on_model_reset(self):
+        # 模型重置后视图中的行全部显示
+        self._hidden_rows = set()
+
+    def _get_hidden_rows(self):
+        """
+        获取当前隐藏的行号集合，插件列表合并后从视图重新读取一次。
+
+        :return: 行号集合
+        """
+        if self._hidden_rows is None:
+            self._hidden_rows = {row for row in range(self.model.rowCount()) if self.list_view.isRowHidden(row)}
+        return self._hidden_rows
 
     def apply_filter(self):
-        filter_text = self.filter_input.text().lower()
+        """
+        按搜索词和收藏状态筛选插件，只更新显示状态发生变化的行。
+        搜索词匹配名称、内部名称、作者、简介、标签和描述，没有直接匹配时按名称模糊匹配，
+        并滚动到最相关的插件。
+        被隐藏的插件取消尚未完成的图标加载，重新显示的插件补充加载图标。
+        """
+        self.filter_timer.stop()
+        filter_text = self.filter_input.text()
         show_favorites = self.favorite_checkbox.isChecked()
+        with tracer.span("ui.filter_query", text=filter_text, favorites=show_favorites):
+            if self.catalog_db is not None:
+                hidden, best_row = self._query_catalog_db(filter_text, show_favorites)
+            else:
+                hidden, best_row = self._query_search_index(filter_text, show_favorites)
+
+        old_hidden = self._get_hidden_rows()
+        to_hide = hidden - old_hidden
+        to_show = old_hidden - hidden
+        with tracer.span("ui.filter_rows", hidden=len(to_hide), shown=len(to_show)):
+            for row in to_hide:
+                self._collapse_plugin(self.plugin_list[row]["Hash"])
+                self.list_view.setRowHidden(row, True)
+            for row in to_show:
+                self.list_view.setRowHidden(row, False)
+        self._hidden_rows = hidden
+
+        hidden_hashes = {self.plugin_list[row]["Hash"] for row in to_hide}
+        self.icon_scheduler.cancel(hidden_hashes - self.model.icon_keys.keys())
+        self.load_icons([self.plugin_list[row] for row in sorted(to_show)
+                         if self.plugin_list[row]["Hash"] not in self.model.icon_keys])
+
+        if best_row is not None:
+            self.list_view.scrollTo(self.model.index(best_row), QtWidgets.QAbstractItemView.EnsureVisible)
+
+    def _query_search_index(self, filter_text, show_favorites):
+        """
+        用内存中的搜索索引筛选插件。
+
+        :param filter_text: 搜索词
+        :param show_favorites: 是否只显示收藏的插件
+        :return: (需要隐藏的行号集合, 最相关的行号或 None)
+        """
+        if self.search_index is None:
+            # 加载线程的索引尚未送达
+            self.search_index = SearchIndex(self.plugin_list)
+        elif not self._search_index_synced:
+            self.search_index.sync(self.plugin_list)
+        self._search_index_synced = True
+
+        matched = self.search_index.search(filter_text)
+        if show_favorites:
+            favorites = self.plugin_list.favorite_hashes()
+            matched = set(favorites) if matched is None else matched & favorites
+        if matched is None:
+            return set(), None
+        if len(matched) * 2 > len(self.plugin_list):
+            # 匹配的插件较多时只转换未匹配的部分
+            hidden = self.plugin_list.rows(self.plugin_list.hashes() - matched)
+        else:
+            hidden = set(range(len(self.plugin_list))) - self.plugin_list.rows(matched)
 
-        for (ui, _, _), plugin in zip(self.ui_items, self.plugin_list):
-            name = plugin.get("Name", "").lower()
-            is_favorite = plugin.get("is_favorite", False)
+        best_row = None
+        if matched and filter_text.strip() and len(matched) <= RANK_LIMIT:
+            row = self.plugin_list.row
+            best_row = row(self.search_index.rank(matched, filter_text, order=row)[0])
+        return hidden, best_row
 
-            name_match = filter_text in name
-            favorite_match = not show_favorites or is_favorite
-            # print(plugin["Name"])
-            ui.set_visible(name_match and favorite_match)
\ No newline at end of file
+    def _query_catalog_db(self, filter_text, show_favorites):
+        """
+        由 SQLite 插件目录完成筛选，结果已按相关度排序。
+
+        :param filter_text: 搜索词
+        :param show_favorites: 是否只显示收藏的插件
+        :return: (需要隐藏的行号集合, 最相关的行号或 None)
+        """
+        if not filter_text.strip() and not show_favorites:
+            return set(), None
+        try:
+            hashes = self.catalog_db.query(filter_text, favorites_only=show_favorites)
+        except sqlite3.Error as e:
+            print(f"查询插件数据库时出错: {e}")
+            return self._query_search_index(filter_text, show_favorites)
+        rows = [row for row in map(self.plugin_list.row, hashes) if row is not None]
+        hidden = set(range(len(self.plugin_list))) - set(rows)
+        best_row = rows[0] if rows and filter_text.strip() else None
+        return hidden, best_row
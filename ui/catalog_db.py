@@ -0,0 +1,345 @@
+"""
+此模块实现了可选的 SQLite 插件目录（settings.json 中 catalog_backend 为 "sqlite" 时启用）。
+插件、仓库、收藏和拉取元数据分别保存在各自的表中，插件按 Hash、InternalName、URL、
+DalamudApiLevel 和 LastUpdate 建立索引，搜索使用 FTS5 全文索引（三元组分词，支持子串匹配）。
+启动时只读取列表显示需要的字段，完整的插件数据在展开详情或生成 PluginMaster.json 时按 Hash 读取；
+搜索、排序和只显示收藏都由查询完成。
+"""
+import json
+import sqlite3
+import threading
+import time
+
+from ui.plugin_catalog import PluginCatalog
+from ui.search_index import FIELD_WEIGHTS, normalize
+
+
+# 列表显示、目录索引需要的字段，其余字段只保存在完整数据中
+LIST_COLUMNS = (("Hash", "hash"), ("Name", "name"), ("InternalName", "internal_name"),
+                ("Description", "description"), ("IconUrl", "icon_url"), ("URL", "url"))
+# 可用于排序的字段
+ORDER_COLUMNS = {"position": "p.position", "name": "p.name COLLATE NOCASE", "last_update": "p.last_update DESC",
+                 "api_level": "p.dalamud_api_level DESC"}
+# FTS 表的列，与 FIELD_WEIGHTS 的顺序一致
+FTS_COLUMNS = ("name", "internal_name", "author", "punchline", "tags", "description")
+TRIGRAM_LENGTH = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS repos (
+    url TEXT PRIMARY KEY,
+    position INTEGER NOT NULL,
+    plugin_count INTEGER NOT NULL DEFAULT 0,
+    fetched_at TEXT
+);
+CREATE TABLE IF NOT EXISTS plugins (
+    position INTEGER PRIMARY KEY,
+    hash TEXT NOT NULL UNIQUE,
+    url TEXT NOT NULL,
+    name TEXT,
+    internal_name TEXT,
+    author TEXT,
+    punchline TEXT,
+    description TEXT,
+    icon_url TEXT,
+    dalamud_api_level INTEGER,
+    last_update INTEGER,
+    search_text TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS plugins_internal_name ON plugins (internal_name);
+CREATE INDEX IF NOT EXISTS plugins_url ON plugins (url);
+CREATE INDEX IF NOT EXISTS plugins_api_level ON plugins (dalamud_api_level);
+CREATE INDEX IF NOT EXISTS plugins_last_update ON plugins (last_update);
+CREATE TABLE IF NOT EXISTS favorites (
+    hash TEXT PRIMARY KEY,
+    is_favorite INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS fetch_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def _as_int(value):
+    """
+    把 DalamudApiLevel、LastUpdate 等字段转换为整数，无法转换时返回 None。
+    """
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _search_fields(plugin):
+    """
+    :param plugin: 插件数据
+    :return: 按 FIELD_WEIGHTS 顺序规范化后的各字段文本
+    """
+    fields = []
+    for field, _ in FIELD_WEIGHTS:
+        value = plugin.get(field) or ""
+        if isinstance(value, list):
+            value = " ".join(str(tag) for tag in value)
+        fields.append(normalize(str(value)))
+    return fields
+
+
+def list_fields(plugin):
+    """
+    只保留列表显示需要的字段和收藏状态，与 CatalogDB.load_catalog 生成的插件数据一致。
+
+    :param plugin: 完整的插件数据
+    :return: 插件数据
+    """
+    data = {field: plugin[field] for field, _ in LIST_COLUMNS if plugin.get(field) is not None}
+    data["is_favorite"] = bool(plugin.get("is_favorite", False))
+    return data
+
+
+def _escape_like(token):
+    return token.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+class CatalogDB:
+    """
+    SQLite 插件目录。每个线程使用各自的连接，可以在界面线程和后台线程中同时使用。
+    """
+
+    def __init__(self, path):
+        """
+        :param path: 数据库文件路径，不存在时创建
+        """
+        self.path = path
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        self.has_fts = self._init_schema()
+
+    def _connect(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, check_same_thread=False)
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+            with self._connections_lock:
+                self._connections.append(connection)
+        return connection
+
+    def _init_schema(self):
+        """
+        创建数据表和索引。SQLite 未编译 FTS5 或不支持三元组分词时，搜索改用 LIKE。
+
+        :return: 是否可以使用 FTS5
+        """
+        connection = self._connect()
+        with connection:
+            connection.executescript(SCHEMA)
+        try:
+            with connection:
+                connection.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS plugins_fts USING fts5("
+                                   f"{', '.join(FTS_COLUMNS)}, content='', tokenize='trigram')")
+            return True
+        except sqlite3.OperationalError as e:
+            print(f"SQLite 不支持 FTS5 三元组分词，搜索使用 LIKE: {e}")
+            return False
+
+    def is_current(self, urls, fetched_at):
+        """
+        判断数据库中的目录是否与各仓库当前的缓存分段一致。
+
+        :param urls: 仓库 URL 列表，按 RepoIndex 顺序排列
+        :param fetched_at: URL 到缓存分段拉取时间的字典
+        :return: 仓库列表和每个仓库的拉取时间都一致时返回 True
+        """
+        rows = self._connect().execute("SELECT url, fetched_at FROM repos ORDER BY position").fetchall()
+        if [row["url"] for row in rows] != list(urls):
+            return False
+        return all(row["fetched_at"] is not None and row["fetched_at"] == fetched_at.get(row["url"])
+                   for row in rows)
+
+    def save_catalog(self, urls, plugin_list, fetched_at, favorite_dict):
+        """
+        在一个事务中替换全部插件、仓库和收藏数据。
+
+        :param urls: 仓库 URL 列表，按 RepoIndex 顺序排列
+        :param plugin_list: 合并后的插件列表，每个插件须带有 Hash 和 URL 字段
+        :param fetched_at: URL 到缓存分段拉取时间的字典
+        :param favorite_dict: Hash 到收藏状态的字典
+        """
+        plugin_rows = []
+        fts_rows = []
+        counts = {}
+        for position, plugin in enumerate(plugin_list):
+            fields = _search_fields(plugin)
+            data = {key: value for key, value in plugin.items() if key != "is_favorite"}
+            plugin_rows.append((position, plugin["Hash"], plugin["URL"], plugin.get("Name"),
+                                plugin.get("InternalName"), plugin.get("Author"), plugin.get("Punchline"),
+                                plugin.get("Description"), plugin.get("IconUrl"),
+                                _as_int(plugin.get("DalamudApiLevel")), _as_int(plugin.get("LastUpdate")),
+                                "\x1f".join(fields), json.dumps(data, ensure_ascii=False)))
+            fts_rows.append((position, *fields))
+            counts[plugin["URL"]] = counts.get(plugin["URL"], 0) + 1
+
+        connection = self._connect()
+        with connection:
+            connection.execute("DELETE FROM plugins")
+            connection.execute("DELETE FROM repos")
+            connection.execute("DELETE FROM favorites")
+            connection.executemany("INSERT INTO plugins VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", plugin_rows)
+            connection.executemany("INSERT INTO repos VALUES (?, ?, ?, ?)",
+                                   [(url, position, counts.get(url, 0), fetched_at.get(url))
+                                    for position, url in enumerate(urls)])
+            connection.executemany("INSERT INTO favorites VALUES (?, ?)",
+                                   [(str(plugin_hash), int(bool(value)))
+                                    for plugin_hash, value in favorite_dict.items()])
+            if self.has_fts:
+                # content='' 的 FTS 表只能整体清空
+                connection.execute("INSERT INTO plugins_fts (plugins_fts) VALUES ('delete-all')")
+                connection.executemany(f"INSERT INTO plugins_fts (rowid, {', '.join(FTS_COLUMNS)}) "
+                                       f"VALUES (?, ?, ?, ?, ?, ?, ?)", fts_rows)
+            connection.execute("INSERT OR REPLACE INTO fetch_meta VALUES ('saved_at', ?)",
+                               (json.dumps(time.strftime("%Y-%m-%d %H:%M:%S")),))
+
+    def load_catalog(self):
+        """
+        只读取列表显示需要的字段，收藏状态在查询中关联，生成插件目录。
+        目录通过 details 按 Hash 读取完整数据。
+
+        :return: PluginCatalog 实例
+        """
+        columns = ", ".join(f"p.{column}" for _, column in LIST_COLUMNS)
+        rows = self._connect().execute(
+            f"SELECT {columns}, COALESCE(f.is_favorite, 0) AS is_favorite FROM plugins p "
+            f"LEFT JOIN favorites f ON f.hash = p.hash ORDER BY p.position").fetchall()
+        plugin_list = []
+        for row in rows:
+            plugin = {field: row[column] for field, column in LIST_COLUMNS if row[column] is not None}
+            plugin["is_favorite"] = bool(row["is_favorite"])
+            plugin_list.append(plugin)
+        return PluginCatalog(plugin_list, loader=self.load_plugin)
+
+    def load_plugin(self, plugin_hash):
+        """
+        :param plugin_hash: 插件的哈希值
+        :return: 完整的插件数据，不存在时返回 None
+        """
+        row = self._connect().execute("SELECT data FROM plugins WHERE hash = ?", (plugin_hash,)).fetchone()
+        return json.loads(row["data"]) if row is not None else None
+
+    def set_favorite(self, plugin_hash, is_favorite):
+        """
+        :param plugin_hash: 插件的哈希值
+        :param is_favorite: 新的收藏状态
+        """
+        connection = self._connect()
+        with connection:
+            connection.execute("INSERT OR REPLACE INTO favorites VALUES (?, ?)",
+                               (str(plugin_hash), int(bool(is_favorite))))
+
+    def sync_favorites(self, favorite_dict):
+        """
+        使收藏表与 MyRepo.json 一致，MyRepo.json 可能已被其他程序修改。内容相同时不写入。
+
+        :param favorite_dict: Hash 到收藏状态的字典
+        :return: 是否修改了收藏表
+        """
+        expected = {str(plugin_hash): int(bool(value)) for plugin_hash, value in favorite_dict.items()}
+        connection = self._connect()
+        rows = connection.execute("SELECT hash, is_favorite FROM favorites").fetchall()
+        current = {row["hash"]: row["is_favorite"] for row in rows}
+        if current == expected:
+            return False
+        with connection:
+            connection.execute("DELETE FROM favorites")
+            connection.executemany("INSERT INTO favorites VALUES (?, ?)", expected.items())
+        return True
+
+    def query(self, text="", favorites_only=False, order_by="position", api_level=None):
+        """
+        查询插件。搜索词按空白分成多个词，每个词都须出现在名称、内部名称、作者、简介、标签或描述中；
+        有搜索词时按各字段的权重排序，否则按 order_by 排序。
+
+        :param text: 搜索词
+        :param favorites_only: 是否只返回收藏的插件
+        :param order_by: 没有搜索词时的排序方式，为 ORDER_COLUMNS 中的键
+        :param api_level: 只返回指定 DalamudApiLevel 的插件，为 None 时不限制
+        :return: 插件 Hash 列表
+        """
+        tokens = normalize(text or "").split()
+        joins = []
+        conditions = []
+        params = []
+        order = ORDER_COLUMNS[order_by]
+        long_tokens = [token for token in tokens if len(token) >= TRIGRAM_LENGTH] if self.has_fts else []
+        if long_tokens:
+            joins.append("JOIN plugins_fts ON plugins_fts.rowid = p.position")
+            conditions.append("plugins_fts MATCH ?")
+            params.append(" AND ".join('"{}"'.format(token.replace('"', '""')) for token in long_tokens))
+            weights = ", ".join(str(weight) for _, weight in FIELD_WEIGHTS)
+            order = f"bm25(plugins_fts, {weights}), p.position"
+        for token in tokens:
+            if token not in long_tokens:
+                # 三元组索引无法匹配较短的词
+                conditions.append("p.search_text LIKE ? ESCAPE '\\'")
+                params.append(f"%{_escape_like(token)}%")
+        if favorites_only:
+            joins.append("JOIN favorites f ON f.hash = p.hash AND f.is_favorite")
+        if api_level is not None:
+            conditions.append("p.dalamud_api_level = ?")
+            params.append(api_level)
+        sql = f"SELECT p.hash FROM plugins p {' '.join(joins)}"
+        if conditions:
+            sql += f" WHERE {' AND '.join(conditions)}"
+        sql += f" ORDER BY {order}"
+        return [row["hash"] for row in self._connect().execute(sql, params)]
+
+    def get_meta(self, key, default=None):
+        """
+        :param key: 元数据键
+        :param default: 不存在时的返回值
+        :return: 元数据值
+        """
+        row = self._connect().execute("SELECT value FROM fetch_meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row["value"]) if row is not None else default
+
+    def set_meta(self, key, value):
+        """
+        :param key: 元数据键
+        :param value: 可以序列化为 JSON 的值
+        """
+        connection = self._connect()
+        with connection:
+            connection.execute("INSERT OR REPLACE INTO fetch_meta VALUES (?, ?)",
+                               (key, json.dumps(value, ensure_ascii=False)))
+
+    def close(self):
+        """
+        关闭所有线程的连接。
+        """
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        for connection in connections:
+            connection.close()
+        self._local = threading.local()
+
+
+_databases = {}
+_databases_lock = threading.Lock()
+
+
+def open_catalog_db(path):
+    """
+    获取路径对应的共享数据库，同一路径在进程内只初始化一次。
+
+    :param path: 数据库文件路径
+    :return: CatalogDB 实例
+    """
+    with _databases_lock:
+        database = _databases.get(path)
+        if database is None:
+            database = CatalogDB(path)
+            _databases[path] = database
+        return database
@@ -0,0 +1,337 @@
+"""
+此模块实现了共享的图标下载调度器：固定数量的工作线程、复用连接的 HTTP Session，
+相同图标（按 URL 哈希值区分，与缓存文件一一对应）的请求合并为一次下载，可见行的图标优先加载。
+原始图标交给子进程池生成缩略图（见 ui.thumbnailer），缩略图保存在 IconStore 中，
+工作线程只加载已经缩放好的缩略图，界面线程不再缩放。
+requests、Pillow 和子进程池在工作线程第一次下载或生成缩略图时才导入，不占用启动时间。
+每个请求都带有加载票据（调度器的当前代数），列表重建或筛选变化时可以取消过期的请求。
+"""
+import heapq
+import itertools
+import os
+import sys
+import threading
+import time
+
+from PyQt5 import QtCore, QtGui
+
+from ui.tracing import tracer
+
+
+DEFAULT_ICON_WORKERS = 4
+DEFAULT_THUMBNAIL_WORKERS = 2
+ICON_SIZE = 64
+PRIORITY_VISIBLE = 0
+PRIORITY_OFFSCREEN = 1
+
+
+class IconScheduler(QtCore.QObject):
+    """
+    图标下载调度类。所有图标请求进入同一个优先队列，由固定数量的工作线程处理；
+    同一图标的多个请求只下载一次，结果连同仍在等待的插件 Hash 一起发送一次。
+    cancel_all 使之前发放的票据全部失效，已在下载中的任务完成后只写缓存，不再发送结果。
+    工作线程中只使用 QImage，转换为 QPixmap 由界面线程完成。
+    缩略图的生成在子进程池中进行，子进程池在第一次需要时才创建。
+    """
+    icon_loaded = QtCore.pyqtSignal(str, QtGui.QImage, list)  # 参数为图标键、缩略图和等待的插件 Hash，失败时图标为空
+
+    def __init__(self, store, max_workers=DEFAULT_ICON_WORKERS, proxy=None, icon_size=ICON_SIZE,
+                 thumbnail_workers=DEFAULT_THUMBNAIL_WORKERS, legacy_cache_dir=None, parent=None):
+        """
+        :param store: 保存缩略图的 IconStore 实例
+        :param max_workers: 同时下载的图标数量上限
+        :param proxy: 代理配置，字典类型
+        :param icon_size: 加载的缩略图边长，须为 ui.thumbnailer.THUMBNAIL_SIZES 之一
+        :param thumbnail_workers: 生成缩略图的子进程数量
+        :param legacy_cache_dir: 旧版本的图标缓存目录，其中按 URL 哈希值命名的原图可直接作为原始图标
+        :param parent: 父对象
+        """
+        super().__init__(parent)
+        self.store = store
+        self.legacy_cache_dir = legacy_cache_dir
+        self.max_workers = max(1, int(max_workers))
+        self.icon_size = icon_size
+        self.thumbnail_workers = max(1, int(thumbnail_workers))
+        self._process_pool = None
+        self._process_pool_lock = threading.Lock()
+        # 打包后的程序中子进程会重新运行整个程序，改为在工作线程中生成缩略图
+        self._use_process_pool = not getattr(sys, "frozen", False)
+        self.session = None  # 第一次下载图标时创建
+        self._session_lock = threading.Lock()
+        self.proxy = {}
+        self.set_proxy(proxy)
+
+        self._heap = []
+        self._counter = itertools.count()
+        self._generation = 0  # 当前票据，cancel_all 后递增
+        self._waiters = {}  # 图标键到 {插件 Hash: 票据} 的字典
+        self._priority = {}  # 仍在队列中的图标键到其当前优先级
+        self._jobs = {}  # 仍在队列中的图标键到图标 URL
+        self._in_flight = set()  # 已由工作线程取出、正在加载的图标键
+        self._queued_at = {}  # 启用追踪时图标键到进入队列的时刻
+        self._condition = threading.Condition()
+        self._closed = False
+        self._threads = []
+        for i in range(self.max_workers):
+            thread = threading.Thread(target=self._worker, name=f"IconWorker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def set_proxy(self, proxy):
+        """
+        更新下载图标使用的代理。
+
+        :param proxy: 代理配置，字典类型，为空时不使用代理
+        """
+        with self._session_lock:
+            self.proxy = dict(proxy or {})
+            if self.session is not None:
+                self.session.proxies.clear()
+                self.session.proxies.update(self.proxy)
+
+    def _get_session(self):
+        """
+        获取下载图标使用的 Session，第一次调用时导入 requests 并创建。
+
+        :return: requests.Session 实例
+        """
+        with self._session_lock:
+            if self.session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.max_workers)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                session.proxies.update(self.proxy)
+                self.session = session
+            return self.session
+
+    def request(self, icon_key, icon_url, plugin_hash, priority=PRIORITY_OFFSCREEN):
+        """
+        请求加载图标。同一图标已在队列或下载中时只登记等待的插件，下载中的任务完成后一并发送给新登记的插件。
+
+        :param icon_key: 图标键，即图标 URL 的哈希值
+        :param icon_url: 图标的 URL 或本地路径
+        :param plugin_hash: 等待该图标的插件哈希值
+        :param priority: 优先级，数值越小越先加载
+        :return: 本次请求的票据
+        """
+        with self._condition:
+            waiters = self._waiters.setdefault(icon_key, {})
+            waiters[plugin_hash] = self._generation
+            if icon_key in self._priority:
+                if priority < self._priority[icon_key]:
+                    self._push(icon_key, priority)
+            elif icon_key not in self._jobs and icon_key not in self._in_flight:
+                self._jobs[icon_key] = icon_url
+                if tracer.enabled:
+                    self._queued_at[icon_key] = time.perf_counter()
+                self._push(icon_key, priority)
+            return self._generation
+
+    def promote(self, icon_keys):
+        """
+        把仍在队列中的图标提升为可见优先级，例如滚动后进入视口的行。
+
+        :param icon_keys: 图标键列表
+        """
+        with self._condition:
+            for icon_key in icon_keys:
+                if self._priority.get(icon_key, PRIORITY_VISIBLE) > PRIORITY_VISIBLE:
+                    self._push(icon_key, PRIORITY_VISIBLE)
+
+    def cancel(self, plugin_hashes):
+        """
+        取消指定插件的等待，没有插件等待的图标从队列中移除。
+
+        :param plugin_hashes: 插件 Hash 集合
+        """
+        plugin_hashes = set(plugin_hashes)
+        with self._condition:
+            for icon_key in list(self._waiters):
+                waiters = self._waiters[icon_key]
+                for plugin_hash in plugin_hashes & waiters.keys():
+                    del waiters[plugin_hash]
+                if not waiters:
+                    self._drop(icon_key)
+
+    def cancel_all(self):
+        """
+        使之前发放的票据全部失效并清空队列，用于列表整体重建。
+
+        :return: 新的票据
+        """
+        with self._condition:
+            self._generation += 1
+            self._heap.clear()
+            self._priority.clear()
+            self._jobs.clear()
+            self._queued_at.clear()
+            self._waiters.clear()
+            return self._generation
+
+    def _drop(self, icon_key):
+        # 队列中的旧条目在出队时因 _priority 中没有记录而被丢弃
+        del self._waiters[icon_key]
+        self._priority.pop(icon_key, None)
+        self._jobs.pop(icon_key, None)
+        self._queued_at.pop(icon_key, None)
+
+    def _push(self, icon_key, priority):
+        # 提升优先级时直接压入新条目，旧条目出队时按 _priority 判断并丢弃
+        self._priority[icon_key] = priority
+        heapq.heappush(self._heap, (priority, next(self._counter), icon_key))
+        self._condition.notify()
+
+    def _next_job(self):
+        with self._condition:
+            while True:
+                if self._closed:
+                    return None
+                while self._heap:
+                    priority, _, icon_key = heapq.heappop(self._heap)
+                    if self._priority.get(icon_key) == priority:
+                        del self._priority[icon_key]
+                        self._in_flight.add(icon_key)
+                        queued_at = self._queued_at.pop(icon_key, None)
+                        if queued_at is not None:
+                            tracer.add("icon.queue_wait", queued_at, time.perf_counter() - queued_at,
+                                       priority=priority)
+                        return icon_key, self._jobs.pop(icon_key)
+                self._condition.wait()
+
+    def _worker(self):
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            icon_key, icon_url = job
+            try:
+                with tracer.span("icon.job", icon_key=icon_key):
+                    image = self._load_icon(icon_key, icon_url)
+            except Exception as e:
+                # 任何错误都按加载失败处理，等待的插件仍会收到空图像，工作线程继续运行
+                print(f"加载图标 {icon_url} 时出错: {e}")
+                image = QtGui.QImage()
+            with self._condition:
+                self._in_flight.discard(icon_key)
+                waiters = self._waiters.pop(icon_key, {})
+                # 只把结果发送给票据仍然有效的插件
+                plugin_hashes = [plugin_hash for plugin_hash, ticket in waiters.items()
+                                 if ticket == self._generation]
+            if plugin_hashes and not self._closed:
+                try:
+                    self.icon_loaded.emit(icon_key, image, plugin_hashes)
+                except RuntimeError:
+                    # 退出时调度器可能已被销毁，丢弃结果
+                    return
+
+    def _load_icon(self, icon_key, icon_url):
+        """
+        优先从图标存储加载已有的缩略图；没有时从网络或本地获取原始图标，生成缩略图并保存后再加载。
+        旧版本缓存的原图（<图标键>.png）直接作为原始图标使用，无需重新下载。
+
+        :param icon_key: 图标键
+        :param icon_url: 图标的 URL 或本地路径
+        :return: QImage，加载失败时为空图像
+        """
+        with tracer.span("icon.store_get"):
+            data = self.store.get(icon_key, self.icon_size)
+        if data is not None:
+            with tracer.span("icon.decode", cached=True):
+                image = QtGui.QImage.fromData(data, "PNG")
+            if not image.isNull():
+                return image
+
+        legacy_file = os.path.join(self.legacy_cache_dir or "", f"{icon_key}.png")
+        if os.path.exists(icon_url):
+            source = icon_url
+        elif self.legacy_cache_dir and os.path.exists(legacy_file):
+            source = legacy_file
+        else:
+            session = self._get_session()
+            import requests
+            try:
+                with tracer.span("icon.download", url=icon_url):
+                    response = session.get(icon_url, timeout=5)
+                    response.raise_for_status()
+                    source = response.content
+            except requests.RequestException as e:
+                # print(f"请求图片 {icon_url} 时出错: {e}")
+                return QtGui.QImage()
+
+        # 子进程中解码原图并缩放、编码各尺寸的缩略图
+        with tracer.span("icon.scale"):
+            thumbnails = self._make_thumbnails(source, icon_key)
+        for size, data in thumbnails.items():
+            self.store.put(icon_key, size, data)
+        if self.icon_size not in thumbnails:
+            return QtGui.QImage()
+        with tracer.span("icon.decode", cached=False):
+            return QtGui.QImage.fromData(thumbnails[self.icon_size], "PNG")
+
+    def _make_thumbnails(self, source, icon_key):
+        """
+        在子进程池中生成缩略图。打包后的程序、子进程池无法启动或已损坏时在当前线程中生成，
+        之后不再尝试子进程池。
+
+        :param source: 原始图标的文件路径或字节内容
+        :param icon_key: 图标键
+        :return: 边长到缩略图 PNG 字节内容的字典
+        """
+        if self._closed:
+            return {}
+        from ui.thumbnailer import make_thumbnails
+        if self._use_process_pool:
+            try:
+                return self._get_process_pool().submit(make_thumbnails, source, icon_key).result()
+            except (OSError, RuntimeError, ImportError, NotImplementedError) as e:
+                # BrokenProcessPool 是 RuntimeError 的子类
+                if self._closed:
+                    return {}
+                self._disable_process_pool(e)
+        return make_thumbnails(source, icon_key)
+
+    def _disable_process_pool(self, error):
+        """
+        关闭子进程池，之后在工作线程中生成缩略图。
+
+        :param error: 子进程池不可用的原因
+        """
+        with self._process_pool_lock:
+            if not self._use_process_pool:
+                return
+            self._use_process_pool = False
+            pool, self._process_pool = self._process_pool, None
+        print(f"缩略图子进程不可用，改为在工作线程中处理: {error}")
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _get_process_pool(self):
+        with self._process_pool_lock:
+            if self._closed:
+                raise RuntimeError("调度器已停止")
+            if self._process_pool is None:
+                import multiprocessing
+                from concurrent.futures import ProcessPoolExecutor
+                # 界面进程中已有多个线程，使用 spawn 避免 fork 复制线程和 Qt 的状态
+                self._process_pool = ProcessPoolExecutor(max_workers=self.thumbnail_workers,
+                                                         mp_context=multiprocessing.get_context("spawn"))
+            return self._process_pool
+
+    def shutdown(self):
+        """
+        停止调度器，丢弃尚未开始的任务，不等待正在进行的下载。
+        """
+        with self._condition:
+            self._closed = True
+            self._heap.clear()
+            self._condition.notify_all()
+        with self._process_pool_lock:
+            if self._process_pool is not None:
+                self._process_pool.shutdown(wait=False, cancel_futures=True)
+                self._process_pool = None
+        with self._session_lock:
+            if self.session is not None:
+                self.session.close()
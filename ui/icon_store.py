@@ -0,0 +1,318 @@
+"""
+此模块实现了按内容寻址的图标存储：缩略图按内容的 SHA-1 摘要保存，不同 URL 的相同图片只保存一份，
+一个小的索引记录图标键到摘要的映射以及每份数据的大小和最近访问时间。
+超过磁盘上限或长期未访问的数据会被清理；所有数据还可以合并到一个文件中，
+冷启动时只需打开索引和这个文件（以 mmap 方式读取），不必逐个打开数百个小文件。
+每次合并都写入新的带编号的合并文件，最后保存指向它的索引，中途崩溃时旧的索引和合并文件仍然一致。
+"""
+import hashlib
+import json
+import mmap
+import os
+import threading
+import time
+
+
+DEFAULT_STORE_MB = 64
+DEFAULT_MAX_AGE_DAYS = 30
+INDEX_FILE = "index.json"
+PACK_FILE = "icons.pack"  # 索引没有记录合并文件名时使用的旧文件名
+PACK_PREFIX = "icons"
+PACK_SUFFIX = ".pack"
+BLOB_DIR = "blobs"
+
+
+class IconStore:
+    """
+    按内容寻址、有容量上限的图标存储，可以在多个线程中同时使用。
+    索引在内存中维护，最近访问时间只在 save、gc 和 close 时写回磁盘。
+    创建时不访问磁盘，第一次读写时才创建目录并读取索引，通常在图标工作线程中，不占用启动时间。
+    """
+
+    def __init__(self, store_dir, max_bytes=DEFAULT_STORE_MB * 1024 * 1024,
+                 max_age_days=DEFAULT_MAX_AGE_DAYS):
+        """
+        :param store_dir: 存储目录，第一次读写时创建
+        :param max_bytes: 所有数据占用的字节上限
+        :param max_age_days: 数据超过该天数未访问即被清理
+        """
+        self.store_dir = store_dir
+        self.max_bytes = max_bytes
+        self.max_age_days = max_age_days
+        self.total_bytes = 0
+        self._lock = threading.RLock()
+        self._entries = {}  # "图标键_边长" 到摘要
+        self._blobs = {}  # 摘要到 {"size", "last_access", 合并后还有 "offset"}
+        self._pack_name = PACK_FILE  # 当前合并文件名，由索引记录
+        self._pack_generation = 0  # 当前合并文件的编号，每次合并加一
+        self._pack_file = None
+        self._pack = None
+        self._loaded = False
+
+    def _ensure_loaded(self):
+        """
+        第一次读写时创建存储目录并读取索引，须在持有 self._lock 时调用。
+        """
+        if self._loaded:
+            return
+        self._loaded = True
+        try:
+            os.makedirs(os.path.join(self.store_dir, BLOB_DIR), exist_ok=True)
+        except OSError as e:
+            print(f"创建图标存储目录时出错: {e}")
+        self._load_index()
+
+    def _index_path(self):
+        return os.path.join(self.store_dir, INDEX_FILE)
+
+    def _pack_path(self, name=None):
+        return os.path.join(self.store_dir, name or self._pack_name)
+
+    def _blob_path(self, digest):
+        return os.path.join(self.store_dir, BLOB_DIR, f"{digest}.png")
+
+    def _entry_key(self, icon_key, size):
+        return f"{icon_key}_{size}"
+
+    def _load_index(self):
+        """
+        读取索引并打开合并文件，索引损坏时视为空存储，残留的数据由 gc 清理。
+        """
+        try:
+            with open(self._index_path(), "r", encoding="utf-8") as f:
+                index = json.load(f)
+            self._entries = index.get("entries", {})
+            self._blobs = index.get("blobs", {})
+            self._pack_name = index.get("pack", PACK_FILE)
+            self._pack_generation = index.get("pack_generation", 0)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self._entries, self._blobs = {}, {}
+        self._open_pack()
+        if self._pack is None:
+            # 合并文件丢失时，原本保存在其中的数据已不可用
+            for digest in [d for d, blob in self._blobs.items() if "offset" in blob]:
+                del self._blobs[digest]
+        self._entries = {key: digest for key, digest in self._entries.items() if digest in self._blobs}
+        self.total_bytes = sum(blob["size"] for blob in self._blobs.values())
+
+    def _open_pack(self):
+        try:
+            self._pack_file = open(self._pack_path(), "rb")
+            self._pack = mmap.mmap(self._pack_file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (FileNotFoundError, ValueError):
+            # 空文件无法映射
+            self._close_pack()
+
+    def _close_pack(self):
+        if self._pack is not None:
+            self._pack.close()
+            self._pack = None
+        if self._pack_file is not None:
+            self._pack_file.close()
+            self._pack_file = None
+
+    def get(self, icon_key, size):
+        """
+        读取图标缩略图，并更新最近访问时间。
+
+        :param icon_key: 图标键，即图标 URL 的哈希值
+        :param size: 缩略图边长
+        :return: PNG 字节内容，不存在时返回 None
+        """
+        with self._lock:
+            self._ensure_loaded()
+            digest = self._entries.get(self._entry_key(icon_key, size))
+            blob = self._blobs.get(digest) if digest else None
+            if blob is None:
+                return None
+            blob["last_access"] = time.time()
+            if "offset" in blob:
+                if self._pack is None:
+                    return None
+                return self._pack[blob["offset"]:blob["offset"] + blob["size"]]
+        try:
+            with open(self._blob_path(digest), "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def put(self, icon_key, size, data):
+        """
+        保存图标缩略图，内容相同的数据只保存一份，超出容量上限时清理最久未访问的数据。
+
+        :param icon_key: 图标键
+        :param size: 缩略图边长
+        :param data: PNG 字节内容
+        """
+        digest = hashlib.sha1(data).hexdigest()
+        with self._lock:
+            self._ensure_loaded()
+            if digest not in self._blobs:
+                tmp_path = f"{self._blob_path(digest)}.{threading.get_ident()}.tmp"
+                try:
+                    with open(tmp_path, "wb") as f:
+                        f.write(data)
+                    os.replace(tmp_path, self._blob_path(digest))
+                except OSError as e:
+                    print(f"保存图标 {icon_key} 时出错: {e}")
+                    return
+                self._blobs[digest] = {"size": len(data)}
+                self.total_bytes += len(data)
+            self._blobs[digest]["last_access"] = time.time()
+            self._entries[self._entry_key(icon_key, size)] = digest
+            if self.total_bytes > self.max_bytes:
+                self._evict(self.max_bytes)
+
+    def _evict(self, max_bytes, max_age=None):
+        """
+        按最近访问时间从旧到新清理数据，直到不超过 max_bytes 且没有超过 max_age 的数据。
+        合并文件中的数据只从索引中移除，空间在下次合并时回收。
+        """
+        now = time.time()
+        removed = set()
+        for digest, blob in sorted(self._blobs.items(), key=lambda item: item[1].get("last_access", 0)):
+            expired = max_age is not None and now - blob.get("last_access", 0) > max_age
+            if self.total_bytes <= max_bytes and not expired:
+                break
+            self.total_bytes -= blob["size"]
+            removed.add(digest)
+            if "offset" not in blob:
+                try:
+                    os.remove(self._blob_path(digest))
+                except OSError:
+                    pass
+        for digest in removed:
+            del self._blobs[digest]
+        if removed:
+            self._entries = {key: digest for key, digest in self._entries.items() if digest not in removed}
+        return len(removed)
+
+    def gc(self):
+        """
+        清理超过容量上限或超过 max_age_days 未访问的数据，以及索引中没有记录的残留文件和旧的合并文件，然后保存索引。
+
+        :return: 清理的数据数量
+        """
+        with self._lock:
+            self._ensure_loaded()
+            count = self._evict(self.max_bytes, self.max_age_days * 24 * 3600)
+            blob_dir = os.path.join(self.store_dir, BLOB_DIR)
+            for name in self._listdir(blob_dir):
+                digest = name.split(".", 1)[0]
+                blob = self._blobs.get(digest)
+                if blob is None or "offset" in blob or not name.endswith(".png"):
+                    if self._remove(os.path.join(blob_dir, name)):
+                        count += 1
+            if self.save():
+                # 索引保存之后再删除不再使用的合并文件，包括合并中途崩溃留下的文件
+                for name in self._listdir(self.store_dir):
+                    if name.startswith(PACK_PREFIX) and PACK_SUFFIX in name and name != self._pack_name:
+                        self._remove(self._pack_path(name))
+            return count
+
+    @staticmethod
+    def _listdir(path):
+        """
+        :return: 目录中的文件名列表，目录不存在或无法读取时为空列表
+        """
+        try:
+            return os.listdir(path)
+        except OSError:
+            return []
+
+    @staticmethod
+    def _remove(path):
+        """
+        :return: 是否删除成功
+        """
+        try:
+            os.remove(path)
+        except OSError:
+            return False
+        return True
+
+    def pack(self):
+        """
+        把所有数据（合并文件中仍有效的和单独的文件）写入新编号的合并文件，同步到磁盘后保存指向它的索引，
+        最后删除旧的合并文件和单独的文件。保存索引之前崩溃时旧的索引仍然有效，新文件由 gc 清理。
+        """
+        with self._lock:
+            self._ensure_loaded()
+            generation = self._pack_generation + 1
+            pack_name = f"{PACK_PREFIX}-{generation}{PACK_SUFFIX}"
+            offsets = {}
+            try:
+                with open(self._pack_path(pack_name), "wb") as f:
+                    for digest, blob in self._blobs.items():
+                        if "offset" in blob:
+                            data = self._pack[blob["offset"]:blob["offset"] + blob["size"]]
+                        else:
+                            try:
+                                with open(self._blob_path(digest), "rb") as blob_file:
+                                    data = blob_file.read()
+                            except OSError:
+                                continue
+                        offsets[digest] = f.tell()
+                        f.write(data)
+                    f.flush()
+                    os.fsync(f.fileno())
+            except OSError as e:
+                print(f"合并图标存储时出错: {e}")
+                self._remove(self._pack_path(pack_name))
+                return
+
+            old_pack_name = self._pack_name
+            loose = []
+            for digest in list(self._blobs):
+                if digest not in offsets:
+                    self.total_bytes -= self._blobs.pop(digest)["size"]
+                    continue
+                if "offset" not in self._blobs[digest]:
+                    loose.append(digest)
+                self._blobs[digest]["offset"] = offsets[digest]
+            self._entries = {key: digest for key, digest in self._entries.items() if digest in self._blobs}
+            self._pack_name = pack_name
+            self._pack_generation = generation
+            self._close_pack()
+            self._open_pack()
+            if not self.save():
+                return
+            # 新的索引已经生效，旧的合并文件和单独的文件不再需要
+            if old_pack_name != pack_name:
+                self._remove(self._pack_path(old_pack_name))
+            for digest in loose:
+                self._remove(self._blob_path(digest))
+
+    def save(self):
+        """
+        原子地写入索引文件。
+
+        :return: 是否写入成功
+        """
+        with self._lock:
+            self._ensure_loaded()
+            index = {"entries": self._entries, "blobs": self._blobs,
+                     "pack": self._pack_name, "pack_generation": self._pack_generation}
+            tmp_path = f"{self._index_path()}.tmp"
+            try:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(index, f)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self._index_path())
+            except OSError as e:
+                print(f"保存图标索引时出错: {e}")
+                return False
+            return True
+
+    def close(self, pack=False):
+        """
+        清理过期数据并保存索引，可选地合并为单个文件，然后释放合并文件。
+
+        :param pack: 是否合并所有数据
+        """
+        with self._lock:
+            self.gc()
+            if pack:
+                self.pack()
+            self._close_pack()
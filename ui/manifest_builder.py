@@ -0,0 +1,285 @@
+"""
+此模块实现了多目标的清单生成：一次遍历收藏的插件，同时生成 settings.json 中 manifest_targets 配置的多个清单，
+例如按 DalamudApiLevel 拆分的清单、稳定版和测试版渠道的清单，以及压缩格式和预压缩的 .gz 清单。
+每个插件在每个渠道下只转换和序列化一次，由使用同一渠道和格式的目标共享；
+目标的内容摘要与上次生成时相同且文件仍然存在时不再序列化和写入；
+按 {api_level} 拆分的目标上次生成、这次不再生成的文件会被删除。不依赖 Qt。
+
+目标配置示例：
+    {"path": "PluginMaster.json"}
+    {"path": "api{api_level}/PluginMaster.json", "channel": "stable"}
+    {"path": "PluginMaster.testing.min.json", "channel": "testing", "minify": true, "gzip": true}
+    {"path": "PluginMaster.api12.json", "api_level": 12}
+"""
+import gzip
+import hashlib
+import json
+import os
+import re
+import textwrap
+
+from ui.settings_store import open_store
+
+
+DEFAULT_TARGETS = ({"path": "PluginMaster.json"},)
+CHANNELS = ("all", "stable", "testing")
+API_LEVEL_PLACEHOLDER = "{api_level}"
+# 每次拉取都会变化的统计字段，不计入内容摘要，只有这些字段变化时不重新生成
+VOLATILE_FIELDS = ("DownloadCount",)
+# 稳定版渠道中去除的测试版字段
+TESTING_FIELDS = ("DownloadLinkTesting", "TestingAssemblyVersion", "TestingDalamudApiLevel")
+GZIP_LEVEL = 9
+
+
+def stable_fields(plugin):
+    """
+    :param plugin: 插件数据
+    :return: 去除统计字段后的插件数据
+    """
+    return {key: value for key, value in plugin.items() if key not in VOLATILE_FIELDS}
+
+
+def channel_variant(plugin, channel):
+    """
+    生成插件在指定渠道中的数据。
+
+    :param plugin: 插件数据
+    :param channel: "all" 原样发布；"stable" 排除仅测试版的插件并去除测试版字段；
+        "testing" 只包含有测试版的插件，下载地址、版本号和 API 版本替换为测试版的值
+    :return: 插件数据，该插件不属于此渠道时返回 None
+    """
+    if channel == "all":
+        return plugin
+    if channel == "stable":
+        if plugin.get("IsTestingExclusive"):
+            return None
+        return {key: value for key, value in plugin.items() if key not in TESTING_FIELDS}
+    testing_link = plugin.get("DownloadLinkTesting")
+    if not testing_link:
+        return None
+    data = dict(plugin)
+    data["DownloadLinkInstall"] = data["DownloadLinkUpdate"] = testing_link
+    if plugin.get("TestingAssemblyVersion"):
+        data["AssemblyVersion"] = plugin["TestingAssemblyVersion"]
+    if plugin.get("TestingDalamudApiLevel") is not None:
+        data["DalamudApiLevel"] = plugin["TestingDalamudApiLevel"]
+    return data
+
+
+class ManifestTarget:
+    """
+    一个清单目标的配置。路径中包含 {api_level} 时按 DalamudApiLevel 拆分为多个文件。
+    """
+
+    def __init__(self, path, api_level=None, channel="all", minify=False, gzip=False):
+        """
+        :param path: 输出文件的绝对路径
+        :param api_level: 只包含该 DalamudApiLevel 的插件，None 表示不筛选
+        :param channel: 发布渠道，见 CHANNELS
+        :param minify: 是否使用紧凑格式（无缩进和空格）
+        :param gzip: 是否同时写入预压缩的 .gz 文件
+        """
+        if channel not in CHANNELS:
+            raise ValueError(f"未知的发布渠道: {channel}")
+        self.path = path
+        self.api_level = api_level
+        self.channel = channel
+        self.minify = minify
+        self.gzip = gzip
+
+    @property
+    def split(self):
+        """
+        :return: 是否按 DalamudApiLevel 拆分
+        """
+        return API_LEVEL_PLACEHOLDER in self.path
+
+    def output_path(self, plugin):
+        """
+        :param plugin: 插件在本目标渠道中的数据
+        :return: 插件应写入的文件路径，不属于本目标时返回 None
+        """
+        level = plugin.get("DalamudApiLevel")
+        if self.api_level is not None and level != self.api_level:
+            return None
+        if self.split:
+            return self.path.replace(API_LEVEL_PLACEHOLDER, str(level if level is not None else 0))
+        return self.path
+
+    def matches(self, path):
+        """
+        :param path: 文件路径
+        :return: 该路径是否可能是本目标生成的清单
+        """
+        if not self.split:
+            return os.path.normcase(path) == os.path.normcase(self.path)
+        pattern = re.escape(os.path.normcase(self.path)).replace(re.escape(API_LEVEL_PLACEHOLDER), r"\d+")
+        return re.fullmatch(pattern, os.path.normcase(path)) is not None
+
+    def config_key(self):
+        """
+        :return: 影响输出内容的配置，计入内容摘要
+        """
+        return f"{self.channel}|{self.api_level}|{int(self.minify)}|{int(self.gzip)}"
+
+
+def load_targets(settings_fp, base_dir):
+    """
+    读取 settings.json 中的 manifest_targets，未配置时只生成 PluginMaster.json。
+
+    :param settings_fp: 设置文件路径
+    :param base_dir: 相对路径的基准目录
+    :return: ManifestTarget 列表
+    :raises ValueError: 两个目标的输出路径相同时
+    """
+    targets = []
+    for config in open_store(settings_fp).get("manifest_targets") or DEFAULT_TARGETS:
+        config = dict(config)
+        config["path"] = os.path.normpath(os.path.join(base_dir, config["path"]))
+        target = ManifestTarget(**config)
+        for other in targets:
+            # 拆分的目标与相同模式的目标，或与模式匹配的固定路径会写入同一个文件
+            same = os.path.normcase(other.path) == os.path.normcase(target.path)
+            if same or (not target.split and other.matches(target.path)) \
+                    or (not other.split and target.matches(other.path)):
+                raise ValueError(f"清单目标的路径重复: {config['path']}")
+        targets.append(target)
+    return targets
+
+
+class _Entry:
+    """
+    插件在某个渠道中的数据，摘要和两种格式的文本在第一次需要时生成，由多个目标共享。
+    """
+    __slots__ = ("plugin", "_digest", "_texts")
+
+    def __init__(self, plugin):
+        self.plugin = plugin
+        self._digest = None
+        self._texts = {}
+
+    def digest(self):
+        if self._digest is None:
+            text = json.dumps(stable_fields(self.plugin), sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+            self._digest = hashlib.sha1(text.encode("utf-8")).hexdigest()
+        return self._digest
+
+    def text(self, minify):
+        text = self._texts.get(minify)
+        if text is None:
+            if minify:
+                text = json.dumps(self.plugin, separators=(",", ":"), ensure_ascii=False)
+            else:
+                # 与 json.dump(列表, indent=4) 中的数组元素一致
+                text = textwrap.indent(json.dumps(self.plugin, indent=4, ensure_ascii=False), "    ")
+            self._texts[minify] = text
+        return text
+
+
+def _render(entries, minify):
+    """
+    由各插件的文本拼接出整个清单，结果与 json.dumps(列表) 相同。
+    """
+    if not entries:
+        return "[]"
+    if minify:
+        return "[" + ",".join(entry.text(True) for entry in entries) + "]"
+    return "[\n" + ",\n".join(entry.text(False) for entry in entries) + "\n]"
+
+
+def _write_atomic(path, data):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+class BuildResult:
+    """
+    一次生成的结果。
+    """
+
+    def __init__(self):
+        self.written = []  # 重新写入的文件路径，包括 .gz 文件
+        self.unchanged = []  # 内容未变化、没有写入的清单路径
+        self.digests = {}  # 清单路径到内容摘要
+        self.counts = {}  # 清单路径到插件数量
+        self.files = {}  # 清单路径到该清单的全部文件（包括 .gz 文件）
+        self.removed = []  # 删除的过期文件路径，包括 .gz 文件
+        self.errors = []
+
+
+def build_manifests(processed_list, targets, previous_digests=None):
+    """
+    一次遍历插件列表，生成全部目标。内容摘要与 previous_digests 中的相同且文件存在时跳过该目标。
+    previous_digests 中属于某个拆分目标、但这次没有生成的文件（例如不再有插件使用的 API 版本）会被删除。
+
+    :param processed_list: 去除自定义字段后的插件数据列表
+    :param targets: ManifestTarget 列表
+    :param previous_digests: 上次生成时清单路径到内容摘要的字典
+    :return: BuildResult 实例
+    """
+    previous_digests = previous_digests or {}
+    # 清单路径到 (目标, 插件条目列表)，未拆分的目标即使没有插件也生成
+    outputs = {target.path: (target, []) for target in targets if not target.split}
+    for plugin in processed_list:
+        entries = {}
+        for target in targets:
+            if target.channel not in entries:
+                variant = channel_variant(plugin, target.channel)
+                entries[target.channel] = _Entry(variant) if variant is not None else None
+            entry = entries[target.channel]
+            if entry is None:
+                continue
+            path = target.output_path(entry.plugin)
+            if path is not None:
+                outputs.setdefault(path, (target, []))[1].append(entry)
+
+    result = BuildResult()
+    for path, (target, entries) in outputs.items():
+        digest = hashlib.sha256(target.config_key().encode("utf-8"))
+        for entry in entries:
+            digest.update(entry.digest().encode("ascii"))
+        digest = digest.hexdigest()
+        result.digests[path] = digest
+        result.counts[path] = len(entries)
+        files = [path, f"{path}.gz"] if target.gzip else [path]
+        result.files[path] = files
+        if previous_digests.get(path) == digest and all(os.path.exists(file) for file in files):
+            result.unchanged.append(path)
+            continue
+        data = _render(entries, target.minify).encode("utf-8")
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            _write_atomic(path, data)
+            result.written.append(path)
+            if target.gzip:
+                # 固定 mtime，相同内容总是得到相同的压缩文件
+                _write_atomic(f"{path}.gz", gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0))
+                result.written.append(f"{path}.gz")
+        except OSError as e:
+            print(f"写入 {path} 时出错: {e}")
+            result.errors.append(path)
+            del result.digests[path]
+
+    split_targets = [target for target in targets if target.split]
+    for path in previous_digests:
+        if path in outputs:
+            continue
+        target = next((target for target in split_targets if target.matches(path)), None)
+        if target is None:
+            # 不再配置的目标生成的文件不自动删除
+            continue
+        for file in (path, f"{path}.gz"):
+            try:
+                os.remove(file)
+            except FileNotFoundError:
+                continue
+            except OSError as e:
+                print(f"删除 {file} 时出错: {e}")
+                result.errors.append(file)
+                # 保留摘要，下次生成时再次尝试删除
+                result.digests[path] = previous_digests[path]
+                continue
+            result.removed.append(file)
+    return result
@@ -0,0 +1,184 @@
+"""
+此模块实现了仓库清单的增量解析：清单是插件对象组成的 JSON 数组，
+下载过程中每收到一段数据就找出其中已经完整的数组元素并逐个解析，不必等待整个响应，
+也不必同时保存完整的文本和对象树。每个插件在解析后立即计算 Hash 并去重，
+格式错误或缺少名称的插件只跳过该条，不影响同一仓库中的其他插件。
+"""
+import codecs
+import hashlib
+import json
+import re
+
+
+# 数组内需要关注的结构字符，字符串内只需关注引号和转义符
+_STRUCTURE = re.compile(r'[\[\]{}",]')
+_STRING_SPECIAL = re.compile(r'["\\]')
+
+
+def plugin_hash(url, name):
+    """
+    计算插件的 Hash，同一仓库中同名的插件视为同一个插件。
+
+    :param url: 仓库 URL
+    :param name: 插件名称
+    :return: 十六进制 MD5 摘要
+    """
+    return hashlib.md5((url + name).encode("utf-8")).hexdigest()
+
+
+class ArrayScanner:
+    """
+    顶层 JSON 数组的元素切分器，只跟踪括号深度和字符串边界，不解析元素内容。
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._pos = 0  # 下一次扫描的起点
+        self._element_start = 0  # 当前元素在缓冲区中的起点
+        self._depth = 0  # 当前位置在顶层数组内的嵌套深度
+        self._in_string = False
+        self._started = False
+        self.done = False
+
+    def feed(self, text):
+        """
+        追加一段文本，返回其中已完整的元素文本。
+
+        :param text: 解码后的文本片段
+        :return: 元素文本列表
+        :raises ValueError: 文档不是 JSON 数组
+        """
+        if self.done:
+            return []
+        buffer = self._buffer + text
+        pos = self._pos
+        if not self._started:
+            stripped = buffer.lstrip()
+            if not stripped:
+                self._buffer = ""
+                return []
+            if stripped[0] != "[":
+                raise ValueError("仓库清单不是 JSON 数组")
+            buffer = stripped
+            pos = self._element_start = 1
+            self._started = True
+
+        elements = []
+        depth, in_string, element_start = self._depth, self._in_string, self._element_start
+        while True:
+            if in_string:
+                match = _STRING_SPECIAL.search(buffer, pos)
+                if match is None:
+                    pos = len(buffer)
+                    break
+                if match.group() == "\\":
+                    if match.end() >= len(buffer):
+                        # 转义符后的字符还没有到达
+                        pos = match.start()
+                        break
+                    pos = match.end() + 1
+                    continue
+                in_string = False
+                pos = match.end()
+                continue
+            match = _STRUCTURE.search(buffer, pos)
+            if match is None:
+                pos = len(buffer)
+                break
+            char = match.group()
+            pos = match.end()
+            if char == '"':
+                in_string = True
+            elif char in "[{":
+                depth += 1
+            elif char in "]}":
+                if depth == 0:
+                    # 顶层数组结束，之后的内容忽略
+                    elements.append(buffer[element_start:match.start()])
+                    self.done = True
+                    break
+                depth -= 1
+            elif depth == 0:
+                elements.append(buffer[element_start:match.start()])
+                element_start = pos
+
+        # 只保留尚未完整的元素
+        self._buffer = buffer[element_start:]
+        self._pos = pos - element_start
+        self._element_start = 0
+        self._depth, self._in_string = depth, in_string
+        return [element for element in elements if element.strip()]
+
+
+class ManifestStream:
+    """
+    单个仓库清单的增量解析器。依次调用 feed 传入解压后的字节，最后调用 close 获取插件列表。
+    """
+
+    def __init__(self, url):
+        """
+        :param url: 仓库 URL，用于计算插件 Hash 和错误信息
+        """
+        self.url = url
+        self.plugins = []
+        self.skipped = 0  # 跳过的格式错误或缺少名称的插件数量
+        self._hashes = set()
+        self._decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        self._scanner = ArrayScanner()
+
+    def feed(self, data):
+        """
+        :param data: 解压后的字节片段
+        :raises ValueError: 文档不是 JSON 数组或不是有效的 UTF-8
+        """
+        self._feed_text(self._decoder.decode(data))
+
+    def _feed_text(self, text):
+        for element in self._scanner.feed(text):
+            self._add(element)
+
+    def _add(self, element):
+        """
+        解析一个数组元素，计算 Hash 并去重。
+
+        :param element: 元素文本
+        """
+        try:
+            plugin = json.loads(element)
+        except json.JSONDecodeError as e:
+            self.skipped += 1
+            print(f"跳过 {self.url} 中格式错误的插件: {e}")
+            return
+        if not isinstance(plugin, dict) or not isinstance(plugin.get("Name"), str):
+            self.skipped += 1
+            print(f"跳过 {self.url} 中缺少名称的插件")
+            return
+        key = plugin_hash(self.url, plugin["Name"])
+        if key in self._hashes:
+            return
+        self._hashes.add(key)
+        plugin["Hash"] = key
+        self.plugins.append(plugin)
+
+    def close(self):
+        """
+        :return: 插件列表，每个插件带有 Hash 字段
+        :raises ValueError: 响应在数组结束前中断
+        """
+        self._feed_text(self._decoder.decode(b"", final=True))
+        if not self._scanner.done:
+            raise ValueError(f"{self.url} 的仓库清单不完整")
+        return self.plugins
+
+
+def parse_manifest(url, data):
+    """
+    一次性解析完整的仓库清单，规则与增量解析相同。
+
+    :param url: 仓库 URL
+    :param data: 解压后的完整字节
+    :return: 插件列表，每个插件带有 Hash 字段
+    """
+    stream = ManifestStream(url)
+    stream.feed(data)
+    return stream.close()
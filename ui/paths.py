@@ -0,0 +1,29 @@
+"""
+此模块集中定义程序使用的文件和目录路径，不依赖 Qt，界面和命令行共用。
+打包后以可执行文件所在目录为基准，否则以项目根目录为基准；
+设置了环境变量 PLUGIN_REPO_BASE_DIR 时以该目录为基准，用于基准测试等需要隔离数据的场合。
+"""
+import os
+import sys
+
+
+if os.environ.get("PLUGIN_REPO_BASE_DIR"):
+    BASE_DIR = os.path.abspath(os.environ["PLUGIN_REPO_BASE_DIR"])
+elif getattr(sys, 'frozen', False):
+    BASE_DIR = os.path.dirname(sys.executable)
+else:
+    BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SETTING_PATH = os.path.join(BASE_DIR, "settings.json")
+MYREPO_PATH = os.path.join(BASE_DIR, "MyRepo.json")
+REPO_INDEX_PATH = os.path.join(BASE_DIR, "RepoIndex.txt")
+REPO_CACHE_DIR = os.path.join(BASE_DIR, "repo_cache")
+LEGACY_CACHE_PATH = os.path.join(BASE_DIR, "cache_plugin.json")  # 旧版本的整体缓存，升级后导入为分段
+PLUGIN_MASTER_PATH = os.path.join(BASE_DIR, "PluginMaster.json")
+CATALOG_DB_PATH = os.path.join(BASE_DIR, "catalog.db")
+ICON_PATH = os.path.join(BASE_DIR, "img", "icon.png")
+SPINNER_PATH = os.path.join(BASE_DIR, "img", "spin.gif")
+LIKE_PATH = os.path.join(BASE_DIR, "img", "like.png")
+NOTLIKE_PATH = os.path.join(BASE_DIR, "img", "notlike.png")
+CACHE_DIR = os.path.join(BASE_DIR, "icon_cache")  # 旧版本的图标缓存，只读
+ICON_STORE_DIR = os.path.join(BASE_DIR, "icon_store")
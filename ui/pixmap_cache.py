@@ -0,0 +1,94 @@
+"""
+此模块实现了进程内共享的图标缓存：按图标 URL 的哈希值保存已经缩放好的 QPixmap，
+按占用字节数限制总大小，超出时淘汰最久未使用的图标。
+默认图标和收藏图标等固定图片也只加载一次，全局共享。
+"""
+from collections import OrderedDict
+
+from PyQt5 import QtCore, QtGui
+
+
+DEFAULT_PIXMAP_CACHE_MB = 32
+
+_shared_pixmaps = {}
+
+
+def shared_pixmap(path, size):
+    """
+    获取按指定大小缩放后的固定图片，同一路径和大小只加载一次。
+
+    :param path: 图片路径
+    :param size: 缩放后的边长
+    :return: QPixmap 实例
+    """
+    key = (path, size)
+    pixmap = _shared_pixmaps.get(key)
+    if pixmap is None:
+        pixmap = QtGui.QPixmap(path).scaled(size, size, QtCore.Qt.KeepAspectRatio, QtCore.Qt.SmoothTransformation)
+        _shared_pixmaps[key] = pixmap
+    return pixmap
+
+
+def pixmap_bytes(pixmap):
+    """
+    估算 QPixmap 占用的字节数。
+
+    :param pixmap: QPixmap 实例
+    :return: 字节数
+    """
+    return pixmap.width() * pixmap.height() * max(pixmap.depth(), 8) // 8
+
+
+class PixmapCache:
+    """
+    按字节预算限制大小的 LRU 图标缓存，只能在界面线程中使用。
+    """
+
+    def __init__(self, max_bytes=DEFAULT_PIXMAP_CACHE_MB * 1024 * 1024):
+        """
+        :param max_bytes: 缓存占用的字节上限
+        """
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._pixmaps = OrderedDict()
+
+    def __contains__(self, key):
+        return key in self._pixmaps
+
+    def __len__(self):
+        return len(self._pixmaps)
+
+    def get(self, key):
+        """
+        获取缓存的图标，并标记为最近使用。
+
+        :param key: 图标 URL 的哈希值
+        :return: QPixmap 实例，未缓存时返回 None
+        """
+        pixmap = self._pixmaps.get(key)
+        if pixmap is not None:
+            self._pixmaps.move_to_end(key)
+        return pixmap
+
+    def put(self, key, pixmap):
+        """
+        缓存图标，超出字节预算时淘汰最久未使用的图标。
+
+        :param key: 图标 URL 的哈希值
+        :param pixmap: 已缩放好的 QPixmap
+        """
+        old = self._pixmaps.pop(key, None)
+        if old is not None:
+            self.total_bytes -= pixmap_bytes(old)
+        self._pixmaps[key] = pixmap
+        self.total_bytes += pixmap_bytes(pixmap)
+        while self.total_bytes > self.max_bytes and len(self._pixmaps) > 1:
+            _, evicted = self._pixmaps.popitem(last=False)
+            self.total_bytes -= pixmap_bytes(evicted)
+
+    def clear(self):
+        """
+        清空缓存。
+        """
+        self._pixmaps.clear()
+        self.total_bytes = 0
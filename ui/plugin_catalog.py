@@ -0,0 +1,203 @@
+"""
+此模块实现了插件目录：按 RepoIndex 顺序保存插件，并按 Hash、InternalName、来源 URL 和收藏状态建立索引。
+目录由 PluginListUpdater 生成，可以像插件列表一样按行号访问和遍历；
+view() 返回只读快照，供界面和 Git 线程共享，不必复制插件列表。
+"""
+from types import MappingProxyType
+
+
+class PluginCatalogView:
+    """
+    插件目录的只读快照。插件顺序和各索引与生成快照时一致，收藏状态是快照时的状态。
+    """
+    __slots__ = ("_plugins", "_by_hash", "_rows", "_by_internal_name", "_by_url", "_favorites", "_loader")
+
+    def __init__(self, plugins, by_hash, rows, by_internal_name, by_url, favorites, loader=None):
+        self._plugins = plugins
+        self._by_hash = by_hash
+        self._rows = rows
+        self._by_internal_name = by_internal_name
+        self._by_url = by_url
+        self._favorites = favorites
+        self._loader = loader
+
+    def __len__(self):
+        return len(self._plugins)
+
+    def __iter__(self):
+        return iter(self._plugins)
+
+    def __getitem__(self, index):
+        return self._plugins[index]
+
+    def __contains__(self, plugin_hash):
+        return plugin_hash in self._by_hash
+
+    @property
+    def loader(self):
+        """
+        按 Hash 读取完整插件数据的函数，目录包含完整数据时为 None。
+        """
+        return self._loader
+
+    def get(self, plugin_hash, default=None):
+        """
+        按 Hash 获取插件。
+
+        :param plugin_hash: 插件的哈希值
+        :param default: 插件不存在时的返回值
+        :return: 插件数据
+        """
+        return self._by_hash.get(plugin_hash, default)
+
+    def details(self, plugin_hash):
+        """
+        按 Hash 获取插件的完整数据。目录只包含列表显示需要的字段时，通过加载函数读取。
+
+        :param plugin_hash: 插件的哈希值
+        :return: 插件数据，插件不存在时返回 None
+        """
+        plugin = self._by_hash.get(plugin_hash)
+        if plugin is None or self._loader is None:
+            return plugin
+        data = self._loader(plugin_hash)
+        if data is None:
+            return plugin
+        data["is_favorite"] = plugin_hash in self._favorites
+        return data
+
+    def row(self, plugin_hash):
+        """
+        获取插件所在的行号。
+
+        :param plugin_hash: 插件的哈希值
+        :return: 行号，插件不存在时返回 None
+        """
+        return self._rows.get(plugin_hash)
+
+    def rows(self, plugin_hashes):
+        """
+        获取一组插件所在的行号。
+
+        :param plugin_hashes: Hash 集合
+        :return: 行号集合，忽略不在目录中的插件
+        """
+        rows = self._rows
+        return {rows[plugin_hash] for plugin_hash in plugin_hashes if plugin_hash in rows}
+
+    def hashes(self):
+        """
+        :return: 全部插件 Hash 的集合视图，可以直接与集合求差
+        """
+        return self._rows.keys()
+
+    def by_internal_name(self, internal_name):
+        """
+        获取指定 InternalName 的插件，不同仓库可能提供同名插件。
+
+        :param internal_name: 插件的 InternalName
+        :return: 插件元组，按目录顺序排列
+        """
+        return tuple(self._by_hash[plugin_hash] for plugin_hash in self._by_internal_name.get(internal_name, ()))
+
+    def by_url(self, url):
+        """
+        获取来自指定仓库 URL 的插件。
+
+        :param url: 仓库 URL
+        :return: 插件元组，按目录顺序排列
+        """
+        return tuple(self._by_hash[plugin_hash] for plugin_hash in self._by_url.get(url, ()))
+
+    def is_favorite(self, plugin_hash):
+        """
+        :param plugin_hash: 插件的哈希值
+        :return: 插件是否被收藏
+        """
+        return plugin_hash in self._favorites
+
+    def favorite_hashes(self):
+        """
+        :return: 收藏插件的 Hash 集合
+        """
+        return frozenset(self._favorites)
+
+    def favorites(self):
+        """
+        :return: 收藏的插件列表，按目录顺序排列
+        """
+        return [self._by_hash[plugin_hash] for plugin_hash in sorted(self._favorites, key=self._rows.__getitem__)]
+
+
+class PluginCatalog(PluginCatalogView):
+    """
+    插件目录。插件集合和顺序在创建后不再变化，刷新时生成新的目录；
+    只有收藏状态可以通过 set_favorite 修改，修改后 version 递增。
+    修改收藏状态时复制该插件的数据并替换插件元组和 Hash 索引，不修改已有的插件数据，
+    之前获取的快照和插件数据保持不变。
+    """
+    __slots__ = ("version", "_view")
+
+    def __init__(self, plugin_list=(), loader=None):
+        """
+        :param plugin_list: 插件列表，每个插件须带有 Hash 字段，重复的 Hash 只保留第一个
+        :param loader: 按 Hash 读取完整插件数据的函数，插件列表只包含部分字段时使用
+        """
+        plugins = []
+        by_hash = {}
+        by_internal_name = {}
+        by_url = {}
+        favorites = set()
+        for plugin in plugin_list:
+            plugin_hash = plugin["Hash"]
+            if plugin_hash in by_hash:
+                continue
+            by_hash[plugin_hash] = plugin
+            plugins.append(plugin)
+            by_internal_name.setdefault(plugin.get("InternalName"), []).append(plugin_hash)
+            by_url.setdefault(plugin.get("URL"), []).append(plugin_hash)
+            if plugin.get("is_favorite", False):
+                favorites.add(plugin_hash)
+        rows = {plugin["Hash"]: row for row, plugin in enumerate(plugins)}
+        super().__init__(tuple(plugins), MappingProxyType(by_hash), MappingProxyType(rows),
+                         MappingProxyType(by_internal_name), MappingProxyType(by_url), favorites, loader)
+        self.version = 0
+        self._view = None
+
+    def set_favorite(self, plugin_hash, is_favorite):
+        """
+        设置插件的收藏状态，插件数据替换为 is_favorite 字段已更新的副本。
+
+        :param plugin_hash: 插件的哈希值
+        :param is_favorite: 新的收藏状态
+        :return: 是否找到该插件
+        """
+        plugin = self._by_hash.get(plugin_hash)
+        if plugin is None:
+            return False
+        if plugin.get("is_favorite", False) != is_favorite:
+            plugin = dict(plugin, is_favorite=is_favorite)
+            plugins = list(self._plugins)
+            plugins[self._rows[plugin_hash]] = plugin
+            self._plugins = tuple(plugins)
+            by_hash = dict(self._by_hash)
+            by_hash[plugin_hash] = plugin
+            self._by_hash = MappingProxyType(by_hash)
+        if is_favorite:
+            self._favorites.add(plugin_hash)
+        else:
+            self._favorites.discard(plugin_hash)
+        self.version += 1
+        self._view = None
+        return True
+
+    def view(self):
+        """
+        获取只读快照。插件顺序和索引与目录共享，只复制收藏集合，收藏状态未变化时复用同一个快照。
+
+        :return: PluginCatalogView 实例
+        """
+        if self._view is None:
+            self._view = PluginCatalogView(self._plugins, self._by_hash, self._rows, self._by_internal_name,
+                                           self._by_url, frozenset(self._favorites), self._loader)
+        return self._view
@@ -0,0 +1,20 @@
+"""
+此模块负责比较新旧两份插件列表，按插件 Hash 找出新增、删除和内容变化的插件。
+"""
+
+
+def diff_plugin_lists(old_plugin_list, new_plugin_list):
+    """
+    按 Hash 比较新旧插件列表。
+
+    :param old_plugin_list: 旧的插件列表
+    :param new_plugin_list: 新的插件列表
+    :return: (新增 Hash 集合, 删除 Hash 集合, 内容变化 Hash 集合)
+    """
+    old_map = {plugin["Hash"]: plugin for plugin in old_plugin_list}
+    new_map = {plugin["Hash"]: plugin for plugin in new_plugin_list}
+    added = new_map.keys() - old_map.keys()
+    removed = old_map.keys() - new_map.keys()
+    changed = {plugin_hash for plugin_hash in new_map.keys() & old_map.keys()
+               if new_map[plugin_hash] != old_map[plugin_hash]}
+    return added, removed, changed
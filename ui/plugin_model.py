@@ -0,0 +1,305 @@
+"""
+此模块实现了插件列表的模型和委托：模型直接以插件列表为数据源，
+委托负责绘制图标、名称、简介和收藏图标，只有可见的行才会被绘制。
+"""
+from PyQt5 import QtWidgets, QtCore, QtGui
+from ui.Ui_item import like_path, notlike_path
+from ui.pixmap_cache import shared_pixmap
+
+
+HashRole = QtCore.Qt.UserRole + 1
+PluginRole = QtCore.Qt.UserRole + 2
+FavoriteRole = QtCore.Qt.UserRole + 3
+ExpandedRole = QtCore.Qt.UserRole + 4
+
+ICON_SIZE = 64
+HEART_SIZE = 32
+ROW_HEIGHT = 92
+ROW_MARGIN = 5
+
+
+class PluginListModel(QtCore.QAbstractListModel):
+    """
+    插件列表模型，每一行对应插件列表中的一个插件，按 Hash 记录行号、图标键和展开状态。
+    图标本身保存在共享的 PixmapCache 中；已被淘汰的图标绘制时先显示默认图标，
+    绘制结束后再移除其图标键并发送 icon_evicted 信号以便重新加载，data() 本身不修改模型。
+    """
+    icon_evicted = QtCore.pyqtSignal(str)  # 参数为插件 Hash
+
+    def __init__(self, default_pixmap, pixmap_cache, parent=None):
+        """
+        :param default_pixmap: 图标未加载时显示的默认图标
+        :param pixmap_cache: 共享的 PixmapCache 实例
+        :param parent: 父对象
+        """
+        super().__init__(parent)
+        self.plugin_list = []
+        self.default_pixmap = default_pixmap
+        self.pixmap_cache = pixmap_cache
+        self.icon_keys = {}  # 已加载图标的插件 Hash 到图标键
+        self.expanded = set()
+        self._rows = {}
+        self._evicted = set()  # 绘制时发现图标已被淘汰、尚未处理的插件 Hash
+        self._evicted_timer = QtCore.QTimer(self)
+        self._evicted_timer.setSingleShot(True)
+        self._evicted_timer.setInterval(0)
+        self._evicted_timer.timeout.connect(self._flush_evicted)
+
+    def _reindex(self):
+        self._rows = {plugin["Hash"]: row for row, plugin in enumerate(self.plugin_list)}
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.plugin_list)
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        plugin = self.plugin_list[index.row()]
+        if role == QtCore.Qt.DisplayRole:
+            return plugin.get("Name", "未知插件")
+        if role == QtCore.Qt.ToolTipRole:
+            return plugin.get("Description", "暂无插件信息")
+        if role == QtCore.Qt.DecorationRole:
+            icon_key = self.icon_keys.get(plugin["Hash"])
+            if icon_key is None:
+                return self.default_pixmap
+            pixmap = self.pixmap_cache.get(icon_key)
+            if pixmap is None:
+                # 绘制过程中不修改模型，回到事件循环后统一处理
+                self._evicted.add(plugin["Hash"])
+                if not self._evicted_timer.isActive():
+                    self._evicted_timer.start()
+                return self.default_pixmap
+            return pixmap
+        if role == HashRole:
+            return plugin["Hash"]
+        if role == PluginRole:
+            return plugin
+        if role == FavoriteRole:
+            return plugin.get("is_favorite", False)
+        if role == ExpandedRole:
+            return plugin["Hash"] in self.expanded
+        return None
+
+    def _flush_evicted(self):
+        """
+        移除图标已被淘汰的插件的图标键，并为每个插件发送一次 icon_evicted。
+        """
+        evicted, self._evicted = self._evicted, set()
+        for plugin_hash in evicted:
+            icon_key = self.icon_keys.get(plugin_hash)
+            # 期间图标可能已重新加载或插件已被移除
+            if icon_key is None or self.pixmap_cache.get(icon_key) is not None:
+                continue
+            del self.icon_keys[plugin_hash]
+            self.icon_evicted.emit(plugin_hash)
+
+    def set_plugin_list(self, plugin_list):
+        """
+        整体替换插件列表。
+
+        :param plugin_list: 新的插件列表
+        """
+        self.beginResetModel()
+        self.plugin_list = plugin_list
+        self.icon_keys.clear()
+        self.expanded.clear()
+        self._reindex()
+        self.endResetModel()
+
+    def apply_plugin_diff(self, new_plugin_list, removed, changed, icon_changed=None):
+        """
+        按 Hash 将新插件列表合并到模型中，只对删除、移动、新增和变化的行发出通知。
+
+        :param new_plugin_list: 新的插件列表
+        :param removed: 被删除的插件 Hash 集合
+        :param changed: 内容变化的插件 Hash 集合
+        :param icon_changed: 需要重新加载图标的插件 Hash 集合，默认与 changed 相同
+        """
+        # 逐行增删时在副本上进行，不修改调用方持有的旧列表
+        self.plugin_list = list(self.plugin_list)
+        for row in sorted((self._rows[plugin_hash] for plugin_hash in removed), reverse=True):
+            self.beginRemoveRows(QtCore.QModelIndex(), row, row)
+            plugin_hash = self.plugin_list.pop(row)["Hash"]
+            self.icon_keys.pop(plugin_hash, None)
+            self.expanded.discard(plugin_hash)
+            self.endRemoveRows()
+
+        kept = [plugin["Hash"] for plugin in self.plugin_list]
+        new_hashes = [plugin["Hash"] for plugin in new_plugin_list]
+        kept_set = set(kept)
+        target = [plugin_hash for plugin_hash in new_hashes if plugin_hash in kept_set]
+        if target != kept:
+            # 保留插件的相对顺序发生变化时一次性调整布局，视图中的展开行和隐藏状态随行移动
+            self._move_rows(target)
+
+        # 逐段插入新增的插件，保留的插件替换为新列表中的数据
+        row = 0
+        while row < len(new_plugin_list):
+            if row < len(self.plugin_list) and self.plugin_list[row]["Hash"] == new_hashes[row]:
+                self.plugin_list[row] = new_plugin_list[row]
+                row += 1
+                continue
+            end = row
+            while end < len(new_plugin_list) and new_hashes[end] not in kept_set:
+                end += 1
+            self.beginInsertRows(QtCore.QModelIndex(), row, end - 1)
+            self.plugin_list[row:row] = new_plugin_list[row:end]
+            self.endInsertRows()
+            row = end
+        self.plugin_list = new_plugin_list
+        self._reindex()
+
+        # 连续的变化行合并为一次通知
+        rows = sorted(self._rows[plugin_hash] for plugin_hash in changed)
+        for plugin_hash in (changed if icon_changed is None else icon_changed):
+            self.icon_keys.pop(plugin_hash, None)
+        start = 0
+        for i in range(1, len(rows) + 1):
+            if i == len(rows) or rows[i] != rows[i - 1] + 1:
+                self.dataChanged.emit(self.index(rows[start]), self.index(rows[i - 1]))
+                start = i
+
+    def _move_rows(self, target):
+        """
+        把当前各行重排为目标顺序，当前行与目标包含相同的插件。
+        只发送一次布局变化，并把视图持有的持久索引改为新的行号。
+
+        :param target: 目标顺序的 Hash 列表
+        """
+        self.layoutAboutToBeChanged.emit()
+        old_hashes = [plugin["Hash"] for plugin in self.plugin_list]
+        by_hash = {plugin["Hash"]: plugin for plugin in self.plugin_list}
+        self.plugin_list = [by_hash[plugin_hash] for plugin_hash in target]
+        new_rows = {plugin_hash: row for row, plugin_hash in enumerate(target)}
+        old_indexes = self.persistentIndexList()
+        self.changePersistentIndexList(
+            old_indexes, [self.index(new_rows[old_hashes[index.row()]]) for index in old_indexes])
+        self.layoutChanged.emit()
+
+    def index_of(self, plugin_hash):
+        """
+        根据 Hash 获取插件所在行的索引。
+
+        :param plugin_hash: 插件的哈希值
+        :return: QModelIndex，插件不存在时为无效索引
+        """
+        row = self._rows.get(plugin_hash)
+        return self.index(row) if row is not None else QtCore.QModelIndex()
+
+    def set_icon(self, plugin_hash, icon_key):
+        """
+        设置插件的图标键并通知视图重绘该行，图标需已放入 PixmapCache。
+
+        :param plugin_hash: 插件的哈希值
+        :param icon_key: 图标键，即图标 URL 的哈希值
+        """
+        index = self.index_of(plugin_hash)
+        if not index.isValid():
+            return
+        self.icon_keys[plugin_hash] = icon_key
+        self.dataChanged.emit(index, index, [QtCore.Qt.DecorationRole])
+
+    def set_expanded(self, plugin_hash, expanded):
+        """
+        设置插件行的展开状态。
+
+        :param plugin_hash: 插件的哈希值
+        :param expanded: 是否展开
+        """
+        if expanded:
+            self.expanded.add(plugin_hash)
+        else:
+            self.expanded.discard(plugin_hash)
+        index = self.index_of(plugin_hash)
+        if index.isValid():
+            self.dataChanged.emit(index, index, [ExpandedRole])
+
+    def refresh_favorite(self, plugin_hash):
+        """
+        插件收藏状态变化后通知视图重绘该行。
+
+        :param plugin_hash: 插件的哈希值
+        """
+        index = self.index_of(plugin_hash)
+        if index.isValid():
+            self.dataChanged.emit(index, index, [FavoriteRole])
+
+
+class PluginItemDelegate(QtWidgets.QStyledItemDelegate):
+    """
+    插件行委托，按原列表项的样式绘制图标、名称、简介和收藏图标，
+    点击收藏图标时发送 favorite_clicked 信号，点击行的其他位置时发送 item_clicked 信号。
+    """
+    favorite_clicked = QtCore.pyqtSignal(QtCore.QModelIndex)
+    item_clicked = QtCore.pyqtSignal(QtCore.QModelIndex)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.like_pixmap = shared_pixmap(like_path, HEART_SIZE)
+        self.notlike_pixmap = shared_pixmap(notlike_path, HEART_SIZE)
+        self.name_font = QtGui.QFont()
+        self.name_font.setBold(True)
+        self.name_font.setPixelSize(14)
+
+    def _item_rect(self, option):
+        return option.rect.adjusted(ROW_MARGIN, ROW_MARGIN, -ROW_MARGIN, -ROW_MARGIN)
+
+    def _heart_rect(self, option):
+        rect = self._item_rect(option)
+        return QtCore.QRect(rect.right() - HEART_SIZE - 10, rect.top() + (ROW_HEIGHT - 2 * ROW_MARGIN - HEART_SIZE) // 2,
+                            HEART_SIZE, HEART_SIZE)
+
+    def paint(self, painter, option, index):
+        rect = self._item_rect(option)
+        painter.save()
+        hovered = option.state & QtWidgets.QStyle.State_MouseOver
+        painter.fillRect(rect, QtGui.QColor("white" if hovered else "#f0f0f0"))
+
+        pixmap = index.data(QtCore.Qt.DecorationRole)
+        icon_rect = QtCore.QRect(rect.left() + 10, rect.top() + (rect.height() - ICON_SIZE) // 2, ICON_SIZE, ICON_SIZE)
+        if pixmap is not None and not pixmap.isNull():
+            if pixmap.width() > ICON_SIZE or pixmap.height() > ICON_SIZE:
+                pixmap = pixmap.scaled(ICON_SIZE, ICON_SIZE, QtCore.Qt.KeepAspectRatio)
+            x = icon_rect.left() + (ICON_SIZE - pixmap.width()) // 2
+            y = icon_rect.top() + (ICON_SIZE - pixmap.height()) // 2
+            painter.drawPixmap(x, y, pixmap)
+
+        heart_rect = self._heart_rect(option)
+        text_left = icon_rect.right() + 12
+        text_width = heart_rect.left() - 12 - text_left
+        painter.setPen(option.palette.color(QtGui.QPalette.Text))
+
+        painter.setFont(self.name_font)
+        name_rect = QtCore.QRect(text_left, rect.top() + 12, text_width, 22)
+        name = QtGui.QFontMetrics(self.name_font).elidedText(
+            index.data(QtCore.Qt.DisplayRole), QtCore.Qt.ElideRight, text_width)
+        painter.drawText(name_rect, QtCore.Qt.AlignLeft | QtCore.Qt.AlignVCenter, name)
+
+        painter.setFont(option.font)
+        info_rect = QtCore.QRect(text_left, name_rect.bottom() + 6, text_width, 20)
+        info = option.fontMetrics.elidedText(
+            index.data(QtCore.Qt.ToolTipRole) or "", QtCore.Qt.ElideRight, text_width)
+        painter.drawText(info_rect, QtCore.Qt.AlignLeft | QtCore.Qt.AlignVCenter, info)
+
+        painter.drawPixmap(heart_rect, self.like_pixmap if index.data(FavoriteRole) else self.notlike_pixmap)
+        painter.restore()
+
+    def sizeHint(self, option, index):
+        view = self.parent()
+        if index.data(ExpandedRole) and view is not None:
+            widget = view.indexWidget(index)
+            if widget is not None:
+                return QtCore.QSize(option.rect.width(), widget.sizeHint().height())
+        return QtCore.QSize(option.rect.width(), ROW_HEIGHT)
+
+    def editorEvent(self, event, model, option, index):
+        if event.type() == QtCore.QEvent.MouseButtonRelease and event.button() == QtCore.Qt.LeftButton:
+            if self._heart_rect(option).contains(event.pos()):
+                self.favorite_clicked.emit(index)
+            else:
+                self.item_clicked.emit(index)
+            return True
+        return super().editorEvent(event, model, option, index)
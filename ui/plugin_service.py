@@ -0,0 +1,348 @@
+"""
+此模块实现了插件列表的加载和 PluginMaster.json 内容的生成，不依赖 Qt，界面线程和命令行共用。
+加载时按仓库分段读取缓存，只拉取过期的仓库；生成时从收藏的插件中去除自定义字段，发布见 ui.publisher。
+"""
+import sqlite3
+
+from ui.catalog_db import list_fields, open_catalog_db
+from ui.paths import (CATALOG_DB_PATH, LEGACY_CACHE_PATH, MYREPO_PATH, REPO_CACHE_DIR, REPO_INDEX_PATH,
+                      SETTING_PATH)
+from ui.plugin_catalog import PluginCatalog
+from ui.repo_cache import RepoCache, DEFAULT_TTL_HOURS
+from ui.repo_fetcher import RepoFetcher, DEFAULT_MAX_WORKERS, DEFAULT_DEADLINE
+from ui.settings_store import open_store
+from ui.tracing import tracer
+
+
+# 生成 PluginMaster.json 时去除的自定义字段
+CUSTOM_FIELDS = ("URL", "Hash", "is_favorite")
+
+
+def get_catalog_db(settings_fp=SETTING_PATH):
+    """
+    settings.json 中 catalog_backend 为 "sqlite" 时返回共享的 SQLite 插件目录，否则返回 None。
+
+    :param settings_fp: 设置文件路径
+    :return: CatalogDB 实例或 None
+    """
+    if open_store(settings_fp).get("catalog_backend", "json") != "sqlite":
+        return None
+    return open_catalog_db(CATALOG_DB_PATH)
+
+
+class PluginListService:
+    """
+    插件列表加载类，带有按仓库分段的缓存机制：优先读取未过期的分段，只拉取过期的仓库，
+    强制更新时拉取全部仓库，离线时只读取缓存，并更新插件的收藏状态。
+    加载完成后 urls、stale_urls、failed_urls 和 missing_urls 记录各仓库的状态。
+    """
+
+    def __init__(self, settings_fp=SETTING_PATH, force_update=False, stale_while_revalidate=False,
+                 progressive=False, offline=False, repo_index_fp=REPO_INDEX_PATH, my_plugin_fp=MYREPO_PATH,
+                 cache_dir=REPO_CACHE_DIR, legacy_cache_fp=LEGACY_CACHE_PATH):
+        """
+        :param settings_fp: 设置文件路径
+        :param force_update: 是否忽略缓存强制拉取全部仓库
+        :param stale_while_revalidate: 缓存过期时是否先通过 on_stale 提供过期缓存，再刷新
+        :param progressive: 是否在每个仓库完成时调用 on_repo
+        :param offline: 是否只使用缓存（包括过期的分段），不访问网络
+        :param repo_index_fp: RepoIndex.txt 文件路径
+        :param my_plugin_fp: MyRepo.json 文件路径
+        :param cache_dir: 仓库缓存目录
+        :param legacy_cache_fp: 旧版本的整体缓存文件，存在时先导入为分段
+        """
+        self.settings_fp = settings_fp
+        self.force_update = force_update
+        self.stale_while_revalidate = stale_while_revalidate
+        self.progressive = progressive
+        self.offline = offline
+        self.repo_index_fp = repo_index_fp
+        self.my_plugin_fp = my_plugin_fp
+        self.cache_dir = cache_dir
+        self.legacy_cache_fp = legacy_cache_fp
+        self.error = None  # 无法加载时的原因
+        self.urls = []  # RepoIndex 中的仓库
+        self.stale_urls = []  # 缓存过期或缺失的仓库
+        self.failed_urls = []  # 本次拉取失败的仓库，可能已回退到缓存
+        self.missing_urls = []  # 没有任何可用数据的仓库
+
+    def _read_repo_index(self, repo_index_fp):
+        """
+        读取仓库索引文件，跳过以 "##" 开头的注释行。
+
+        :param repo_index_fp: 存储仓库索引的文件路径
+        :return: 仓库 URL 列表
+        """
+        try:
+            with open(repo_index_fp, "r") as f:
+                repo_index = f.readlines()
+        except FileNotFoundError:
+            print(f"文件 {repo_index_fp} 未找到。")
+            return []
+        return [i.strip() for i in repo_index if i.strip() and not i.strip().startswith("##")]
+
+    def _get_cache_plugin_list(self, cache, urls, include_stale=False):
+        """
+        从分段缓存中读取仓库数据，并找出需要重新拉取的仓库。
+
+        :param cache: RepoCache 实例
+        :param urls: 仓库 URL 列表
+        :param include_stale: 是否同时读取已过期的分段
+        :return: (URL 到插件数据的字典, 过期或缺失的 URL 列表)
+        """
+        repo_data = {}
+        stale_urls = []
+        with tracer.span("cache.load", repos=len(urls)):
+            for url in urls:
+                fresh = cache.is_fresh(url)
+                if not fresh:
+                    stale_urls.append(url)
+                if fresh or include_stale:
+                    data = cache.load_data(url)
+                    if data is not None:
+                        repo_data[url] = data
+                    elif fresh:
+                        stale_urls.append(url)
+        return repo_data, stale_urls
+
+    def _fetch_new_plugin_list(self, cache, urls, proxies, max_workers=DEFAULT_MAX_WORKERS,
+                               deadline=DEFAULT_DEADLINE, on_repo=None):
+        """
+        并发请求指定的仓库 URL，成功的仓库由 RepoFetcher 重写其缓存分段，
+        失败的仓库回退到该仓库上次成功的分段。
+
+        :param cache: RepoCache 实例
+        :param urls: 需要拉取的仓库 URL 列表
+        :param proxies: 代理配置，字典类型
+        :param max_workers: 同时进行的请求数量上限
+        :param deadline: 整次刷新的期限（秒）
+        :param on_repo: 每个仓库完成时调用的函数，参数为 (URL, 插件数据, 耗时)，按完成先后调用
+        :return: URL 到插件数据的字典
+        """
+        repo_data = {}
+
+        def resolve(result):
+            if result.ok:
+                data = result.data
+            else:
+                self.failed_urls.append(result.url)
+                data = cache.load_data(result.url)
+                if data is not None:
+                    print(f"{result.url} 拉取失败，使用上次成功的缓存")
+            if data is not None:
+                repo_data[result.url] = data
+            if on_repo is not None:
+                on_repo(result.url, data or [], result.elapsed)
+
+        resolved = set()
+
+        def on_result(result):
+            resolved.add(result.url)
+            resolve(result)
+
+        fetcher = RepoFetcher(proxies=proxies, max_workers=max_workers, deadline=deadline, cache=cache)
+        try:
+            with tracer.span("repo.fetch_all", repos=len(urls)):
+                results = fetcher.fetch_all(urls, on_result=on_result)
+        finally:
+            fetcher.close()
+
+        # 超过刷新期限被放弃的仓库
+        for result in results:
+            if result.url not in resolved:
+                resolve(result)
+        return repo_data
+
+    def _merge_plugin_list(self, urls, repo_data):
+        """
+        按 RepoIndex 中的顺序合并各仓库的数据，生成插件列表，与请求完成的先后无关。
+
+        :param urls: 仓库 URL 列表
+        :param repo_data: URL 到插件数据的字典
+        :return: 插件列表
+        """
+        plugin_list = []
+        hash_set = set()
+        with tracer.span("catalog.dedup", repos=len(urls)) as span:
+            for url in urls:
+                for j in repo_data.get(url) or []:
+                    # Hash 在解析清单时已经计算，仓库内的重复插件也已去除
+                    if j["Hash"] in hash_set:
+                        continue
+                    hash_set.add(j["Hash"])
+                    # 解析结果可能来自缓存并被多次复用，复制后再写入自定义字段
+                    j = dict(j)
+                    j["URL"] = url
+                    j["is_favorite"] = False
+                    plugin_list.append(j)
+            span.set(plugins=len(plugin_list))
+        return plugin_list
+
+    def _repo_batch(self, url, data, my_plugin_fp, catalog_db):
+        """
+        生成渐进模式下单个仓库的插件列表，字段与最终目录中的插件一致。
+
+        :param url: 仓库 URL
+        :param data: 该仓库的插件数据
+        :param my_plugin_fp: MyRepo.json 文件的路径
+        :param catalog_db: CatalogDB 实例或 None
+        :return: 插件列表
+        """
+        plugin_list = self.update_favorite_status(self._merge_plugin_list([url], {url: data}), my_plugin_fp)
+        if catalog_db is not None:
+            plugin_list = [list_fields(plugin) for plugin in plugin_list]
+        return plugin_list
+
+    def _fetched_at(self, cache, urls):
+        """
+        :param cache: RepoCache 实例
+        :param urls: 仓库 URL 列表
+        :return: URL 到缓存分段拉取时间的字典
+        """
+        return {url: cache.load_meta(url).get("fetched_at") for url in urls}
+
+    def update_favorite_status(self, plugin_list, my_plugin_fp=MYREPO_PATH):
+        """
+        读取 MyRepo.json 文件，如果文件不存在则创建，更新 plugin_list 里的 "is_favorite" 字段。
+
+        :param plugin_list: 插件列表
+        :param my_plugin_fp: MyRepo.json 文件的路径，默认为 "MyRepo.json"
+        :return: 更新后的插件列表
+        """
+        with tracer.span("catalog.favorites", plugins=len(plugin_list)):
+            favorites = open_store(my_plugin_fp)
+            if not favorites.exists:
+                favorites.update({str(plugin["Hash"]): False for plugin in plugin_list})
+            favorite_dict = favorites.snapshot()
+
+            for plugin in plugin_list:
+                plugin_hash = str(plugin["Hash"])
+                if plugin_hash in favorite_dict:
+                    plugin["is_favorite"] = favorite_dict[plugin_hash]
+        return plugin_list
+
+    def load(self, on_stale=None, on_repo_index=None, on_repo=None):
+        """
+        从设置文件中读取配置，缓存过期或强制更新时从互联网拉取更新。
+
+        :param on_stale: 后台刷新前先调用的函数，参数为过期缓存目录
+        :param on_repo_index: 渐进模式下开始拉取前调用的函数，参数为仓库 URL 列表
+        :param on_repo: 渐进模式下每个仓库完成时调用的函数，参数为 (URL, 插件列表, 耗时)
+        :return: PluginCatalog 实例，未找到设置文件时为空目录
+        """
+        tracer.begin_refresh("offline" if self.offline else "force" if self.force_update else "refresh")
+        settings = open_store(self.settings_fp)
+        if not settings.exists:
+            print(f"未找到设置文件 {self.settings_fp}")
+            self.error = "settings"
+            return PluginCatalog()
+        proxies = settings.get("proxy", {})
+        repo_index_fp = self.repo_index_fp
+        my_plugin_fp = self.my_plugin_fp
+        cache_ttl_hours = settings.get("cache_ttl_hours", DEFAULT_TTL_HOURS)
+        fetch_workers = settings.get("fetch_workers", DEFAULT_MAX_WORKERS)
+        fetch_deadline = settings.get("fetch_deadline", DEFAULT_DEADLINE)
+
+        urls = self._read_repo_index(repo_index_fp)
+        self.urls = urls
+        cache = RepoCache(self.cache_dir, ttl_hours=cache_ttl_hours)
+        # 从旧版本升级后第一次启动时，旧的整体缓存作为过期分段先行显示
+        cache.import_legacy(self.legacy_cache_fp)
+
+        catalog_db = get_catalog_db(self.settings_fp)
+        stale_emitted = False
+        if self.force_update:
+            repo_data, stale_urls = {}, urls
+        elif catalog_db is not None and catalog_db.is_current(urls, self._fetched_at(cache, urls)):
+            # 数据库与缓存分段一致，只读取列表字段，不必解析各仓库的缓存；
+            # 收藏状态以 MyRepo.json 为准，文件无法解析时保留数据库中的收藏
+            favorites = open_store(my_plugin_fp)
+            if not favorites.corrupt:
+                try:
+                    catalog_db.sync_favorites(favorites.snapshot())
+                except sqlite3.Error as e:
+                    print(f"同步插件数据库的收藏状态时出错: {e}")
+            catalog = catalog_db.load_catalog()
+            if all(cache.is_fresh(url) for url in urls):
+                return catalog
+            if self.offline:
+                self.stale_urls = [url for url in urls if not cache.is_fresh(url)]
+                return catalog
+            if self.stale_while_revalidate and on_stale is not None:
+                on_stale(catalog)
+                stale_emitted = True
+            repo_data, stale_urls = self._get_cache_plugin_list(cache, urls)
+        else:
+            repo_data, stale_urls = self._get_cache_plugin_list(
+                cache, urls, include_stale=self.stale_while_revalidate or self.offline)
+        self.stale_urls = stale_urls
+        if self.offline:
+            # 离线时只使用缓存，过期的仓库不拉取
+            stale_urls = []
+
+        # 先把过期缓存交给界面显示，再在本线程中刷新
+        if stale_urls and repo_data and not stale_emitted and on_stale is not None:
+            stale_plugin_list = self._merge_plugin_list(urls, repo_data)
+            stale_plugin_list = self.update_favorite_status(stale_plugin_list, my_plugin_fp)
+            if catalog_db is not None:
+                # 与数据库目录的字段保持一致，之后合并时只比较列表字段
+                on_stale(PluginCatalog([list_fields(plugin) for plugin in stale_plugin_list],
+                                       loader=catalog_db.load_plugin))
+            else:
+                on_stale(PluginCatalog(stale_plugin_list))
+            stale_emitted = True
+
+        report_repo = None
+        if self.progressive and stale_urls and on_repo is not None:
+            if on_repo_index is not None:
+                on_repo_index(list(urls))
+            if not stale_emitted:
+                # 界面上还没有任何插件，先发送缓存未过期的仓库
+                for url in urls:
+                    if url in repo_data and url not in stale_urls:
+                        on_repo(url, self._repo_batch(url, repo_data[url], my_plugin_fp, catalog_db), 0.0)
+
+            def report_repo(url, data, elapsed):
+                on_repo(url, self._repo_batch(url, data, my_plugin_fp, catalog_db), elapsed)
+
+        # 只拉取缓存过期或缺失的仓库
+        if stale_urls:
+            repo_data.update(self._fetch_new_plugin_list(cache, stale_urls, proxies, fetch_workers, fetch_deadline,
+                                                         report_repo))
+        self.missing_urls = [url for url in urls if url not in repo_data]
+
+        plugin_list = self._merge_plugin_list(urls, repo_data)
+        plugin_list = self.update_favorite_status(plugin_list, my_plugin_fp)
+        if catalog_db is not None and not self.offline:
+            try:
+                catalog_db.save_catalog(urls, plugin_list, self._fetched_at(cache, urls),
+                                        open_store(my_plugin_fp).snapshot())
+                return catalog_db.load_catalog()
+            except sqlite3.Error as e:
+                print(f"写入插件数据库时出错: {e}")
+        return PluginCatalog(plugin_list)
+
+
+def build_plugin_master(catalog, favorite_dict):
+    """
+    从收藏的插件生成 PluginMaster.json 的内容，去除自定义字段。
+
+    :param catalog: 插件目录或其只读快照
+    :param favorite_dict: Hash 到收藏状态的字典
+    :return: (插件数据列表, 插件名称列表)
+    """
+    processed_list = []
+    names = []
+    for plugin_hash, is_favorite in favorite_dict.items():
+        if not is_favorite:
+            continue
+        item = catalog.details(plugin_hash)
+        if item is None:
+            continue
+        names.append(item["Name"])
+        data = item.copy()
+        for field in CUSTOM_FIELDS:
+            data.pop(field, None)
+        processed_list.append(data)
+    return processed_list, names
+
@@ -0,0 +1,198 @@
+"""
+此模块实现了可选的采样分析器：后台线程按固定间隔通过 sys._current_frames() 读取所有线程的调用栈，
+按 "线程;函数;函数..." 的折叠格式（folded stacks）计数，可以直接交给 flamegraph.pl、speedscope 或 inferno 生成火焰图。
+同时作为界面线程的卡顿检测器：界面线程通过 beat() 定时报告心跳，心跳超过阈值未更新时视为事件循环被阻塞，
+卡顿期间每次采样界面线程的调用栈都计入卡顿文件，并记录每次卡顿的开始时刻、持续时间和首次检测到时的调用栈。
+不修改被分析的代码，打包后的程序也可以使用；不依赖 Qt，心跳由调用方的定时器驱动。
+
+启用方式：程序参数 --profile 或环境变量 PLUGIN_REPO_PROFILE=1，结果写入程序目录：
+    profile-<时间>.folded  所有线程的采样
+    stalls-<时间>.folded   界面线程心跳超过阈值后的采样，按毫秒计数
+    stalls-<时间>.txt      每次卡顿的时刻（距启动的秒数）、持续时间和调用栈
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+
+PROFILE_ENV = "PLUGIN_REPO_PROFILE"
+PROFILE_FLAG = "--profile"
+DEFAULT_INTERVAL_MS = 10  # 采样间隔（毫秒）
+DEFAULT_STALL_THRESHOLD_MS = 200  # 心跳超过该时间未更新时视为界面卡顿（毫秒）
+MAX_STACK_DEPTH = 128
+
+
+def profiling_requested(argv=None):
+    """
+    :param argv: 程序参数，默认为 sys.argv
+    :return: 是否通过 --profile 参数或 PLUGIN_REPO_PROFILE 环境变量请求了采样分析
+    """
+    argv = sys.argv if argv is None else argv
+    return PROFILE_FLAG in argv or os.environ.get(PROFILE_ENV, "") not in ("", "0")
+
+
+class SamplingProfiler:
+    """
+    采样分析器和界面卡顿检测器。start() 启动采样线程，stop() 停止并写入结果文件。
+    """
+
+    def __init__(self, output_dir, interval_ms=DEFAULT_INTERVAL_MS, stall_threshold_ms=DEFAULT_STALL_THRESHOLD_MS,
+                 main_thread=None):
+        """
+        :param output_dir: 结果文件的目录
+        :param interval_ms: 采样间隔（毫秒）
+        :param stall_threshold_ms: 界面卡顿的阈值（毫秒）
+        :param main_thread: 需要检测卡顿的线程，默认为主线程
+        """
+        self.output_dir = output_dir
+        self.interval = max(1, interval_ms) / 1000
+        self.stall_threshold = max(1, stall_threshold_ms) / 1000
+        self.main_ident = (main_thread or threading.main_thread()).ident
+        self.samples = Counter()  # 折叠的调用栈到采样次数
+        self.stall_samples = Counter()  # 卡顿期间界面线程的折叠调用栈到毫秒数
+        self.stalls = []  # 每次卡顿的 (开始时刻, 持续时间（秒）, 首次检测到时的调用栈)
+        self.sample_count = 0
+        self.started_at = None
+        self._t0 = None  # 启动采样的时刻（time.perf_counter()）
+        self._last_beat = None  # 界面线程最近一次心跳的时刻，第一次心跳之前不检测卡顿
+        self._stall = None  # 正在进行的卡顿的 [开始时刻, 调用栈]
+        self._labels = {}  # 代码对象到显示名称的缓存
+        self._stop = threading.Event()
+        self._thread = None
+
+    def beat(self):
+        """
+        由界面线程的定时器调用，报告事件循环仍在运行。
+        """
+        self._last_beat = time.perf_counter()
+
+    def start(self):
+        """
+        启动采样线程。
+        """
+        self.started_at = time.strftime("%Y%m%d-%H%M%S")
+        self._t0 = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="SamplingProfiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """
+        停止采样线程并写入结果文件。
+
+        :return: 写入的文件路径列表
+        """
+        if self._thread is None:
+            return []
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        self._end_stall(time.perf_counter())
+        return self.write()
+
+    def _label(self, code):
+        label = self._labels.get(code)
+        if label is None:
+            # 折叠格式以分号分隔栈帧，计数在最后一个空格之后
+            label = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(";", ":")
+            self._labels[code] = label
+        return label
+
+    def _fold(self, thread_name, frame):
+        """
+        :return: 从最外层到最内层的折叠调用栈，以线程名开头
+        """
+        labels = []
+        while frame is not None and len(labels) < MAX_STACK_DEPTH:
+            labels.append(self._label(frame.f_code))
+            frame = frame.f_back
+        labels.append(thread_name.replace(";", ":"))
+        return ";".join(reversed(labels))
+
+    def _run(self):
+        own_ident = threading.get_ident()
+        next_sample = time.perf_counter()
+        while not self._stop.is_set():
+            now = time.perf_counter()
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            frames = sys._current_frames()
+            main_stack = None
+            for ident, frame in frames.items():
+                if ident == own_ident:
+                    continue
+                stack = self._fold(names.get(ident, f"Thread-{ident}"), frame)
+                self.samples[stack] += 1
+                if ident == self.main_ident:
+                    main_stack = stack
+            del frames
+            self.sample_count += 1
+            self._check_stall(now, main_stack)
+
+            next_sample += self.interval
+            delay = next_sample - time.perf_counter()
+            if delay <= 0:
+                # 采样落后时不补采，从当前时刻重新计时
+                next_sample = time.perf_counter()
+                delay = 0
+            self._stop.wait(delay)
+
+    def _check_stall(self, now, main_stack):
+        """
+        心跳超过阈值未更新时记录卡顿，卡顿期间的采样按采样间隔计入卡顿的调用栈。
+        """
+        last_beat = self._last_beat
+        if last_beat is None:
+            return
+        if now - last_beat > self.stall_threshold:
+            if self._stall is None:
+                self._stall = [last_beat, main_stack]
+            if main_stack is not None:
+                self.stall_samples[main_stack] += round(self.interval * 1000)
+        elif self._stall is not None:
+            self._end_stall(last_beat)
+
+    def _end_stall(self, end):
+        """
+        结束正在进行的卡顿并记录其持续时间。
+
+        :param end: 卡顿结束的时刻，即恢复后的第一次心跳
+        """
+        if self._stall is None:
+            return
+        start, stack = self._stall
+        self._stall = None
+        duration = end - start
+        self.stalls.append((start, duration, stack))
+        print(f"界面卡顿 {duration * 1000:.0f} 毫秒: {(stack or '').rsplit(';', 1)[-1]}")
+
+    def write(self):
+        """
+        写入采样、卡顿采样和卡顿记录文件。
+
+        :return: 写入的文件路径列表
+        """
+        files = []
+        prefix = self.started_at or time.strftime("%Y%m%d-%H%M%S")
+        outputs = [(f"profile-{prefix}.folded", self.samples), (f"stalls-{prefix}.folded", self.stall_samples)]
+        try:
+            os.makedirs(self.output_dir, exist_ok=True)
+            for name, counter in outputs:
+                path = os.path.join(self.output_dir, name)
+                with open(path, "w", encoding="utf-8") as f:
+                    for stack, count in counter.most_common():
+                        f.write(f"{stack} {count}\n")
+                files.append(path)
+            path = os.path.join(self.output_dir, f"stalls-{prefix}.txt")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(f"# 采样间隔 {self.interval * 1000:.0f} 毫秒，卡顿阈值 {self.stall_threshold * 1000:.0f} 毫秒，"
+                        f"共 {self.sample_count} 次采样，{len(self.stalls)} 次卡顿\n")
+                for start, duration, stack in self.stalls:
+                    f.write(f"\n{start - (self._t0 or start):.3f} s: {duration * 1000:.0f} ms\n")
+                    for label in (stack or "").split(";"):
+                        f.write(f"    {label}\n")
+            files.append(path)
+        except OSError as e:
+            print(f"写入采样结果时出错: {e}")
+        return files
@@ -0,0 +1,272 @@
+"""
+此模块实现了清单的按需发布：生成的清单按规范形式计算摘要，
+与已发布的内容相同时不写文件、不提交、不推送；有变化时由 ui.manifest_builder 生成各个清单目标，
+只暂存和提交这些清单文件，git 命令在子进程中运行，捕获输出并带有超时，同时给出每个插件变化的字段。
+统计字段（DownloadCount）不计入摘要，距上次发布超过 publish_interval_hours 时强制重新生成全部清单，使其保持更新。
+推送到远程仓库须在 settings.json 中设置 git_push 为 true，默认只在本地提交。
+不依赖 Qt，界面的 Git 线程和命令行共用。
+"""
+import hashlib
+import json
+import os
+import subprocess
+import time
+
+from ui.manifest_builder import VOLATILE_FIELDS, build_manifests, load_targets, stable_fields
+from ui.paths import PLUGIN_MASTER_PATH, SETTING_PATH
+from ui.settings_store import open_store
+
+
+GIT_TIMEOUT = 30  # git add / commit 的超时时间（秒）
+GIT_PUSH_TIMEOUT = 120  # git push 的超时时间（秒）
+COMMIT_MESSAGE = "update Repo"
+DEFAULT_PUBLISH_INTERVAL_HOURS = 24
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def _plugin_key(plugin):
+    return plugin.get("InternalName") or plugin.get("Name")
+
+
+def canonical_digest(processed_list):
+    """
+    计算清单的规范摘要：键排序、紧凑分隔符，与缩进和键的顺序无关，不计入统计字段。
+
+    :param processed_list: 插件数据列表
+    :return: 十六进制 SHA-256 摘要
+    """
+    text = json.dumps([stable_fields(plugin) for plugin in processed_list], sort_keys=True,
+                      separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def read_manifest(path=PLUGIN_MASTER_PATH):
+    """
+    读取已发布的清单。
+
+    :param path: PluginMaster.json 文件路径
+    :return: 插件数据列表，文件不存在或格式错误时返回空列表
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return []
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"读取 {path} 时出错: {e}")
+        return []
+    return data if isinstance(data, list) else []
+
+
+def diff_manifest(old_list, new_list):
+    """
+    按 InternalName 比较两份清单，得到新增、删除的插件和每个插件变化的字段，不比较统计字段。
+
+    :param old_list: 已发布的插件数据列表
+    :param new_list: 新生成的插件数据列表
+    :return: (新增的插件名称列表, 删除的插件名称列表, 插件名称到变化字段列表的字典)
+    """
+    old = {_plugin_key(plugin): plugin for plugin in old_list}
+    new = {_plugin_key(plugin): plugin for plugin in new_list}
+    added = [new[key]["Name"] for key in new if key not in old]
+    removed = [old[key].get("Name", key) for key in old if key not in new]
+    changed = {}
+    for key, plugin in new.items():
+        previous = old.get(key)
+        if previous is None:
+            continue
+        fields = sorted(field for field in set(plugin) | set(previous)
+                        if field not in VOLATILE_FIELDS and plugin.get(field) != previous.get(field))
+        if fields:
+            changed[plugin["Name"]] = fields
+    return added, removed, changed
+
+
+class PublishResult:
+    """
+    一次发布的结果。
+    """
+
+    def __init__(self, digest, added=(), removed=(), changed=None):
+        """
+        :param digest: 新清单的规范摘要
+        :param added: 新增的插件名称
+        :param removed: 删除的插件名称
+        :param changed: 插件名称到变化字段列表的字典
+        """
+        self.digest = digest
+        self.added = list(added)
+        self.removed = list(removed)
+        self.changed = dict(changed or {})
+        self.written = False  # 是否写入了清单文件
+        self.files = []  # 写入的清单文件路径
+        self.committed = False
+        self.pushed = False
+        self.skipped = False  # 内容与已发布的相同，没有执行任何操作
+        self.forced = False  # 是否因距上次发布时间过长而强制重新生成
+        self.error = None
+        self.output = []  # git 命令的输出
+
+    @property
+    def update_count(self):
+        """
+        :return: 新增、删除或内容变化的插件数量
+        """
+        return len(self.added) + len(self.removed) + len(self.changed)
+
+    def update_list(self):
+        """
+        :return: 每个变化插件一行的说明
+        """
+        lines = [f"+ {name}" for name in self.added]
+        lines += [f"- {name}" for name in self.removed]
+        lines += [f"* {name}: {', '.join(fields)}" for name, fields in self.changed.items()]
+        return lines
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    def to_dict(self):
+        """
+        :return: 可以序列化为 JSON 的字典
+        """
+        return {
+            "digest": self.digest,
+            "skipped": self.skipped,
+            "forced": self.forced,
+            "written": self.written,
+            "files": self.files,
+            "committed": self.committed,
+            "pushed": self.pushed,
+            "added": self.added,
+            "removed": self.removed,
+            "changed": self.changed,
+            "error": self.error,
+        }
+
+
+def run_git(args, cwd, timeout=GIT_TIMEOUT):
+    """
+    在子进程中运行 git 命令，捕获输出。
+
+    :param args: git 之后的参数列表
+    :param cwd: 工作目录
+    :param timeout: 超时时间（秒）
+    :return: (是否成功, 标准输出和标准错误合并后的文本)
+    """
+    try:
+        completed = subprocess.run(["git", *args], cwd=cwd, capture_output=True, text=True,
+                                   encoding="utf-8", errors="replace", timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return False, f"git {' '.join(args)} 超过 {timeout} 秒未完成"
+    except OSError as e:
+        return False, f"无法运行 git: {e}"
+    return completed.returncode == 0, (completed.stdout + completed.stderr).strip()
+
+
+def publish_due(settings):
+    """
+    判断距上次发布是否已超过 publish_interval_hours，此时即使只有统计字段变化也重新生成清单。
+
+    :param settings: settings.json 的 JsonStore
+    :return: 是否需要强制发布，间隔设置为 0 时总是 False
+    """
+    interval = settings.get("publish_interval_hours", DEFAULT_PUBLISH_INTERVAL_HOURS)
+    if not interval:
+        return False
+    try:
+        last = time.mktime(time.strptime(settings.get("git_plugin_time") or "", TIME_FORMAT))
+    except ValueError:
+        return True
+    return time.time() - last >= interval * 3600
+
+
+def publish(processed_list, path=PLUGIN_MASTER_PATH, push=True, settings_fp=SETTING_PATH, force=False):
+    """
+    按需发布清单。生成 settings.json 中 manifest_targets 配置的全部清单，内容未变化的清单不写入；
+    已发布过相同内容时也不提交。距上次发布超过 publish_interval_hours 时强制重新生成，更新统计字段。
+    提交后只有 git_push 设置为 true 时才推送。生成后在 settings.json 中记录各清单的摘要 manifest_digests，
+    发布成功（提交，启用推送时为推送）后记录 git_plugin_time 和 git_plugin_digest。
+
+    :param processed_list: 插件数据列表
+    :param path: PluginMaster.json 文件路径，未配置 manifest_targets 时的唯一目标，其所在目录是各目标路径的基准
+    :param push: 是否提交（以及按设置推送），为 False 时只写入文件
+    :param settings_fp: 设置文件路径
+    :param force: 是否忽略上次的摘要，重新生成全部清单
+    :return: PublishResult 实例
+    """
+    settings = open_store(settings_fp)
+    # 只写入文件时不记录发布时间，不按间隔强制生成
+    force = force or (push and publish_due(settings))
+    cwd = os.path.dirname(os.path.abspath(path))
+    try:
+        targets = load_targets(settings_fp, cwd)
+    except (TypeError, KeyError, ValueError) as e:
+        result = PublishResult(canonical_digest(processed_list))
+        result.error = f"manifest_targets 配置错误: {e}"
+        return result
+    if not settings.get("manifest_targets"):
+        targets[0].path = os.path.abspath(path)
+
+    # 与第一个不拆分的目标比较插件的变化
+    primary = next((target.path for target in targets if not target.split), None)
+    old_list = read_manifest(primary) if primary else []
+    digest = hashlib.sha256("|".join([canonical_digest(processed_list)]
+                                     + [target.config_key() + "|" + os.path.relpath(target.path, cwd)
+                                        for target in targets]).encode("utf-8")).hexdigest()
+    result = PublishResult(digest, *diff_manifest(old_list, processed_list))
+    result.forced = force
+
+    # 摘要按相对路径记录，程序目录移动后仍然有效
+    previous_digests = {os.path.join(cwd, name): value
+                        for name, value in (settings.get("manifest_digests") or {}).items()}
+    if force:
+        # 摘要不计入统计字段，强制时全部重新写入；保留路径以便删除过期的拆分文件
+        previous_digests = dict.fromkeys(previous_digests)
+    build = build_manifests(processed_list, targets, previous_digests)
+    if build.errors:
+        result.error = f"写入 {', '.join(build.errors)} 失败"
+        return result
+    settings.set("manifest_digests", {os.path.relpath(file, cwd): value for file, value in build.digests.items()})
+    result.files = build.written + build.removed
+    result.written = bool(result.files)
+    if not result.files and not force and (not push or settings.get("git_plugin_digest") == digest):
+        result.skipped = True
+        return result
+    if not push:
+        return result
+
+    # 只暂存和提交清单文件，不扫描工作区中的其他文件
+    names = [os.path.relpath(file, cwd) for files in build.files.values() for file in files]
+    if build.removed:
+        # 删除的文件只有曾经提交过的才需要暂存
+        removed = [os.path.relpath(file, cwd) for file in build.removed]
+        ok, output = run_git(["ls-files", "--", *removed], cwd)
+        if not ok:
+            result.error = output
+            return result
+        names += [name for name in removed if name.replace(os.sep, "/") in output.splitlines()]
+    # 没有任何清单文件时不能运行 git status/add，否则会作用于整个工作区
+    ok, output = run_git(["status", "--porcelain", "--", *names], cwd) if names else (True, "")
+    result.output.append(output)
+    if not ok:
+        result.error = output
+        return result
+    if output:
+        for args in (["add", "-A", "--", *names], ["commit", "-m", COMMIT_MESSAGE, "--", *names]):
+            ok, output = run_git(args, cwd)
+            result.output.append(output)
+            if not ok:
+                result.error = output
+                return result
+        result.committed = True
+    if settings.get("git_push", False):
+        ok, output = run_git(["push"], cwd, timeout=GIT_PUSH_TIMEOUT)
+        result.output.append(output)
+        if not ok:
+            result.error = output
+            return result
+        result.pushed = True
+    settings.update({"git_plugin_time": time.strftime(TIME_FORMAT), "git_plugin_digest": digest})
+    return result
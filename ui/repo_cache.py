@@ -0,0 +1,308 @@
+"""
+此模块实现了按仓库 URL 分段的插件缓存。每个分段保存 HTTP 校验信息（ETag / Last-Modified）、
+拉取时间、有效期和上次成功拉取的压缩原始响应，刷新时只重写发生变化的分段。
+两个文件都先写临时文件再替换，先写原始响应、最后写元数据，写到一半崩溃时不会留下不完整的文件。
+"""
+import gzip
+import hashlib
+import json
+import os
+import threading
+import zlib
+from datetime import datetime, timedelta
+
+from ui.manifest_stream import parse_manifest
+from ui.tracing import tracer
+
+try:
+    import brotli
+except ImportError:  # brotli 为可选依赖，未安装时只协商 gzip
+    brotli = None
+
+
+ACCEPT_ENCODING = "gzip, br" if brotli else "gzip"
+DEFAULT_TTL_HOURS = 24
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+EXPIRED_TIME = "1970-01-01 00:00:00"  # 导入的旧缓存的拉取时间，视为已过期
+# 旧版本缓存中由程序添加的字段，导入时去除，重新解析时再计算
+LEGACY_FIELDS = ("URL", "Hash", "is_favorite")
+LEGACY_SUFFIX = ".migrated"
+
+
+def decode_body(body, encoding):
+    """
+    按 Content-Encoding 解压响应原始字节。
+
+    :param body: 压缩后的原始字节
+    :param encoding: Content-Encoding 值，可能为空
+    :return: 解压后的字节
+    """
+    encoding = (encoding or "").strip().lower()
+    if encoding in ("", "identity"):
+        return body
+    decoders = {"gzip": gzip.decompress, "deflate": zlib.decompress}
+    if brotli:
+        decoders["br"] = brotli.decompress
+    if encoding not in decoders:
+        raise ValueError(f"不支持的 Content-Encoding: {encoding}")
+    try:
+        return decoders[encoding](body)
+    except Exception as e:
+        raise ValueError(f"解压 {encoding} 数据时出错: {e}") from e
+
+
+def body_decompressor(encoding):
+    """
+    创建按 Content-Encoding 增量解压的函数，用于边下载边解析。
+
+    :param encoding: Content-Encoding 值，可能为空
+    :return: 接收一段原始字节、返回解压后字节的函数
+    """
+    encoding = (encoding or "").strip().lower()
+    if encoding in ("", "identity"):
+        return lambda chunk: chunk
+    if encoding == "gzip":
+        decompress = zlib.decompressobj(16 + zlib.MAX_WBITS).decompress
+    elif encoding == "deflate":
+        decompress = zlib.decompressobj().decompress
+    elif encoding == "br" and brotli:
+        decompress = brotli.Decompressor().process
+    else:
+        raise ValueError(f"不支持的 Content-Encoding: {encoding}")
+
+    def decode_chunk(chunk):
+        try:
+            return decompress(chunk)
+        except Exception as e:
+            raise ValueError(f"解压 {encoding} 数据时出错: {e}") from e
+    return decode_chunk
+
+
+class RepoCache:
+    """
+    分段缓存类，每个仓库 URL 对应一个分段：一个元数据文件和一个原始响应文件。
+    某个仓库拉取失败时，其分段保持上次成功的内容不变。
+    进程内会记住每个分段解析后的插件数据，直到该分段的原始响应被重写，收到 304 或读取未过期的分段时
+    不再读取磁盘、解压和解码 JSON。解析结果按原始响应文件的文件编号、修改时间和大小校验，其他进程
+    （例如命令行的定时刷新）重写分段后会重新解析。插件目录只浅复制这些数据，字段值与此处共享。
+    """
+    _parsed = {}  # 原始响应文件路径到 (文件标记, 插件数据)
+    _parsed_lock = threading.Lock()
+
+    def __init__(self, cache_dir, ttl_hours=DEFAULT_TTL_HOURS):
+        """
+        :param cache_dir: 缓存目录路径，首次写入时创建
+        :param ttl_hours: 新写入分段的有效期（小时）
+        """
+        self.cache_dir = cache_dir
+        self.ttl_hours = ttl_hours
+
+    def _key(self, url):
+        return hashlib.md5(url.encode("utf-8")).hexdigest()
+
+    def _meta_path(self, url):
+        return os.path.join(self.cache_dir, f"{self._key(url)}.meta.json")
+
+    def _body_path(self, url):
+        return os.path.join(self.cache_dir, f"{self._key(url)}.body")
+
+    def _body_stamp(self, url):
+        """
+        :return: 原始响应文件的 (文件编号, 修改时间, 大小)，文件不存在时返回 None
+        """
+        try:
+            stat = os.stat(self._body_path(url))
+        except OSError:
+            return None
+        # 分段总是替换为新文件，文件编号随之变化
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def load_meta(self, url):
+        """
+        读取 URL 的元数据，包含 etag、last_modified、encoding、fetched_at 和 ttl_hours。
+
+        :param url: 仓库 URL
+        :return: 元数据字典，不存在或损坏时返回空字典
+        """
+        try:
+            with open(self._meta_path(url), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _write_atomic(self, path, content):
+        """
+        先写临时文件再替换，写到一半崩溃时原文件保持不变。
+
+        :param path: 文件路径
+        :param content: 字节内容
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def _write_meta(self, url, meta):
+        self._write_atomic(self._meta_path(url), json.dumps(meta, ensure_ascii=False).encode("utf-8"))
+
+    def is_fresh(self, url):
+        """
+        判断 URL 的分段是否仍在其有效期内。
+
+        :param url: 仓库 URL
+        :return: 分段存在且未过期时返回 True
+        """
+        meta = self.load_meta(url)
+        try:
+            fetched_at = datetime.strptime(meta["fetched_at"], TIME_FORMAT)
+            ttl = timedelta(hours=meta.get("ttl_hours", self.ttl_hours))
+        except (KeyError, TypeError, ValueError):
+            return False
+        return datetime.now() - fetched_at < ttl and os.path.exists(self._body_path(url))
+
+    def validators(self, url):
+        """
+        生成条件请求头，只有原始响应仍在磁盘上时才发送校验信息。
+
+        :param url: 仓库 URL
+        :return: 请求头字典
+        """
+        meta = self.load_meta(url)
+        if not meta or not os.path.exists(self._body_path(url)):
+            return {}
+        headers = {}
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+        return headers
+
+    def save(self, url, meta, body, data):
+        """
+        重写 URL 的分段：保存元数据和压缩后的原始响应，并记住解析结果。
+
+        :param url: 仓库 URL
+        :param meta: 元数据字典，拉取时间和有效期在此补充
+        :param body: 压缩后的原始响应字节
+        :param data: 解析后的插件数据
+        """
+        meta = dict(meta, fetched_at=datetime.now().strftime(TIME_FORMAT), ttl_hours=self.ttl_hours)
+        body_path = self._body_path(url)
+        try:
+            with tracer.span("cache.write", url=url, bytes=len(body)):
+                # 元数据最后写入，原始响应写入失败时仍指向上次的内容
+                self._write_atomic(body_path, body)
+                self._write_meta(url, meta)
+        except OSError as e:
+            print(f"写入仓库缓存 {url} 时出错: {e}")
+            # 磁盘上的分段与新数据不一致，下次从磁盘重新解析
+            with self._parsed_lock:
+                self._parsed.pop(body_path, None)
+            return
+        stamp = self._body_stamp(url)
+        with self._parsed_lock:
+            self._parsed[body_path] = (stamp, data)
+
+    def touch(self, url):
+        """
+        仓库未变化（304）时只刷新分段的拉取时间，原始响应保持不动。
+
+        :param url: 仓库 URL
+        """
+        meta = self.load_meta(url)
+        meta["fetched_at"] = datetime.now().strftime(TIME_FORMAT)
+        meta["ttl_hours"] = self.ttl_hours
+        try:
+            self._write_meta(url, meta)
+        except OSError as e:
+            print(f"写入仓库缓存 {url} 时出错: {e}")
+
+    def import_legacy(self, legacy_fp):
+        """
+        把旧版本的整体缓存（cache_plugin.json）按插件的 URL 字段拆分为各仓库的分段，升级后第一次启动时执行一次，
+        使界面在第一次完整拉取之前就有数据可以显示。导入的分段没有校验信息并且已过期，随后会重新完整拉取；
+        已有分段的仓库不覆盖。全部写入后把旧文件重命名为 cache_plugin.json.migrated，不再重复导入。
+
+        :param legacy_fp: 旧缓存文件路径
+        :return: 导入的仓库数量
+        """
+        if not os.path.exists(legacy_fp):
+            return 0
+        try:
+            with open(legacy_fp, "r", encoding="utf-8") as f:
+                plugin_list = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"读取旧版本缓存 {legacy_fp} 时出错: {e}")
+            return 0
+        groups = {}
+        for plugin in plugin_list if isinstance(plugin_list, list) else []:
+            if isinstance(plugin, dict) and plugin.get("URL"):
+                groups.setdefault(plugin["URL"], []).append(
+                    {key: value for key, value in plugin.items() if key not in LEGACY_FIELDS})
+        count = 0
+        with tracer.span("cache.import_legacy", repos=len(groups)):
+            for url, plugins in groups.items():
+                if os.path.exists(self._body_path(url)):
+                    continue
+                body = json.dumps(plugins, ensure_ascii=False).encode("utf-8")
+                meta = {"url": url, "encoding": "", "fetched_at": EXPIRED_TIME, "ttl_hours": 0}
+                try:
+                    self._write_atomic(self._body_path(url), body)
+                    self._write_meta(url, meta)
+                except OSError as e:
+                    # 保留旧文件，下次启动时重试
+                    print(f"导入旧版本缓存 {url} 时出错: {e}")
+                    return count
+                count += 1
+        try:
+            os.replace(legacy_fp, legacy_fp + LEGACY_SUFFIX)
+        except OSError as e:
+            print(f"重命名旧版本缓存 {legacy_fp} 时出错: {e}")
+        return count
+
+    def load_data(self, url):
+        """
+        获取 URL 上次的解析结果，原始响应文件没有被重写时直接返回进程内的数据，否则解压并解析磁盘上的原始响应。
+        返回的插件数据由多次调用共享，调用方不得修改。
+
+        :param url: 仓库 URL
+        :return: 解析后的插件数据，不可用时返回 None
+        """
+        body_path = self._body_path(url)
+        stamp = self._body_stamp(url)
+        if stamp is None:
+            # 没有缓存过的仓库，由调用方决定是否拉取
+            return None
+        with self._parsed_lock:
+            parsed = self._parsed.get(body_path)
+        if parsed is not None and parsed[0] == stamp:
+            return parsed[1]
+        meta = self.load_meta(url)
+        try:
+            with tracer.span("cache.read", url=url):
+                with open(body_path, "rb") as f:
+                    data = parse_manifest(url, decode_body(f.read(), meta.get("encoding")))
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            print(f"读取仓库缓存 {url} 时出错: {e}")
+            return None
+        with self._parsed_lock:
+            self._parsed[body_path] = (stamp, data)
+        return data
+
+    @classmethod
+    def clear_parsed(cls):
+        """
+        释放进程内记住的全部解析结果，之后从磁盘重新解析，用于测试或需要释放内存时。
+        """
+        with cls._parsed_lock:
+            cls._parsed.clear()
@@ -0,0 +1,247 @@
+"""
+此模块实现了仓库清单的并发拉取，供 PluginListUpdater 使用。
+配合 RepoCache 时发送条件请求，仓库未变化（304）时复用上次解析的数据。
+requests 和线程池在第一次发送请求时才导入，缓存未过期时启动不必加载网络库。
+日志输出到标准错误，命令行的 --json 输出不受影响。
+"""
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+from ui.repo_cache import ACCEPT_ENCODING, body_decompressor
+from ui.manifest_stream import ManifestStream
+from ui.tracing import tracer
+
+
+DEFAULT_MAX_WORKERS = 8
+DEFAULT_TIMEOUT = 10
+DEFAULT_DEADLINE = 30
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+class FetchResult:
+    """
+    单个仓库 URL 的拉取结果。
+    """
+
+    def __init__(self, url, data=None, not_modified=False, error=None, elapsed=0.0):
+        """
+        :param url: 仓库 URL
+        :param data: 解析后的插件数据，失败时为 None
+        :param not_modified: 服务器是否返回 304，数据来自缓存
+        :param error: 失败原因
+        :param elapsed: 请求耗时（秒）
+        """
+        self.url = url
+        self.data = data
+        self.not_modified = not_modified
+        self.error = error
+        self.elapsed = elapsed
+
+    @property
+    def ok(self):
+        return self.data is not None
+
+
+class RepoFetcher:
+    """
+    仓库清单并发拉取类，使用有上限的线程池同时请求多个仓库 URL，
+    每个主机复用一个带连接池的 Session，并受整体刷新期限约束。
+    """
+
+    def __init__(self, proxies=None, max_workers=DEFAULT_MAX_WORKERS,
+                 timeout=DEFAULT_TIMEOUT, deadline=DEFAULT_DEADLINE, cache=None):
+        """
+        :param proxies: 代理配置，字典类型，与 settings.json 中的 proxy 字段一致
+        :param max_workers: 同时进行的请求数量上限
+        :param timeout: 单个请求的超时时间（秒）
+        :param deadline: 整次刷新的期限（秒），超过期限仍未完成的仓库将被放弃
+        :param cache: RepoCache 实例，提供时启用条件请求
+        """
+        self.proxies = proxies or {}
+        self.cache = cache
+        self.max_workers = max(1, int(max_workers))
+        self.timeout = timeout
+        self.deadline = deadline
+        self._sessions = {}
+        self._sessions_lock = threading.Lock()
+        self._abandoned = set()  # 超过期限后放弃、但仍在进行中的请求
+        self._close_requested = False
+
+    def _get_session(self, url):
+        """
+        获取 URL 所属主机的 Session，不存在时创建，保持长连接复用。
+
+        :param url: 请求的 URL
+        :return: requests.Session 实例
+        """
+        host = urlsplit(url).netloc
+        with self._sessions_lock:
+            session = self._sessions.get(host)
+            if session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                session.proxies.update(self.proxies)
+                self._sessions[host] = session
+            return session
+
+    def fetch_one(self, url, timeout=None):
+        """
+        请求单个仓库 URL 并解析插件列表，有缓存时先发送条件请求。
+
+        :param url: 仓库 URL
+        :param timeout: 本次请求的超时时间，默认使用 self.timeout
+        :return: FetchResult 实例
+        """
+        timeout = timeout or self.timeout
+        start = time.monotonic()
+        with tracer.span("repo.fetch", url=url) as span:
+            result = self._fetch(url, timeout)
+            span.set(ok=result.ok, not_modified=result.not_modified)
+        result.elapsed = time.monotonic() - start
+        return result
+
+    def _fetch(self, url, timeout):
+        import requests
+        validators = self.cache.validators(url) if self.cache else {}
+        try:
+            if validators:
+                result = self._request(url, validators, timeout)
+                if result is not None:
+                    return result
+            return self._request(url, {}, timeout)
+        except requests.RequestException as e:
+            print(f"请求 {url} 时出错: {e}", file=sys.stderr)
+            return FetchResult(url, error=str(e))
+        except ValueError as e:
+            print(f"解析 {url} 的响应数据时出错: {e}", file=sys.stderr)
+            return FetchResult(url, error=str(e))
+
+    def _request(self, url, validators, timeout):
+        """
+        发送一次请求，保留压缩后的原始字节，边下载边解压并逐个解析插件。
+
+        :param url: 仓库 URL
+        :param validators: 条件请求头
+        :param timeout: 超时时间
+        :return: FetchResult 实例；304 但本地数据不可用时返回 None
+        """
+        headers = {"Accept-Encoding": ACCEPT_ENCODING}
+        headers.update(validators)
+        trace = tracer.enabled
+        if trace:
+            sent = time.perf_counter()
+        with self._get_session(url).get(url, headers=headers, timeout=timeout, stream=True) as response:
+            if trace:
+                # 建立连接（包括 DNS 解析）到收到响应头的时间，requests 不单独提供连接阶段的耗时
+                tracer.add("repo.ttfb", sent, time.perf_counter() - sent, status=response.status_code,
+                           conditional=bool(validators))
+            if response.status_code == 304:
+                data = self.cache.load_data(url)
+                if data is None:
+                    return None
+                self.cache.touch(url)
+                return FetchResult(url, data, not_modified=True)
+            response.raise_for_status()
+            encoding = response.headers.get("Content-Encoding", "")
+            decompress = body_decompressor(encoding)
+            stream = ManifestStream(url)
+            # 边下载边解析，只保留压缩后的原始字节用于缓存
+            chunks = []
+            if trace:
+                started = time.perf_counter()
+                parse_time = 0.0
+                for chunk in response.raw.stream(STREAM_CHUNK_SIZE, decode_content=False):
+                    chunks.append(chunk)
+                    parse_start = time.perf_counter()
+                    stream.feed(decompress(chunk))
+                    parse_time += time.perf_counter() - parse_start
+                download_time = time.perf_counter() - started - parse_time
+                parse_start = time.perf_counter()
+                data = stream.close()
+                parse_time += time.perf_counter() - parse_start
+                # 下载和解析交替进行，按各自的累计耗时依次记录
+                tracer.add("repo.download", started, download_time, bytes=sum(len(chunk) for chunk in chunks))
+                tracer.add("repo.parse", started + download_time, parse_time, plugins=len(data))
+            else:
+                for chunk in response.raw.stream(STREAM_CHUNK_SIZE, decode_content=False):
+                    chunks.append(chunk)
+                    stream.feed(decompress(chunk))
+                data = stream.close()
+            body = b"".join(chunks)
+            if self.cache:
+                meta = {
+                    "url": url,
+                    "etag": response.headers.get("ETag"),
+                    "last_modified": response.headers.get("Last-Modified"),
+                    "encoding": encoding,
+                }
+                self.cache.save(url, meta, body, data)
+            return FetchResult(url, data)
+
+    def fetch_all(self, urls, on_result=None):
+        """
+        并发请求全部仓库 URL，结果按传入顺序返回，与完成先后无关。
+
+        :param urls: 仓库 URL 列表
+        :param on_result: 每个仓库完成时在调用线程中调用的函数，参数为 FetchResult，按完成先后调用
+        :return: 与 urls 一一对应的 FetchResult 列表
+        """
+        if not urls:
+            return []
+        from concurrent.futures import ThreadPoolExecutor, TimeoutError, as_completed
+        start = time.monotonic()
+        executor = ThreadPoolExecutor(max_workers=min(self.max_workers, len(urls)))
+        try:
+            futures = {executor.submit(self.fetch_one, url): url for url in urls}
+            results = {}
+            try:
+                for future in as_completed(futures, timeout=self.deadline):
+                    result = future.result()
+                    results[futures[future]] = result
+                    if on_result is not None:
+                        on_result(result)
+            except TimeoutError:
+                pass
+            for future, url in futures.items():
+                if url not in results:
+                    if not future.cancel():
+                        # 已在进行中的请求无法取消，完成之前不关闭它使用的 Session
+                        with self._sessions_lock:
+                            self._abandoned.add(future)
+                        future.add_done_callback(self._on_abandoned_done)
+                    print(f"请求 {url} 超过刷新期限 {self.deadline} 秒，已放弃", file=sys.stderr)
+                    results[url] = FetchResult(url, error="deadline", elapsed=time.monotonic() - start)
+            print(f"仓库拉取耗时: {time.monotonic() - start:.2f} 秒", file=sys.stderr)
+            return [results[url] for url in urls]
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _on_abandoned_done(self, future):
+        """
+        被放弃的请求结束后调用，已请求关闭且没有其他进行中的请求时关闭 Session。
+        """
+        with self._sessions_lock:
+            self._abandoned.discard(future)
+            if self._close_requested and not self._abandoned:
+                self._close_sessions()
+
+    def close(self):
+        """
+        关闭所有 Session，释放连接池。仍有被放弃的请求在进行时，等它们全部结束后再关闭。
+        """
+        with self._sessions_lock:
+            self._close_requested = True
+            if not self._abandoned:
+                self._close_sessions()
+
+    def _close_sessions(self):
+        # 须在持有 self._sessions_lock 时调用
+        for session in self._sessions.values():
+            session.close()
+        self._sessions.clear()
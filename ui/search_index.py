@@ -0,0 +1,329 @@
+"""
+此模块实现了插件列表的搜索索引，按插件 Hash 记录，可以随插件列表的差异增量更新，不必整体重建。
+名称、内部名称、作者、简介、标签和描述在加入索引时统一规范化（NFKC + casefold），查询时不再逐个转换。
+索引包括：每个词出现在哪些插件中（倒排集合）、全部词的后缀排序表（以二分查找找出包含某个子串的所有词）、
+每个字符出现在哪些插件中（单字符查询直接得到结果），以及名称的三元组（trigram）索引，用于容错的模糊匹配。
+查询的每个词先在后缀表中找出包含它的词，合并这些词的倒排集合，多个词的结果再按集合求交，不逐个插件检查；
+每个词的结果在索引变化之前缓存，连续输入时前面已经输入的词不再重新查找。
+"""
+import bisect
+import heapq
+import sys
+import unicodedata
+
+
+# 各字段在排序中的权重，名称最高
+FIELD_WEIGHTS = (("Name", 8), ("InternalName", 6), ("Author", 4), ("Punchline", 2), ("Tags", 2), ("Description", 1))
+FUZZY_THRESHOLD = 0.5
+TOKEN_CACHE_SIZE = 64
+MAX_CHAR = chr(sys.maxunicode)
+
+
+def normalize(text):
+    """
+    规范化文本：全角转半角、统一大小写并合并空白。
+
+    :param text: 原始文本
+    :return: 规范化后的文本
+    """
+    return " ".join(unicodedata.normalize("NFKC", text).casefold().split())
+
+
+def trigrams(text):
+    """
+    获取文本的三元组集合，首尾补空格以便较短的词也能匹配。
+
+    :param text: 规范化后的文本
+    :return: 三元组集合
+    """
+    text = f" {text} "
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def plugin_fields(plugin):
+    """
+    :param plugin: 插件数据
+    :return: 按 FIELD_WEIGHTS 顺序排列的规范化字段元组
+    """
+    fields = []
+    for field, _ in FIELD_WEIGHTS:
+        value = plugin.get(field) or ""
+        if isinstance(value, list):
+            value = " ".join(str(tag) for tag in value)
+        fields.append(normalize(str(value)))
+    return tuple(fields)
+
+
+class SearchIndex:
+    """
+    插件搜索索引，查询结果为插件 Hash 的集合。可以在加载线程中构建，之后只在界面线程中更新和查询。
+    """
+
+    def __init__(self, plugin_list=()):
+        """
+        :param plugin_list: 插件列表或插件目录
+        """
+        self._plugins = {}  # Hash 到加入索引时的插件数据，用于判断插件是否已经变化
+        self._fields = {}  # Hash 到规范化的字段元组
+        self._words = {}  # 词到包含该词的 Hash 集合
+        self._chars = {}  # 字符到包含该字符的 Hash 集合
+        self._name_trigrams = {}  # 名称三元组到 Hash 集合
+        self._suffixes = []  # 全部词的长度不小于 2 的后缀，已排序
+        self._suffix_words = []  # 与 _suffixes 一一对应的词
+        self._token_cache = {}  # 查询词到匹配的 Hash 集合
+        new_words = []
+        for plugin in plugin_list:
+            new_words.extend(self._add(plugin))
+        # 初次构建时一次性排序，之后逐个插入
+        pairs = sorted((word[i:], word) for word in new_words for i in range(len(word) - 1))
+        self._suffixes = [suffix for suffix, _ in pairs]
+        self._suffix_words = [word for _, word in pairs]
+
+    def __len__(self):
+        return len(self._plugins)
+
+    def __contains__(self, plugin_hash):
+        return plugin_hash in self._plugins
+
+    def _add(self, plugin):
+        """
+        :return: 新出现的词列表，由调用方加入后缀表
+        """
+        plugin_hash = plugin["Hash"]
+        fields = plugin_fields(plugin)
+        self._plugins[plugin_hash] = plugin
+        self._fields[plugin_hash] = fields
+        text = " ".join(fields)
+        words = self._words
+        new_words = []
+        for word in set(text.split()):
+            postings = words.get(word)
+            if postings is None:
+                words[word] = {plugin_hash}
+                new_words.append(word)
+            else:
+                postings.add(plugin_hash)
+        chars = self._chars
+        for char in set(text):
+            chars.setdefault(char, set()).add(plugin_hash)
+        for gram in trigrams(fields[0]):
+            self._name_trigrams.setdefault(gram, set()).add(plugin_hash)
+        return new_words
+
+    def _remove(self, plugin_hash):
+        del self._plugins[plugin_hash]
+        fields = self._fields.pop(plugin_hash)
+        text = " ".join(fields)
+        for word in set(text.split()):
+            postings = self._words[word]
+            postings.discard(plugin_hash)
+            if not postings:
+                del self._words[word]
+                self._remove_suffixes(word)
+        for char in set(text):
+            postings = self._chars[char]
+            postings.discard(plugin_hash)
+            if not postings:
+                del self._chars[char]
+        for gram in trigrams(fields[0]):
+            postings = self._name_trigrams[gram]
+            postings.discard(plugin_hash)
+            if not postings:
+                del self._name_trigrams[gram]
+
+    def _insert_suffixes(self, word):
+        suffixes, suffix_words = self._suffixes, self._suffix_words
+        for i in range(len(word) - 1):
+            suffix = word[i:]
+            position = bisect.bisect_left(suffixes, suffix)
+            suffixes.insert(position, suffix)
+            suffix_words.insert(position, word)
+
+    def _remove_suffixes(self, word):
+        suffixes, suffix_words = self._suffixes, self._suffix_words
+        for i in range(len(word) - 1):
+            suffix = word[i:]
+            position = bisect.bisect_left(suffixes, suffix)
+            # 相同的后缀可能来自不同的词
+            while suffix_words[position] != word:
+                position += 1
+            del suffixes[position]
+            del suffix_words[position]
+
+    def add(self, plugin):
+        """
+        加入或更新一个插件。字段没有变化时只记录新的插件数据。
+
+        :param plugin: 插件数据
+        """
+        plugin_hash = plugin["Hash"]
+        if plugin_hash in self._fields:
+            if self._fields[plugin_hash] == plugin_fields(plugin):
+                self._plugins[plugin_hash] = plugin
+                return
+            self._remove(plugin_hash)
+        for word in self._add(plugin):
+            self._insert_suffixes(word)
+        self._token_cache.clear()
+
+    def remove(self, plugin_hash):
+        """
+        移除一个插件，插件不在索引中时不做任何事。
+
+        :param plugin_hash: 插件的哈希值
+        """
+        if plugin_hash in self._fields:
+            self._remove(plugin_hash)
+            self._token_cache.clear()
+
+    def apply_diff(self, plugin_list, added, removed, changed):
+        """
+        按插件列表的差异更新索引，未变化的插件只记录新的插件数据。
+
+        :param plugin_list: 新的插件列表或插件目录
+        :param added: 新增的 Hash 集合
+        :param removed: 删除的 Hash 集合
+        :param changed: 内容变化的 Hash 集合
+        """
+        for plugin_hash in removed:
+            self.remove(plugin_hash)
+        updated = added | changed
+        for plugin in plugin_list:
+            if plugin["Hash"] in updated:
+                self.add(plugin)
+            else:
+                self._plugins[plugin["Hash"]] = plugin
+
+    def sync(self, plugin_list):
+        """
+        使索引与插件列表一致：加入或更新与索引中不是同一对象的插件，移除不在列表中的插件。
+        索引由同一个目录构建时只需逐个比较对象。
+
+        :param plugin_list: 插件列表或插件目录
+        :return: 加入、更新或移除的插件数量
+        """
+        seen = set()
+        count = 0
+        for plugin in plugin_list:
+            plugin_hash = plugin["Hash"]
+            seen.add(plugin_hash)
+            if self._plugins.get(plugin_hash) is not plugin:
+                self.add(plugin)
+                count += 1
+        for plugin_hash in [plugin_hash for plugin_hash in self._plugins if plugin_hash not in seen]:
+            self.remove(plugin_hash)
+            count += 1
+        return count
+
+    def search(self, query):
+        """
+        查找匹配的插件。查询按空白分成多个词，每个词都须出现在某个字段中；
+        没有任何插件匹配时，按名称的三元组相似度进行模糊匹配。
+
+        :param query: 查询文本
+        :return: 匹配的 Hash 集合，查询为空时返回 None 表示全部匹配
+        """
+        query = normalize(query)
+        if not query:
+            return None
+        results = []
+        for token in set(query.split()):
+            matched = self._match_token(token)
+            if not matched:
+                results = None
+                break
+            results.append(matched)
+        if results:
+            # 从最小的集合开始求交
+            results.sort(key=len)
+            return results[0].intersection(*results[1:])
+        return self._fuzzy_search(query)
+
+    def _match_token(self, token):
+        """
+        查找包含某个词的插件：单个字符直接使用字符索引，否则在后缀表中二分查找以该词开头的后缀，
+        得到包含该词的所有词，合并其倒排集合。
+
+        :param token: 规范化后的词，不含空白
+        :return: Hash 集合，调用方不得修改
+        """
+        matched = self._token_cache.get(token)
+        if matched is not None:
+            return matched
+        if len(token) == 1:
+            matched = self._chars.get(token, set())
+        else:
+            start = bisect.bisect_left(self._suffixes, token)
+            end = bisect.bisect_left(self._suffixes, token + MAX_CHAR, start)
+            words = self._words
+            postings = [words[word] for word in set(self._suffix_words[start:end])]
+            if not postings:
+                matched = set()
+            elif len(postings) == 1:
+                matched = postings[0]
+            else:
+                # 以最大的集合为基础复制再合并，比逐个加入快得多
+                largest = max(postings, key=len)
+                matched = largest.union(*postings)
+        if len(self._token_cache) >= TOKEN_CACHE_SIZE:
+            self._token_cache.clear()
+        self._token_cache[token] = matched
+        return matched
+
+    def _fuzzy_search(self, query):
+        """
+        按名称的三元组相似度模糊匹配，允许拼写错误。
+
+        :param query: 规范化后的查询文本
+        :return: 相似度不低于 FUZZY_THRESHOLD 的 Hash 集合
+        """
+        grams = trigrams(query)
+        if len(grams) < 3:
+            return set()
+        counts = {}
+        for gram in grams:
+            for plugin_hash in self._name_trigrams.get(gram, ()):
+                counts[plugin_hash] = counts.get(plugin_hash, 0) + 1
+        needed = len(grams) * FUZZY_THRESHOLD
+        return {plugin_hash for plugin_hash, count in counts.items() if count >= needed}
+
+    def score(self, plugin_hash, query):
+        """
+        计算插件与查询的相关度：名称以查询开头最高，其次按匹配字段的权重累加，
+        没有直接匹配时按名称的三元组相似度计算。
+
+        :param plugin_hash: 插件的哈希值
+        :param query: 查询文本
+        :return: 相关度，越大越相关
+        """
+        return self._score(plugin_hash, normalize(query))
+
+    def _score(self, plugin_hash, query):
+        fields = self._fields[plugin_hash]
+        score = 0
+        for token in query.split():
+            for (_, weight), value in zip(FIELD_WEIGHTS, fields):
+                if token in value:
+                    score += weight
+                    break
+        if fields[0].startswith(query):
+            score += 10
+        if score == 0:
+            grams = trigrams(query)
+            score = len(grams & trigrams(fields[0])) / max(len(grams), 1)
+        return score
+
+    def rank(self, plugin_hashes, query, limit=1, order=None):
+        """
+        按相关度从高到低取出前 limit 个插件。
+
+        :param plugin_hashes: Hash 集合
+        :param query: 查询文本
+        :param limit: 返回的数量
+        :param order: 相关度相同时的排序键，例如插件的行号，默认按 Hash 排序
+        :return: Hash 列表
+        """
+        query = normalize(query)
+        order = order or (lambda plugin_hash: plugin_hash)
+        return heapq.nsmallest(limit, plugin_hashes,
+                               key=lambda plugin_hash: (-self._score(plugin_hash, query), order(plugin_hash)))
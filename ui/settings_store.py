@@ -0,0 +1,268 @@
+"""
+此模块实现了 settings.json 和 MyRepo.json 的内存存储。
+读取只访问内存；修改先合并在内存中，停顿一段时间后由后台线程写入磁盘。
+写入时重新读取磁盘上的文件，只合并本进程修改过的键，命令行和界面同时运行时不会互相覆盖；
+先写临时文件并同步到磁盘再替换，写到一半崩溃也不会损坏原文件。程序退出时写入尚未保存的修改。
+文件无法解析时先备份，在重新成功读取之前不写入，避免覆盖用户可能手动修复的内容。
+"""
+import atexit
+import json
+import os
+import shutil
+import threading
+import time
+
+
+DEFAULT_FLUSH_DELAY = 0.5  # 最后一次修改后多久写入磁盘（秒）
+_DELETED = object()  # 表示键已被删除的修改
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+class JsonStore:
+    """
+    单个 JSON 对象文件的内存存储，可以在多个线程中同时使用。
+    """
+
+    def __init__(self, path, flush_delay=DEFAULT_FLUSH_DELAY):
+        """
+        :param path: JSON 文件路径
+        :param flush_delay: 最后一次修改后多久写入磁盘（秒）
+        """
+        self.path = path
+        self.flush_delay = flush_delay
+        self.exists = False  # 打开时文件是否存在
+        self.corrupt = False  # 磁盘上的文件是否无法解析，为 True 时不写入
+        self._data = {}
+        self._changes = {}  # 尚未写入的修改，键到新值或 _DELETED
+        self._lock = threading.RLock()
+        self._condition = threading.Condition(self._lock)
+        self._flush_lock = threading.Lock()  # 保证多次写入按顺序进行
+        self._dirty = False
+        self._deadline = 0
+        self._closed = False
+        self._thread = None
+        data = self._read()
+        self._data = {} if data is None else data
+
+    def _read(self):
+        """
+        读取磁盘上的文件。文件无法解析时备份并标记为损坏，重新成功读取后解除标记。
+
+        :return: 文件内容，文件不存在时为空字典，无法解析时为 None
+        """
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if not isinstance(data, dict):
+                raise ValueError("内容不是 JSON 对象")
+        except FileNotFoundError:
+            self.corrupt = False
+            return {}
+        except (ValueError, OSError) as e:
+            # JSONDecodeError 和 UnicodeDecodeError 都是 ValueError
+            self.exists = True
+            if not self.corrupt:
+                self.corrupt = True
+                print(f"解析 {self.path} 时出错: {e}")
+                self._backup()
+            return None
+        self.exists = True
+        self.corrupt = False
+        return data
+
+    def _backup(self):
+        """
+        把无法解析的文件复制为 <文件名>.corrupt-<时间>。
+        """
+        backup_path = f"{self.path}.corrupt-{time.strftime('%Y%m%d-%H%M%S')}"
+        try:
+            shutil.copy2(self.path, backup_path)
+        except OSError as e:
+            print(f"备份 {self.path} 时出错: {e}")
+            return
+        print(f"已将无法解析的 {self.path} 备份为 {backup_path}，修复或删除该文件之前不会写入")
+
+    def get(self, key, default=None):
+        """
+        :param key: 键
+        :param default: 键不存在时的返回值
+        :return: 键对应的值
+        """
+        with self._lock:
+            return self._data.get(key, default)
+
+    def snapshot(self):
+        """
+        :return: 当前内容的副本
+        """
+        with self._lock:
+            return dict(self._data)
+
+    def set(self, key, value):
+        """
+        修改一个键，稍后写入磁盘。
+
+        :param key: 键
+        :param value: 值
+        """
+        self.update({key: value})
+
+    def update(self, mapping):
+        """
+        修改多个键，稍后写入磁盘。
+
+        :param mapping: 需要修改的键值对
+        """
+        with self._lock:
+            self._data.update(mapping)
+            self._changes.update(mapping)
+            flush_now = self._mark_dirty()
+        if flush_now:
+            self.flush()
+
+    def replace(self, data):
+        """
+        替换全部内容，稍后写入磁盘。
+
+        :param data: 新的内容
+        """
+        data = dict(data)
+        with self._lock:
+            for key in self._data.keys() - data.keys():
+                self._changes[key] = _DELETED
+            for key, value in data.items():
+                if key not in self._data or self._data[key] != value:
+                    self._changes[key] = value
+            self._data = data
+            flush_now = self._mark_dirty()
+        if flush_now:
+            self.flush()
+
+    def _mark_dirty(self):
+        """
+        :return: 是否需要由调用方在释放锁之后立即写入，即存储已关闭
+        """
+        self._dirty = True
+        self._deadline = time.monotonic() + self.flush_delay
+        if self._closed:
+            # 关闭后的修改直接写入
+            return True
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._flush_loop, name=f"JsonStore-{os.path.basename(self.path)}",
+                                            daemon=True)
+            self._thread.start()
+        self._condition.notify()
+        return False
+
+    def _flush_loop(self):
+        while True:
+            with self._condition:
+                while not self._closed:
+                    if not self._dirty:
+                        self._condition.wait()
+                        continue
+                    remaining = self._deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    # 等待期间又有修改时 _deadline 会后移，合并为一次写入
+                    self._condition.wait(remaining)
+                if self._closed:
+                    return
+            # 写入磁盘时不持有锁，读取和修改不会被阻塞
+            self.flush()
+
+    def flush(self):
+        """
+        立即把尚未保存的修改写入磁盘：重新读取磁盘上的文件，合并本进程修改过的键，
+        写入临时文件并同步到磁盘，再替换原文件。文件无法解析或写入失败时保留修改，下次修改后重试。
+
+        :return: 是否写入成功或没有需要写入的修改
+        """
+        with self._flush_lock:
+            with self._lock:
+                self._dirty = False
+                if not self._changes:
+                    return True
+                changes = self._changes
+                self._changes = {}
+
+            data = self._read()
+            if data is None:
+                self._restore_changes(changes)
+                print(f"{self.path} 无法解析，未写入修改")
+                return False
+            for key, value in changes.items():
+                if value is _DELETED:
+                    data.pop(key, None)
+                else:
+                    data[key] = value
+            tmp_path = f"{self.path}.tmp"
+            try:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(data, f, ensure_ascii=False, indent=4)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.path)
+            except (OSError, TypeError, ValueError) as e:
+                print(f"写入 {self.path} 时出错: {e}")
+                self._restore_changes(changes)
+                return False
+
+            with self._lock:
+                self.exists = True
+                # 采用其他进程写入的键，写入期间的新修改仍然优先
+                for key, value in self._changes.items():
+                    if value is _DELETED:
+                        data.pop(key, None)
+                    else:
+                        data[key] = value
+                self._data = data
+            return True
+
+    def _restore_changes(self, changes):
+        """
+        写入失败时放回未写入的修改，写入期间的新修改优先。
+        """
+        with self._lock:
+            for key, value in changes.items():
+                self._changes.setdefault(key, value)
+
+    def close(self):
+        """
+        写入尚未保存的修改并停止后台线程。之后的修改会立即写入。
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self.flush()
+
+
+def open_store(path):
+    """
+    获取路径对应的共享存储，同一路径在进程内只读取一次。
+
+    :param path: JSON 文件路径
+    :return: JsonStore 实例
+    """
+    path = os.path.abspath(path)
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = JsonStore(path)
+            _stores[path] = store
+        return store
+
+
+def flush_all():
+    """
+    写入所有存储中尚未保存的修改，用于程序退出。
+    """
+    with _stores_lock:
+        stores = list(_stores.values())
+    for store in stores:
+        store.close()
+
+
+atexit.register(flush_all)
@@ -0,0 +1,144 @@
+"""
+此模块记录程序启动各阶段的耗时：解释器启动、导入、读取设置、读取缓存和首次绘制，
+并检查从进程启动到窗口首次绘制的时间是否超过目标值。不依赖 Qt，导入时不访问磁盘。
+"""
+import os
+import sys
+import time
+
+
+DEFAULT_STARTUP_TARGET_MS = 1500  # 从进程启动到窗口首次绘制的目标时间（毫秒）
+PHASES = ("interpreter", "imports", "settings", "first_paint", "cache")
+PHASE_NAMES = {
+    "interpreter": "解释器启动",
+    "imports": "导入模块",
+    "settings": "读取设置",
+    "first_paint": "首次绘制",
+    "cache": "读取缓存",
+}
+
+
+def process_start_time():
+    """
+    获取当前进程的启动时间，用于计算解释器启动耗时。
+
+    :return: 与 time.time() 同一基准的秒数，无法获取时返回 None
+    """
+    try:
+        if sys.platform == "win32":
+            import ctypes
+            from ctypes import wintypes
+            creation, exit_time, kernel, user = (wintypes.FILETIME() for _ in range(4))
+            kernel32 = ctypes.windll.kernel32
+            if not kernel32.GetProcessTimes(kernel32.GetCurrentProcess(), ctypes.byref(creation),
+                                            ctypes.byref(exit_time), ctypes.byref(kernel), ctypes.byref(user)):
+                return None
+            # FILETIME 以 1601-01-01 起的 100 纳秒为单位
+            ticks = (creation.dwHighDateTime << 32) | creation.dwLowDateTime
+            return ticks / 10 ** 7 - 11644473600
+        if os.path.exists("/proc/self/stat"):
+            with open("/proc/self/stat", "r") as f:
+                # 进程名可能包含空格，从最后一个右括号之后开始切分
+                fields = f.read().rsplit(")", 1)[1].split()
+            with open("/proc/uptime", "r") as f:
+                uptime = float(f.read().split()[0])
+            start_after_boot = int(fields[19]) / os.sysconf("SC_CLK_TCK")
+            return time.time() - uptime + start_after_boot
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    return None
+
+
+class StartupTimer:
+    """
+    启动计时器。各阶段调用 mark 记录完成时刻，同一阶段只记录第一次；
+    读取缓存在后台线程中进行，可能早于或晚于首次绘制完成。
+    """
+
+    def __init__(self, target_ms=DEFAULT_STARTUP_TARGET_MS):
+        """
+        :param target_ms: 从进程启动到窗口首次绘制的目标时间（毫秒）
+        """
+        self.target_ms = target_ms
+        self.created = time.time()
+        self.process_start = None  # 进程启动时间，第一次 mark 时读取
+        self.marks = {}  # 阶段到完成时刻（time.time()）
+
+    def mark(self, phase):
+        """
+        记录阶段完成的时刻，重复调用时保留第一次的时刻。
+
+        :param phase: 阶段名称，见 PHASES
+        """
+        if phase in self.marks:
+            return
+        self.marks[phase] = time.time()
+        if phase == "interpreter":
+            self.process_start = process_start_time()
+
+    def origin(self):
+        """
+        :return: 计时的起点，进程启动时间不可用时为计时器创建的时刻
+        """
+        return self.process_start if self.process_start is not None else self.created
+
+    def elapsed_ms(self, phase):
+        """
+        :param phase: 阶段名称
+        :return: 从起点到该阶段完成的毫秒数，尚未完成时返回 None
+        """
+        if phase not in self.marks:
+            return None
+        return (self.marks[phase] - self.origin()) * 1000
+
+    def time_to_window_ms(self):
+        """
+        :return: 从起点到窗口首次绘制的毫秒数，尚未绘制时返回 None
+        """
+        return self.elapsed_ms("first_paint")
+
+    def within_target(self):
+        """
+        :return: 窗口已绘制且不超过目标时间时返回 True
+        """
+        time_to_window = self.time_to_window_ms()
+        return time_to_window is not None and time_to_window <= self.target_ms
+
+    def report(self):
+        """
+        :return: 各阶段完成时刻和相对前一阶段耗时（毫秒）的字典
+        """
+        phases = {}
+        previous = self.origin()
+        for phase in sorted(self.marks, key=self.marks.get):
+            phases[phase] = {
+                "at_ms": round((self.marks[phase] - self.origin()) * 1000, 1),
+                "took_ms": round((self.marks[phase] - previous) * 1000, 1),
+            }
+            previous = self.marks[phase]
+        time_to_window = self.time_to_window_ms()
+        return {
+            "phases": phases,
+            "process_start_known": self.process_start is not None,
+            "time_to_window_ms": None if time_to_window is None else round(time_to_window, 1),
+            "target_ms": self.target_ms,
+            "within_target": self.within_target(),
+        }
+
+    def print_report(self):
+        """
+        按完成先后输出各阶段的耗时，以及首次绘制是否达到目标。
+        """
+        report = self.report()
+        print("启动耗时:")
+        for phase, timing in report["phases"].items():
+            print(f"  {PHASE_NAMES.get(phase, phase)}: {timing['took_ms']} ms（累计 {timing['at_ms']} ms）")
+        if not report["process_start_known"]:
+            print("  无法获取进程启动时间，解释器启动耗时未计入")
+        if report["time_to_window_ms"] is not None:
+            status = "达到" if report["within_target"] else "超过"
+            print(f"  窗口首次绘制: {report['time_to_window_ms']} ms，{status}目标 {self.target_ms} ms")
+
+
+# 主程序使用的计时器，在 main_window 的第一行导入
+startup_timer = StartupTimer()
@@ -0,0 +1,46 @@
+"""
+此模块负责把原始图标转换为缩略图，不依赖 Qt，可以在子进程中运行。
+每个图标只解码一次：大图先按缩小比例解码，去掉 iCCP 等元数据后只保存 64px 和 128px 两种缩略图，
+使用压缩速度最快的 PNG 编码，编码结果交给 IconStore 保存，界面只加载这些已经缩放好的缩略图。
+编码参数固定，相同的图片总是得到相同的字节内容，便于按内容去重。
+"""
+import io
+
+from PIL import Image  # 导入 Pillow 库
+
+
+THUMBNAIL_SIZES = (64, 128)
+PNG_COMPRESS_LEVEL = 1
+
+
+def make_thumbnails(source, icon_key, sizes=THUMBNAIL_SIZES):
+    """
+    解码原始图标并编码各尺寸的缩略图。
+
+    :param source: 原始图标的文件路径或字节内容
+    :param icon_key: 图标键，用于错误信息
+    :param sizes: 需要生成的缩略图边长
+    :return: 边长到 PNG 字节内容的字典，无法解码时返回空字典
+    """
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    try:
+        with Image.open(source) as img:
+            largest = max(sizes)
+            # JPEG 可以在解码时直接按 1/2、1/4、1/8 缩小，其余格式忽略
+            img.draft("RGB", (largest, largest))
+            img = img.convert("RGBA") if img.mode not in ("RGB", "RGBA") else img.copy()
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        print(f"解码图标 {icon_key} 时出错: {e}")
+        return {}
+
+    # 不保留 iCCP 等元数据
+    img.info = {}
+    thumbnails = {}
+    for size in sorted(sizes, reverse=True):
+        # 从大到小依次缩小，较小的缩略图不必再处理原图
+        img.thumbnail((size, size), Image.LANCZOS, reducing_gap=2.0)
+        buffer = io.BytesIO()
+        img.save(buffer, "PNG", compress_level=PNG_COMPRESS_LEVEL)
+        thumbnails[size] = buffer.getvalue()
+    return thumbnails
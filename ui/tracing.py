@@ -0,0 +1,231 @@
+"""
+此模块实现了轻量的耗时追踪：在拉取、缓存、界面构建和图标加载等位置记录区间（span），
+可以导出为 Chrome trace-event JSON（在 chrome://tracing 或 Perfetto 中打开），也可以按每次刷新输出汇总表。
+默认关闭，关闭时 span() 只做一次判断并返回共享的空对象；设置环境变量 PLUGIN_REPO_TRACE 时启用，
+其值为 1 时写入程序目录下的 trace.json，否则作为输出文件路径。不依赖 Qt。
+
+用法：
+    with span("repo.fetch", url=url):
+        ...
+    tracer.add("icon.queue_wait", queued_at, time.perf_counter() - queued_at)
+"""
+import json
+import os
+import threading
+import time
+
+
+TRACE_ENV = "PLUGIN_REPO_TRACE"
+DEFAULT_TRACE_FILE = "trace.json"
+
+
+class _NullSpan:
+    """
+    追踪关闭时使用的空区间，进入和退出都不做任何事。
+    """
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **args):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Span:
+    """
+    一个正在进行的区间，退出 with 语句块时记录到追踪器。
+    """
+    __slots__ = ("tracer", "name", "args", "start")
+
+    def __init__(self, tracer, name, args):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        self.tracer.add(self.name, self.start, time.perf_counter() - self.start, **self.args)
+        return False
+
+    def set(self, **args):
+        """
+        在区间结束前补充参数，例如下载的字节数。
+        """
+        self.args.update(args)
+
+
+class Tracer:
+    """
+    区间记录器。每条记录为 (名称, 开始时刻, 耗时, 线程 ID, 刷新编号, 参数)，时刻和耗时以秒为单位，
+    基准为 time.perf_counter()。list.append 是原子操作，多个线程可以同时记录。
+    """
+
+    def __init__(self, enabled=False):
+        """
+        :param enabled: 是否启用
+        """
+        self.enabled = enabled
+        self.records = []
+        self.refreshes = []  # 每次刷新的 (编号, 名称, 开始时刻)
+        self.refresh_id = 0  # 当前刷新的编号，0 表示第一次刷新之前
+        self._lock = threading.Lock()
+        self._thread_names = {}
+
+    def span(self, name, **args):
+        """
+        :param name: 区间名称，"." 之前的部分作为类别，例如 repo、cache、ui、icon
+        :param args: 附加参数，导出到 Chrome trace 的 args
+        :return: 上下文管理器，追踪关闭时为共享的空对象
+        """
+        if not self.enabled:
+            return _NULL_SPAN
+        return Span(self, name, args)
+
+    def add(self, name, start, duration, **args):
+        """
+        记录一个已经结束的区间，用于在其他位置测量的耗时，例如排队等待的时间。
+
+        :param name: 区间名称
+        :param start: 开始时刻（time.perf_counter()）
+        :param duration: 耗时（秒）
+        :param args: 附加参数
+        """
+        if not self.enabled:
+            return
+        thread = threading.current_thread()
+        if thread.ident not in self._thread_names:
+            self._thread_names[thread.ident] = thread.name
+        self.records.append((name, start, duration, thread.ident, self.refresh_id, args))
+
+    def begin_refresh(self, name="refresh"):
+        """
+        开始一次新的刷新，之后记录的区间都属于这次刷新，直到下一次调用。
+
+        :param name: 刷新的名称
+        :return: 刷新编号，追踪关闭时为 None
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            self.refresh_id += 1
+            self.refreshes.append((self.refresh_id, name, time.perf_counter()))
+            return self.refresh_id
+
+    def clear(self):
+        """
+        清空全部记录。
+        """
+        with self._lock:
+            self.records = []
+            self.refreshes = []
+            self.refresh_id = 0
+
+    def summary(self, refresh_id=None):
+        """
+        按区间名称汇总次数、总耗时、平均耗时、P95 和最大耗时（毫秒）。
+
+        :param refresh_id: 只汇总该次刷新，None 表示全部
+        :return: 按总耗时从大到小排列的 (名称, 次数, 总计, 平均, P95, 最大) 列表
+        """
+        durations = {}
+        for name, start, duration, tid, rid, args in list(self.records):
+            if refresh_id is None or rid == refresh_id:
+                durations.setdefault(name, []).append(duration * 1000)
+        rows = []
+        for name, values in durations.items():
+            values.sort()
+            total = sum(values)
+            p95 = values[min(len(values) - 1, int(len(values) * 0.95))]
+            rows.append((name, len(values), total, total / len(values), p95, values[-1]))
+        rows.sort(key=lambda row: row[2], reverse=True)
+        return rows
+
+    def summary_table(self, refresh_id=None):
+        """
+        :param refresh_id: 只汇总该次刷新，None 表示全部
+        :return: 汇总表的文本
+        """
+        header = f"{'span':<24} {'count':>7} {'total_ms':>10} {'mean_ms':>9} {'p95_ms':>9} {'max_ms':>9}"
+        lines = [header, "-" * len(header)]
+        for name, count, total, mean, p95, maximum in self.summary(refresh_id):
+            lines.append(f"{name:<24} {count:>7} {total:>10.1f} {mean:>9.2f} {p95:>9.2f} {maximum:>9.2f}")
+        return "\n".join(lines)
+
+    def report(self):
+        """
+        :return: 每次刷新一张汇总表的文本
+        """
+        sections = []
+        if any(record[4] == 0 for record in self.records):
+            sections.append(f"[启动]\n{self.summary_table(0)}")
+        for refresh_id, name, start in self.refreshes:
+            sections.append(f"[{name} #{refresh_id}]\n{self.summary_table(refresh_id)}")
+        return "\n\n".join(sections)
+
+    def chrome_trace(self):
+        """
+        :return: Chrome trace-event 格式的字典，时间以微秒为单位
+        """
+        pid = os.getpid()
+        events = [{"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+                  for tid, name in self._thread_names.items()]
+        for refresh_id, name, start in self.refreshes:
+            events.append({"name": f"{name} #{refresh_id}", "ph": "i", "s": "g", "pid": pid, "tid": 0,
+                           "ts": round(start * 1e6, 3)})
+        for name, start, duration, tid, refresh_id, args in list(self.records):
+            events.append({
+                "name": name,
+                "cat": name.split(".", 1)[0],
+                "ph": "X",
+                "pid": pid,
+                "tid": tid,
+                "ts": round(start * 1e6, 3),
+                "dur": round(duration * 1e6, 3),
+                "args": dict(args, refresh=refresh_id),
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def export_chrome(self, path):
+        """
+        把全部记录写入 Chrome trace-event JSON 文件。
+
+        :param path: 输出文件路径
+        :return: 是否写入成功
+        """
+        try:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(self.chrome_trace(), f, ensure_ascii=False, default=str)
+        except OSError as e:
+            print(f"写入追踪文件 {path} 时出错: {e}")
+            return False
+        return True
+
+
+def trace_path(base_dir):
+    """
+    :param base_dir: 程序目录
+    :return: 环境变量 PLUGIN_REPO_TRACE 指定的输出文件路径，未设置时返回 None
+    """
+    value = os.environ.get(TRACE_ENV, "")
+    if not value or value == "0":
+        return None
+    if value == "1":
+        return os.path.join(base_dir, DEFAULT_TRACE_FILE)
+    return os.path.abspath(value)
+
+
+tracer = Tracer(enabled=os.environ.get(TRACE_ENV, "") not in ("", "0"))
+span = tracer.span